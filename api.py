@@ -3,60 +3,57 @@ Flask REST API for Classroom Attendance System
 Bridges Python face recognition system with Next.js dashboard
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from datetime import datetime
+import os
 import threading
-import time
 
+from face_engine.analytics import AttendanceAnalytics, resolve_range
+from face_engine.archive import daily_counts, list_archives
+from face_engine.config import Config
 from face_engine.database import Database
-from face_engine.camera import Camera
-from face_engine.recognize import FaceRecognizer
-from face_engine.register import StudentRegistration
+from face_engine.events import EventBus, format_sse
+from face_engine.export import EXPORT_FORMATS, CONTENT_TYPES, encode_rows, iter_attendance, parse_date_range
+from face_engine.ingest import CentralMatcher
+from face_engine.ipc import EngineClient, EngineUnavailable, EventRelay
 
 app = Flask(__name__)
 CORS(app, origins=['*'])  # Allow Next.js to call this API
 
-# Global state
-recognition_thread = None
-is_running = False
-recognizer = None
-camera = None
+# The recognition engine runs in its own process (main_headless.py);
+# this API is a stateless client, so it can run under multiple workers.
+engine = EngineClient()
+
+# Local mirror of the engine's event stream for SSE clients (IDs come from the engine)
+event_bus = EventBus(first_id=0)
+event_relay = EventRelay(engine, event_bus)
 
 
 # ============================================================
 # HELPER FUNCTIONS
 # ============================================================
 
-def recognition_loop():
-    """Background thread for face recognition."""
-    global is_running, recognizer, camera
-
-    last_process_time = 0
-    process_interval = 3  # Process every 3 seconds
-
-    while is_running:
-        try:
-            should_process, display_frame, small_frame = camera.read_frame()
-
-            if display_frame is None:
-                break
-
-            current_time = time.time()
-
-            if should_process and small_frame is not None:
-                if (current_time - last_process_time) >= process_interval:
-                    recognizer.recognize_faces(small_frame)
-                    last_process_time = current_time
-
-            time.sleep(0.1)
+def engine_status() -> dict:
+    """Get recognition engine status, or an offline status if unreachable."""
+    try:
+        response = engine.request('status')
+        return dict(response['data'], engine_connected=True)
+    except EngineUnavailable:
+        return {
+            'recognition_running': False,
+            'camera_connected': False,
+            'arduino_connected': False,
+            'engine_connected': False
+        }
 
-        except Exception as e:
-            print(f"Recognition error: {e}")
-            break
 
-    is_running = False
-    print("Recognition stopped")
+def engine_unavailable_response():
+    """Error response for when the engine process is not running."""
+    return jsonify({
+        'success': False,
+        'error': 'Recognition engine not running'
+    }), 503
 
 
 # ============================================================
@@ -66,7 +63,7 @@ def recognition_loop():
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get system status."""
-    global is_running, recognizer
+    status = engine_status()
 
     db = Database()
     total_students = len(db.get_all_students())
@@ -76,9 +73,10 @@ def get_status():
     return jsonify({
         'success': True,
         'data': {
-            'recognition_running': is_running,
-            'camera_connected': is_running,
-            'arduino_connected': recognizer.arduino.is_connected if recognizer else False,
+            'recognition_running': status['recognition_running'],
+            'camera_connected': status['camera_connected'],
+            'arduino_connected': status['arduino_connected'],
+            'engine_connected': status['engine_connected'],
             'total_students': total_students,
             'present_today': present_today,
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -155,6 +153,91 @@ def delete_student(roll_number):
         }), 404
 
 
+@app.route('/api/students/register', methods=['POST'])
+def register_student():
+    """Start a live registration job using the engine's camera."""
+    body = request.get_json(silent=True) or {}
+    name = (body.get('name') or '').strip()
+    roll_number = (body.get('roll_number') or '').strip()
+
+    if not name or not roll_number:
+        return jsonify({
+            'success': False,
+            'error': 'Name and roll number cannot be empty'
+        }), 400
+
+    # Deferred like the engine's heavy imports: registration needs OpenCV
+    from face_engine.register import check_num_samples
+
+    try:
+        num_samples = check_num_samples(body.get('num_samples', 15))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        response = engine.request('register', name=name, roll_number=roll_number,
+                                  num_samples=num_samples)
+    except EngineUnavailable:
+        return engine_unavailable_response()
+
+    if not response['success']:
+        return jsonify(response), 409
+
+    return jsonify(response), 202
+
+
+@app.route('/api/students/bulk', methods=['POST'])
+def bulk_enroll_students():
+    """Start a bulk enrollment job from a photo folder or CSV manifest on the Pi."""
+    body = request.get_json(silent=True) or {}
+    source = body.get('source')
+
+    if not source:
+        return jsonify({
+            'success': False,
+            'error': 'source (folder or CSV manifest path) is required'
+        }), 400
+
+    try:
+        response = engine.request('enroll_bulk', source=source, workers=body.get('workers'))
+    except EngineUnavailable:
+        return engine_unavailable_response()
+
+    if not response['success']:
+        return jsonify(response), 400
+
+    return jsonify(response), 202
+
+
+# ============================================================
+# JOB ENDPOINTS
+# ============================================================
+
+@app.route('/api/jobs', methods=['GET'])
+def get_jobs():
+    """List background jobs."""
+    try:
+        response = engine.request('jobs')
+    except EngineUnavailable:
+        return engine_unavailable_response()
+
+    return jsonify(dict(response, count=len(response['data'])))
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a background job's state, progress and result."""
+    try:
+        response = engine.request('job', job_id=job_id)
+    except EngineUnavailable:
+        return engine_unavailable_response()
+
+    if not response['success']:
+        return jsonify(response), 404
+
+    return jsonify(response)
+
+
 # ============================================================
 # ATTENDANCE ENDPOINTS
 # ============================================================
@@ -210,6 +293,32 @@ def get_all_attendance():
     })
 
 
+@app.route('/api/attendance/export', methods=['GET'])
+def export_attendance():
+    """Stream attendance for a date range as CSV, gzip CSV or NDJSON."""
+    fmt = request.args.get('format', 'csv')
+    start_date = request.args.get('from')
+    end_date = request.args.get('to', start_date)
+    roll_numbers = request.args.getlist('roll')
+    student_ids = request.args.getlist('student_id', type=int)
+
+    try:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        parse_date_range(start_date, end_date)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    rows = iter_attendance(start_date=start_date, end_date=end_date,
+                           roll_numbers=roll_numbers, student_ids=student_ids)
+    first_day = start_date or datetime.now().strftime("%Y-%m-%d")
+    filename = f"attendance_{first_day}_{end_date or first_day}.{fmt}"
+
+    return Response(stream_with_context(encode_rows(rows, fmt)),
+                    mimetype=CONTENT_TYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
 @app.route('/api/attendance/clear/today', methods=['DELETE'])
 def clear_today_attendance():
     """Clear today's attendance records."""
@@ -259,23 +368,11 @@ def get_stats():
     present_today = db.get_attendance_count_today()
     absent_today = total_students - present_today
 
-    # Get attendance for last 7 days
-    db.cursor.execute("""
-        SELECT DATE(timestamp) as date, COUNT(DISTINCT student_id) as count
-        FROM attendance
-        GROUP BY DATE(timestamp)
-        ORDER BY date DESC
-        LIMIT 7
-    """)
-    weekly_data = db.cursor.fetchall()
     db.close()
 
-    weekly_list = []
-    for date, count in weekly_data:
-        weekly_list.append({
-            'date': date,
-            'count': count
-        })
+    # Get attendance for last 7 days (falls back to archive files if needed)
+    weekly_list = daily_counts(days=7)
+    archived_records = sum(archive['records'] for archive in list_archives())
 
     return jsonify({
         'success': True,
@@ -285,6 +382,7 @@ def get_stats():
             'absent_today': absent_today,
             'attendance_rate': round((present_today / total_students * 100), 1) if total_students > 0 else 0,
             'weekly_data': weekly_list,
+            'archived_records': archived_records,
             'date': datetime.now().strftime("%Y-%m-%d"),
             'time': datetime.now().strftime("%H:%M:%S")
         }
@@ -292,43 +390,170 @@ def get_stats():
 
 
 # ============================================================
-# RECOGNITION CONTROL ENDPOINTS
+# ANALYTICS ENDPOINTS
 # ============================================================
 
-@app.route('/api/recognition/start', methods=['POST'])
-def start_recognition():
-    """Start face recognition."""
-    global recognition_thread, is_running, recognizer, camera
+_analytics = None
+_analytics_lock = threading.Lock()
 
-    if is_running:
-        return jsonify({
-            'success': False,
-            'error': 'Recognition already running'
-        }), 400
 
-    # Initialize recognizer
-    recognizer = FaceRecognizer(tolerance=0.5)
+def get_analytics() -> AttendanceAnalytics:
+    """Per-process analytics engine (loads attendance on first use)."""
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = AttendanceAnalytics()
+        return _analytics
 
-    if not recognizer.start():
-        return jsonify({
-            'success': False,
-            'error': 'No students registered'
-        }), 400
 
-    # Initialize camera
-    camera = Camera(camera_index=0, scale_factor=0.25)
+def analytics_range():
+    """Date range from ?from=&to= (default: last 30 days)."""
+    return resolve_range(request.args.get('from'), request.args.get('to'))
 
-    if not camera.start():
-        return jsonify({
-            'success': False,
-            'error': 'Failed to start camera'
-        }), 500
 
-    # Start recognition in background thread
-    is_running = True
-    recognition_thread = threading.Thread(target=recognition_loop)
-    recognition_thread.daemon = True
-    recognition_thread.start()
+@app.route('/api/analytics/students', methods=['GET'])
+def get_student_analytics():
+    """Attendance rate, streaks and median arrival for every student."""
+    try:
+        start_date, end_date = analytics_range()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    return jsonify({'success': True, 'data': get_analytics().student_summary(start_date, end_date)})
+
+
+@app.route('/api/analytics/students/<int:student_id>', methods=['GET'])
+def get_student_analytics_detail(student_id):
+    """One student's analytics with first arrival per session day."""
+    try:
+        start_date, end_date = analytics_range()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    detail = get_analytics().student_detail(student_id, start_date, end_date)
+    if detail is None:
+        return jsonify({'success': False, 'error': 'Student not found'}), 404
+
+    return jsonify({'success': True, 'data': detail})
+
+
+@app.route('/api/analytics/arrivals', methods=['GET'])
+def get_arrival_distribution():
+    """Histogram and percentiles of daily first-arrival times."""
+    try:
+        start_date, end_date = analytics_range()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    bin_minutes = max(1, request.args.get('bin', 15, type=int))
+    return jsonify({'success': True,
+                    'data': get_analytics().arrival_distribution(start_date, end_date, bin_minutes)})
+
+
+@app.route('/api/analytics/chronic-absence', methods=['GET'])
+def get_chronic_absence():
+    """Students below an attendance-rate threshold (default 90%)."""
+    try:
+        start_date, end_date = analytics_range()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    threshold = request.args.get('threshold', 0.9, type=float)
+    return jsonify({'success': True,
+                    'data': get_analytics().chronic_absence(start_date, end_date, threshold)})
+
+
+# ============================================================
+# INGESTION ENDPOINTS
+# ============================================================
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher() -> CentralMatcher:
+    """Per-process central matcher (loads the gallery on first use).
+
+    Tolerance, cooldown and gallery settings come from the same config file
+    and ATTENDAI_* variables as the engine, read once when the matcher is
+    built; restart the API to apply later changes.
+    """
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            config = Config()
+            _matcher = CentralMatcher(tolerance=config.tolerance,
+                                      gallery_mode=config.gallery_mode,
+                                      multi_sample=config.multi_sample,
+                                      cooldown_seconds=config.cooldown_seconds)
+        return _matcher
+
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest_encodings():
+    """Match a batch of face encodings from a classroom device and mark attendance."""
+    # Optional shared secret so only our devices can write attendance
+    token = os.environ.get('ATTENDAI_INGEST_TOKEN')
+    if token and request.headers.get('X-Ingest-Token') != token:
+        return jsonify({'success': False, 'error': 'Invalid ingest token'}), 401
+
+    try:
+        result = get_matcher().ingest(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    return jsonify({'success': True, 'data': result})
+
+
+# ============================================================
+# CONFIGURATION ENDPOINTS
+# ============================================================
+
+@app.route('/api/config', methods=['GET'])
+def get_config():
+    """List runtime settings with their values, sources and hot-apply flags."""
+    try:
+        response = engine.request('config')
+    except EngineUnavailable:
+        return engine_unavailable_response()
+
+    return jsonify(response)
+
+
+@app.route('/api/config', methods=['PATCH', 'PUT'])
+def update_config():
+    """Change settings; hot ones apply to the running engine immediately."""
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict) or not changes:
+        return jsonify({'success': False, 'error': 'Expected a JSON object of settings'}), 400
+
+    try:
+        response = engine.request('update_config', changes=changes)
+    except EngineUnavailable:
+        return engine_unavailable_response()
+
+    if not response['success']:
+        return jsonify(response), 400
+
+    return jsonify(response)
+
+
+# ============================================================
+# RECOGNITION CONTROL ENDPOINTS
+# ============================================================
+
+@app.route('/api/recognition/start', methods=['POST'])
+def start_recognition():
+    """Start face recognition."""
+    try:
+        response = engine.request('start')
+    except EngineUnavailable:
+        return engine_unavailable_response()
+
+    if not response['success']:
+        # Mirror the engine's original status codes
+        code = 500 if response['error'] == 'Failed to start camera' else 400
+        return jsonify(response), code
 
     return jsonify({
         'success': True,
@@ -339,25 +564,13 @@ def start_recognition():
 @app.route('/api/recognition/stop', methods=['POST'])
 def stop_recognition():
     """Stop face recognition."""
-    global is_running, recognizer, camera
-
-    if not is_running:
-        return jsonify({
-            'success': False,
-            'error': 'Recognition is not running'
-        }), 400
-
-    # Stop recognition
-    is_running = False
-    time.sleep(1)
+    try:
+        response = engine.request('stop')
+    except EngineUnavailable:
+        return engine_unavailable_response()
 
-    if camera:
-        camera.stop()
-        camera = None
-
-    if recognizer:
-        recognizer.stop()
-        recognizer = None
+    if not response['success']:
+        return jsonify(response), 400
 
     return jsonify({
         'success': True,
@@ -365,6 +578,73 @@ def stop_recognition():
     })
 
 
+# ============================================================
+# LIVE STREAM ENDPOINTS
+# ============================================================
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """Stream live events to the dashboard (server-sent events)."""
+    # EventSource sends Last-Event-ID on reconnect; allow a query param too
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    event_relay.ensure_running()
+    subscription = event_bus.subscribe(last_event_id)
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                if subscription.overflowed and subscription.queue.empty():
+                    # Client fell behind; close so it reconnects and resumes
+                    break
+                event = subscription.get(timeout=15)
+                if event is not None:
+                    yield format_sse(event)
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/stream', methods=['GET'])
+def stream_preview():
+    """Stream the annotated camera view as MJPEG."""
+    try:
+        frames = engine.preview()
+        first = next(frames)
+    except EngineUnavailable:
+        return engine_unavailable_response()
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except StopIteration:
+        return jsonify({'success': False, 'error': 'No frames available'}), 503
+
+    def generate():
+        try:
+            jpeg = first
+            while True:
+                yield (b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
+                       + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+                jpeg = next(frames)
+        except (StopIteration, EngineUnavailable):
+            return
+        finally:
+            frames.close()
+
+    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame',
+                    headers={'Cache-Control': 'no-cache'})
+
+
 # ============================================================
 # MAIN
 # ============================================================
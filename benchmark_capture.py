@@ -0,0 +1,104 @@
+"""
+Capture benchmark.
+Compares CPU time spent on capture alone for 'read' (decode every frame) and
+'grab' (decode only frames that are processed) modes, and frame-sized array
+allocations per frame with and without pooled buffers.
+
+Usage:
+    python3 benchmark_capture.py                      # camera 0
+    python3 benchmark_capture.py --fourcc MJPG --buffer-size 1
+    python3 benchmark_capture.py --source clip.avi    # recorded video
+    python3 benchmark_capture.py --synthetic          # no camera: generated MJPEG clip
+
+Video files read through FFmpeg decode inside grab(), so they show no
+difference; --synthetic reads its clip with OpenCV's MJPEG reader, which
+(like a V4L2 MJPEG/YUYV camera) only decodes in retrieve().
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+from face_engine.camera import Camera
+
+
+def make_synthetic_clip(frames: int = 300) -> str:
+    """Write a 640x480 MJPEG clip with moving content (decoding cost like a webcam)."""
+    path = os.path.join(tempfile.mkdtemp(), 'synthetic.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (640, 480))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, size=(480, 640, 3), dtype=np.uint8)
+    for i in range(frames):
+        frame = np.roll(background, i * 4, axis=1)
+        cv2.circle(frame, (320 + int(100 * np.sin(i / 10)), 240), 80, (200, 180, 160), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def run(source, mode: str, frames: int, fourcc, buffer_size, need_display: bool, backend=None,
+        reuse_buffers: bool = True):
+    """Read frames in one mode; return (CPU ms/frame, wall ms/frame, frames decoded, frames read, allocations)."""
+    camera = Camera(camera_index=source, capture_mode=mode, fourcc=fourcc,
+                    buffer_size=buffer_size, backend=backend, reuse_buffers=reuse_buffers)
+    if not camera.start():
+        return None
+
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    read = 0
+    while read < frames:
+        camera.read_frame(need_display=need_display)
+        if not camera.last_read_ok:
+            break
+        read += 1
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    camera.stop()
+
+    if read == 0:
+        return None
+    return cpu / read * 1000, wall / read * 1000, camera.frames_decoded, read, camera.allocations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera capture CPU benchmark")
+    parser.add_argument('--source', default='0', help="Camera index or video file")
+    parser.add_argument('--synthetic', action='store_true', help="Use a generated MJPEG clip")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--fourcc', choices=['MJPG', 'YUYV'], default=None)
+    parser.add_argument('--buffer-size', type=int, default=None)
+    args = parser.parse_args()
+
+    backend = None
+    if args.synthetic:
+        source = make_synthetic_clip(args.frames)
+        backend = cv2.CAP_OPENCV_MJPEG
+    else:
+        source = int(args.source) if args.source.isdigit() else args.source
+
+    print(f"\n{'='*72}")
+    print(f"CAPTURE BENCHMARK: {args.frames} frames from {source}")
+    print(f"{'='*72}")
+    print(f"{'mode':28s} {'CPU ms/frame':>13s} {'wall ms/frame':>14s} {'decoded':>10s} {'allocs/frame':>13s}")
+
+    for mode, need_display, reuse, label in [
+        ('read', False, False, 'read (decode all)'),
+        ('grab', False, False, 'grab (no viewers)'),
+        ('grab', True, False, 'grab (preview open)'),
+        ('grab', True, True, 'grab (preview, pooled)'),
+    ]:
+        result = run(source, mode, args.frames, args.fourcc, args.buffer_size, need_display, backend, reuse)
+        if result is None:
+            print(f"{label:28s} ✗ could not read frames")
+            continue
+        cpu_ms, wall_ms, decoded, read, allocations = result
+        print(f"{label:28s} {cpu_ms:13.2f} {wall_ms:14.2f} {decoded:>5d}/{read:<4d} {allocations / read:13.3f}")
+
+    print(f"{'='*72}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Gallery representation benchmark.
+Compares memory, match accuracy and latency of float64 / float16 / int8 galleries.
+
+Usage:
+    python3 benchmark_gallery.py                 # synthetic 50k-student gallery
+    python3 benchmark_gallery.py --students 5000
+    python3 benchmark_gallery.py --from-db       # real encodings from attendance.db
+    python3 benchmark_gallery.py --samples 15    # also time the multi-sample matcher
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from face_engine.gallery import Gallery, QuantizedGallery, MultiSampleGallery
+
+
+def synthetic_gallery(students: int, seed: int = 0):
+    """Random identities with face-encoding-like spread (typical inter-person distance ~0.9)."""
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0, 0.06, size=(students, 128))
+
+
+def load_db_encodings(db_path: str):
+    from face_engine.database import Database
+
+    db = Database(db_path)
+    encodings = np.array([encoding for _, _, _, encoding in db.get_all_students()])
+    db.close()
+    return encodings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gallery memory/accuracy benchmark")
+    parser.add_argument('--students', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--noise', type=float, default=0.025,
+                        help="Per-dimension query noise (0.025 ~ same-person distance 0.28)")
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument('--samples', type=int, default=0,
+                        help="Also benchmark a multi-sample gallery with this many samples per student")
+    parser.add_argument('--from-db', action='store_true')
+    parser.add_argument('--db', default='attendance.db')
+    args = parser.parse_args()
+
+    encodings = load_db_encodings(args.db) if args.from_db else synthetic_gallery(args.students)
+    n = len(encodings)
+    if n == 0:
+        print("✗ No encodings to benchmark")
+        return
+
+    ids = list(range(n))
+    names = [str(i) for i in ids]
+
+    rng = np.random.default_rng(1)
+    truth = rng.integers(0, n, size=args.queries)
+    queries = encodings[truth] + rng.normal(0.0, args.noise, size=(args.queries, 128))
+
+    # Python-list baseline: what FaceRecognizer used to hold
+    list_bytes = sum(e.nbytes + 112 for e in list(encodings)) + 8 * n
+
+    reference = Gallery(ids, names, list(encodings))
+    ref_results = [reference.best_match(q) for q in queries]
+
+    exact_path = os.path.join(tempfile.mkdtemp(), 'gallery.npy')
+    galleries = [
+        ('float64', reference),
+        ('float16', QuantizedGallery(ids, names, list(encodings), dtype='float16', exact_path=exact_path)),
+        ('int8', QuantizedGallery(ids, names, list(encodings), dtype='int8', exact_path=exact_path)),
+    ]
+
+    print(f"\n{'='*78}")
+    print(f"GALLERY BENCHMARK: {n} students, {args.queries} queries")
+    print(f"{'='*78}")
+    print(f"list of ndarrays (old): {list_bytes / 1024 / 1024:8.2f} MB")
+    print(f"{'mode':8s} {'resident MB':>12s} {'top1 == f64':>12s} {'decision ==':>12s} "
+          f"{'max |d err|':>12s} {'ms/query':>10s}")
+
+    for mode, gallery in galleries:
+        started = time.perf_counter()
+        results = [gallery.best_match(q) for q in queries]
+        elapsed = (time.perf_counter() - started) / len(queries) * 1000
+
+        same_top1 = np.mean([r[0] == ref[0] for r, ref in zip(results, ref_results)])
+        same_decision = np.mean([
+            (r[1] <= args.tolerance) == (ref[1] <= args.tolerance) for r, ref in zip(results, ref_results)
+        ])
+        max_error = max(abs(r[1] - ref[1]) for r, ref in zip(results, ref_results))
+
+        print(f"{mode:8s} {gallery.nbytes / 1024 / 1024:12.2f} {same_top1:12.2%} {same_decision:12.2%} "
+              f"{max_error:12.2e} {elapsed:10.3f}")
+
+    if args.samples:
+        # Synthetic samples scattered around each centroid; latency is what matters here
+        sample_noise = rng.normal(0.0, args.noise, size=(n, args.samples, 128))
+        samples = [list(encodings[i] + sample_noise[i]) for i in range(n)]
+        gallery = MultiSampleGallery(ids, names, samples)
+
+        started = time.perf_counter()
+        for q in queries:
+            gallery.best_match(q)
+        elapsed = (time.perf_counter() - started) / len(queries) * 1000
+        print(f"{'multi×' + str(args.samples):8s} {gallery.nbytes / 1024 / 1024:12.2f} "
+              f"{'-':>12s} {'-':>12s} {'-':>12s} {elapsed:10.3f}")
+
+    print(f"{'='*78}\n")
+
+
+if __name__ == "__main__":
+    main()
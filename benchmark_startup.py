@@ -0,0 +1,82 @@
+"""
+Startup benchmark.
+Measures import time and peak RSS of each entry point in a fresh interpreter,
+and which heavy vision modules each one ends up loading.
+
+Usage:
+    python3 benchmark_startup.py
+    python3 benchmark_startup.py --repeat 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ENTRY_POINTS = [
+    ('interpreter', 'pass'),
+    ('api.py', 'import api'),
+    ('manage.py', 'import manage; manage.build_parser()'),
+    ('database tools', 'from face_engine.database import export_attendance_csv, print_database_stats'),
+    ('main_headless.py', 'import main_headless'),
+    ('face_recognition', 'import face_recognition'),
+]
+
+HEAVY_MODULES = ('cv2', 'dlib', 'face_recognition', 'face_recognition_models')
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    'seconds': elapsed,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy': [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def measure(statement: str, repeat: int):
+    """Run a statement in fresh interpreters; return (median s, median RSS MB, heavy modules)."""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True
+        )
+        if output.returncode != 0:
+            return None, None, output.stderr.strip().splitlines()[-1:]
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    return (statistics.median(r['seconds'] for r in runs),
+            statistics.median(r['rss_kb'] for r in runs) / 1024,
+            runs[-1]['heavy'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entry point startup time/RSS benchmark")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per entry point")
+    args = parser.parse_args()
+
+    print(f"\n{'='*78}")
+    print(f"STARTUP BENCHMARK (median of {args.repeat} runs)")
+    print(f"{'='*78}")
+    print(f"{'entry point':20s} {'import ms':>10s} {'peak RSS MB':>12s}  heavy modules loaded")
+
+    for name, statement in ENTRY_POINTS:
+        seconds, rss_mb, heavy = measure(statement, args.repeat)
+        if seconds is None:
+            print(f"{name:20s} {'✗ failed':>10s} {'':>12s}  {' '.join(heavy)}")
+            continue
+        print(f"{name:20s} {seconds * 1000:10.1f} {rss_mb:12.1f}  {', '.join(heavy) or '-'}")
+
+    print(f"{'='*78}\n")
+
+
+if __name__ == "__main__":
+    main()
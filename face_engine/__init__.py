@@ -3,14 +3,20 @@ Face Engine Package
 Classroom Attendance Monitoring System
 """
 
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "Your Name"
 
-from .database import Database
-from .camera import Camera
-from .register import StudentRegistration
-from .recognize import FaceRecognizer
-from .serial_comm import ArduinoSerial
+# Submodules are imported on first access so that database-only users
+# (the API, CLI tools) don't load OpenCV, dlib and the face models.
+_LAZY_ATTRIBUTES = {
+    'Database': 'database',
+    'Camera': 'camera',
+    'StudentRegistration': 'register',
+    'FaceRecognizer': 'recognize',
+    'ArduinoSerial': 'serial_comm',
+}
 
 __all__ = [
     'Database',
@@ -19,3 +25,16 @@ __all__ = [
     'FaceRecognizer',
     'ArduinoSerial'
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
@@ -0,0 +1,425 @@
+"""
+Attendance analytics module.
+Per-student attendance rates, streaks, arrival times and chronic absence,
+computed with NumPy over attendance held in memory as arrays.
+"""
+
+import os
+import sqlite3
+import threading
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple
+from .database import Database
+from .archive import archive_files, list_archives
+
+
+SECONDS_PER_DAY = 86400
+
+
+def _to_arrays(rows: List[Tuple[int, str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(student_id, 'YYYY-MM-DD HH:MM:SS') rows -> (int32 ids, int64 seconds)."""
+    if not rows:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int32, count=len(rows))
+    # Local wall-clock timestamps are kept naive, so day boundaries stay local
+    seconds = np.array([r[1] for r in rows], dtype='datetime64[s]').astype(np.int64)
+    return ids, seconds
+
+
+def _format_time(seconds: float) -> Optional[str]:
+    """Seconds since midnight -> 'HH:MM' (None for NaN)."""
+    if seconds is None or np.isnan(seconds):
+        return None
+    minutes = int(round(seconds / 60))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def resolve_range(start_date: Optional[str], end_date: Optional[str], default_days: int = 30) -> Tuple[str, str]:
+    """
+    Fill in a YYYY-MM-DD date range (default: the last default_days days).
+
+    Raises:
+        ValueError: If a date is malformed or the range is reversed
+    """
+    end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else datetime.now()
+    start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else end - timedelta(days=default_days - 1)
+    if end < start:
+        raise ValueError("End date is before start date")
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+class AttendanceAnalytics:
+    """Vectorized attendance analytics with write-invalidated caching.
+
+    Attendance rows are loaded once into NumPy arrays. A persistent read
+    connection polls PRAGMA data_version, which changes whenever another
+    connection commits: new rows are appended incrementally, and anything
+    else (deletes, archiving) triggers a full reload. Archive files are
+    loaded on demand and cached by modification time. Computed results are
+    cached until the data changes.
+    """
+
+    def __init__(self, db_path: str = "attendance.db", max_results: int = 64):
+        """
+        Initialize analytics engine.
+
+        Args:
+            db_path: Path to the live database file
+            max_results: Number of computed results kept in the cache
+        """
+        self.db_path = db_path
+        self.max_results = max_results
+        self.lock = threading.RLock()
+
+        # Make sure the schema exists before opening the read connection
+        Database(db_path).close()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+
+        self.data_version = None
+        self.live_ids = self.live_seconds = None
+        self.live_max_id = 0
+        self.live_count = 0
+        self.archives = {}      # path -> (mtime, ids, seconds)
+        self.archive_key = None
+        self.archive_periods = {}  # path -> (start, end) timestamps
+        self.students = {}      # student_id -> (name, roll_number)
+        self.results = OrderedDict()
+
+    # ------------------------------------------------------------
+    # Loading and invalidation
+    # ------------------------------------------------------------
+
+    def refresh(self) -> None:
+        """Pick up writes made since the last call (lock held)."""
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        archive_key = tuple((path, os.path.getmtime(path)) for path in archive_files(self.db_path))
+
+        if version == self.data_version and archive_key == self.archive_key and self.live_ids is not None:
+            return
+
+        if version != self.data_version or self.live_ids is None:
+            self._refresh_live()
+        if archive_key != self.archive_key:
+            periods = {a['path']: (a['start'], a['end']) for a in list_archives(self.db_path)}
+            self.archive_periods = {path: periods.get(path, (None, None)) for path, _ in archive_key}
+            self.archives = {path: self.archives[path] for path, mtime in archive_key
+                             if path in self.archives and self.archives[path][0] == mtime}
+            self.archive_key = archive_key
+
+        # Any commit (attendance, students, archiving) invalidates computed results
+        self._load_students()
+        self.data_version = version
+        self.results.clear()
+
+    def _refresh_live(self) -> None:
+        """Append rows inserted since the last load, or reload after deletes."""
+        count, max_id = self.conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM attendance").fetchone()
+        if self.live_ids is not None and count == self.live_count and max_id == self.live_max_id:
+            return
+
+        if self.live_ids is not None and max_id >= self.live_max_id:
+            rows = self.conn.execute("SELECT student_id, timestamp FROM attendance WHERE id > ?",
+                                     (self.live_max_id,)).fetchall()
+            if self.live_count + len(rows) == count:
+                ids, seconds = _to_arrays(rows)
+                self.live_ids = np.concatenate((self.live_ids, ids))
+                self.live_seconds = np.concatenate((self.live_seconds, seconds))
+                self.live_count, self.live_max_id = count, max_id
+                return
+
+        rows = self.conn.execute("SELECT student_id, timestamp FROM attendance").fetchall()
+        self.live_ids, self.live_seconds = _to_arrays(rows)
+        self.live_count, self.live_max_id = count, max_id
+
+    def _load_students(self) -> None:
+        """Names and roll numbers, falling back to archives for deleted students."""
+        students = {}
+        for path, _ in self.archive_key:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                for student_id, name, roll_number in conn.execute("SELECT id, name, roll_number FROM students"):
+                    students[student_id] = (name, roll_number)
+            finally:
+                conn.close()
+
+        for student_id, name, roll_number in self.conn.execute("SELECT id, name, roll_number FROM students"):
+            students[student_id] = (name, roll_number)
+
+        self.students = students
+        self.current_students = np.array(
+            sorted(r[0] for r in self.conn.execute("SELECT id FROM students")), dtype=np.int32)
+
+    def _archive_arrays(self, path: str, mtime: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Load an archive file's attendance (cached until the file changes)."""
+        cached = self.archives.get(path)
+        if cached is None or cached[0] != mtime:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                rows = conn.execute("SELECT student_id, timestamp FROM attendance").fetchall()
+            finally:
+                conn.close()
+            cached = (mtime, *_to_arrays(rows))
+            self.archives[path] = cached
+        return cached[1], cached[2]
+
+    def _select(self, start_date: str, end_date: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Attendance (ids, seconds) within an inclusive date range across all sources."""
+        lo = int(np.datetime64(start_date, 's').astype(np.int64))
+        hi = int(np.datetime64(end_date, 's').astype(np.int64)) + SECONDS_PER_DAY
+
+        start, end = f"{start_date} 00:00:00", str(np.datetime64(hi, 's')).replace('T', ' ')
+        parts = [(self.live_ids, self.live_seconds)]
+        for path, mtime in self.archive_key:
+            period_start, period_end = self.archive_periods[path]
+            if period_start is None or (period_start < end and period_end > start):
+                parts.append(self._archive_arrays(path, mtime))
+
+        ids = []
+        seconds = []
+        for part_ids, part_seconds in parts:
+            mask = (part_seconds >= lo) & (part_seconds < hi)
+            ids.append(part_ids[mask])
+            seconds.append(part_seconds[mask])
+        return np.concatenate(ids), np.concatenate(seconds)
+
+    def _cached(self, key: tuple, compute):
+        """Return a cached result, refreshing data first (computes under the lock)."""
+        with self.lock:
+            self.refresh()
+            if key in self.results:
+                self.results.move_to_end(key)
+                return self.results[key]
+
+            result = compute()
+            self.results[key] = result
+            if len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+            return result
+
+    # ------------------------------------------------------------
+    # Core matrix
+    # ------------------------------------------------------------
+
+    def _matrix(self, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        Students x session-days presence and first-arrival matrices.
+
+        Session days are the days in range on which anyone was marked, so
+        weekends and holidays don't count as absences.
+        """
+        ids, seconds = self._select(start_date, end_date)
+        days = seconds // SECONDS_PER_DAY
+        time_of_day = seconds - days * SECONDS_PER_DAY
+
+        sessions = np.unique(days)
+        students = np.union1d(self.current_students, np.unique(ids))
+        n, m = len(students), len(sessions)
+
+        present = np.zeros((n, m), dtype=bool)
+        first_arrival = np.full((n, m), np.nan, dtype=np.float32)
+
+        if len(ids):
+            # Dense lookup tables are much cheaper than searchsorted per row
+            student_row = np.zeros(int(students[-1]) + 1, dtype=np.int64)
+            student_row[students] = np.arange(n)
+            session_col = np.zeros(int(sessions[-1] - sessions[0]) + 1, dtype=np.int64)
+            session_col[sessions - sessions[0]] = np.arange(m)
+            cell = student_row[ids] * m + session_col[days - sessions[0]]
+
+            # Sorting (cell, time) packed into one key puts each day's first arrival first
+            key = np.sort(cell * SECONDS_PER_DAY + time_of_day)
+            cell, time_of_day = np.divmod(key, SECONDS_PER_DAY)
+            first = np.empty(len(cell), dtype=bool)
+            first[0] = True
+            np.not_equal(cell[1:], cell[:-1], out=first[1:])
+
+            present.ravel()[cell[first]] = True
+            first_arrival.ravel()[cell[first]] = time_of_day[first]
+
+        return {
+            'students': students,
+            'sessions': sessions,
+            'present': present,
+            'first_arrival': first_arrival
+        }
+
+    @staticmethod
+    def _streaks(present: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Longest and current (ending on the last session) run of present days per row."""
+        n, m = present.shape
+        longest = np.zeros(n, dtype=np.int64)
+        current = np.zeros(n, dtype=np.int64)
+        if m == 0:
+            return longest, current
+
+        padded = np.zeros((n, m + 2), dtype=np.int8)
+        padded[:, 1:-1] = present
+        edges = np.diff(padded, axis=1)
+        start_rows, start_cols = np.nonzero(edges == 1)
+        _, end_cols = np.nonzero(edges == -1)
+
+        # Row-major order pairs each run's start with its end
+        lengths = end_cols - start_cols
+        np.maximum.at(longest, start_rows, lengths)
+        ongoing = end_cols == m
+        current[start_rows[ongoing]] = lengths[ongoing]
+        return longest, current
+
+    def _student_rows(self, start_date: str, end_date: str) -> Dict[str, Any]:
+        """Per-student arrays for a range (cached)."""
+        def compute():
+            matrix = self._matrix(start_date, end_date)
+            present = matrix['present']
+            sessions = len(matrix['sessions'])
+
+            days_present = present.sum(axis=1)
+            longest, current = self._streaks(present)
+            with np.errstate(invalid='ignore'):
+                rate = days_present / sessions if sessions else np.zeros(len(days_present))
+            arrivals = matrix['first_arrival']
+            has_arrival = days_present > 0
+            median_arrival = np.full(len(days_present), np.nan)
+            if has_arrival.any():
+                median_arrival[has_arrival] = np.nanmedian(arrivals[has_arrival], axis=1)
+
+            return dict(matrix, days_present=days_present, rate=rate, longest=longest,
+                        current=current, median_arrival=median_arrival)
+
+        return self._cached(('rows', start_date, end_date), compute)
+
+    def _student_dict(self, rows: Dict[str, Any], index: int) -> Dict[str, Any]:
+        student_id = int(rows['students'][index])
+        name, roll_number = self.students.get(student_id, (None, None))
+        return {
+            'student_id': student_id,
+            'name': name,
+            'roll_number': roll_number,
+            'days_present': int(rows['days_present'][index]),
+            'attendance_rate': round(float(rows['rate'][index]), 4),
+            'current_streak': int(rows['current'][index]),
+            'longest_streak': int(rows['longest'][index]),
+            'median_first_arrival': _format_time(rows['median_arrival'][index])
+        }
+
+    # ------------------------------------------------------------
+    # Public queries
+    # ------------------------------------------------------------
+
+    def student_summary(self, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        Attendance rate, streaks and median first arrival for every student.
+
+        Args:
+            start_date: First day, YYYY-MM-DD
+            end_date: Last day, inclusive
+
+        Returns:
+            Dict with session_days and a students list
+        """
+        def compute():
+            rows = self._student_rows(start_date, end_date)
+            return {
+                'from': start_date,
+                'to': end_date,
+                'session_days': len(rows['sessions']),
+                'students': [self._student_dict(rows, i) for i in range(len(rows['students']))]
+            }
+
+        return self._cached(('summary', start_date, end_date), compute)
+
+    def student_detail(self, student_id: int, start_date: str, end_date: str) -> Optional[Dict[str, Any]]:
+        """
+        One student's summary plus first arrival per session day.
+
+        Args:
+            student_id: Database ID
+            start_date: First day, YYYY-MM-DD
+            end_date: Last day, inclusive
+
+        Returns:
+            Dict or None if the student is unknown
+        """
+        rows = self._student_rows(start_date, end_date)
+        index = int(np.searchsorted(rows['students'], student_id))
+        if index >= len(rows['students']) or rows['students'][index] != student_id:
+            return None
+
+        dates = rows['sessions'].astype('datetime64[D]').astype(str).tolist()
+        detail = self._student_dict(rows, index)
+        detail['session_days'] = len(dates)
+        detail['days'] = [
+            {'date': date, 'present': bool(present), 'first_arrival': _format_time(arrival)}
+            for date, present, arrival in zip(dates, rows['present'][index], rows['first_arrival'][index])
+        ]
+        return detail
+
+    def arrival_distribution(self, start_date: str, end_date: str, bin_minutes: int = 15) -> Dict[str, Any]:
+        """
+        Histogram and percentiles of daily first-arrival times.
+
+        Args:
+            start_date: First day, YYYY-MM-DD
+            end_date: Last day, inclusive
+            bin_minutes: Histogram bin width
+
+        Returns:
+            Dict with bins ([{'time', 'count'}]) and p10/p50/p90
+        """
+        def compute():
+            arrivals = self._student_rows(start_date, end_date)['first_arrival']
+            arrivals = arrivals[~np.isnan(arrivals)]
+            width = bin_minutes * 60
+
+            if len(arrivals) == 0:
+                return {'from': start_date, 'to': end_date, 'arrivals': 0, 'bins': [], 'percentiles': {}}
+
+            first_bin = int(arrivals.min() // width)
+            counts = np.bincount((arrivals // width).astype(np.int64) - first_bin)
+            p10, p50, p90 = np.percentile(arrivals, [10, 50, 90])
+
+            return {
+                'from': start_date,
+                'to': end_date,
+                'arrivals': int(len(arrivals)),
+                'bin_minutes': bin_minutes,
+                'bins': [
+                    {'time': _format_time((first_bin + i) * width), 'count': int(count)}
+                    for i, count in enumerate(counts) if count
+                ],
+                'percentiles': {'p10': _format_time(p10), 'p50': _format_time(p50), 'p90': _format_time(p90)}
+            }
+
+        return self._cached(('arrivals', start_date, end_date, bin_minutes), compute)
+
+    def chronic_absence(self, start_date: str, end_date: str, threshold: float = 0.9) -> Dict[str, Any]:
+        """
+        Students attending less than a share of session days, worst first.
+
+        Args:
+            start_date: First day, YYYY-MM-DD
+            end_date: Last day, inclusive
+            threshold: Attendance rate below which a student is listed
+                (0.9 = missing 10% or more, the usual chronic-absence line)
+
+        Returns:
+            Dict with session_days and the students list
+        """
+        def compute():
+            rows = self._student_rows(start_date, end_date)
+            flagged = np.flatnonzero(rows['rate'] < threshold) if len(rows['sessions']) else np.zeros(0, int)
+            flagged = flagged[np.argsort(rows['rate'][flagged], kind='stable')]
+            return {
+                'from': start_date,
+                'to': end_date,
+                'threshold': threshold,
+                'session_days': len(rows['sessions']),
+                'students': [self._student_dict(rows, i) for i in flagged]
+            }
+
+        return self._cached(('chronic', start_date, end_date, threshold), compute)
+
+    def close(self) -> None:
+        """Close the read connection."""
+        self.conn.close()
@@ -0,0 +1,285 @@
+"""
+Attendance archive module.
+Moves closed months or terms out of the live database into separate archive
+files (<db>.archive.<label>.db) that export and stats still read.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+from .database import Database
+
+
+def archive_path(db_path: str, label: str) -> str:
+    """Path of the archive file for a label, next to the live database."""
+    db = Path(db_path)
+    return str(db.with_name(f"{db.stem}.archive.{label}.db"))
+
+
+def _create_archive_tables(conn: sqlite3.Connection, schema: str = "main") -> None:
+    """Archive schema: attendance (with device_id) plus the name/roll of every student it references."""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.students (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            roll_number TEXT NOT NULL
+        )
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.attendance (
+            id INTEGER PRIMARY KEY,
+            student_id INTEGER NOT NULL,
+            timestamp DATETIME NOT NULL,
+            device_id TEXT
+        )
+    """)
+    # Archives written before device_id was recorded
+    columns = {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info(attendance)")}
+    if 'device_id' not in columns:
+        conn.execute(f"ALTER TABLE {schema}.attendance ADD COLUMN device_id TEXT")
+    conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS {schema}.idx_attendance_timestamp
+        ON attendance (timestamp)
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.archive_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+
+
+def archive_files(db_path: str = "attendance.db") -> List[str]:
+    """Paths of the archive files belonging to a live database."""
+    db = Path(db_path)
+    return sorted(str(path) for path in db.parent.glob(f"{db.stem}.archive.*.db"))
+
+
+def list_archives(db_path: str = "attendance.db") -> List[Dict[str, Any]]:
+    """
+    Archive files belonging to a live database, oldest period first.
+
+    Args:
+        db_path: Path to the live database file
+
+    Returns:
+        List of dicts with path, label, start, end (exclusive) and records
+    """
+    db = Path(db_path)
+    archives = []
+
+    for path in map(Path, archive_files(db_path)):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM archive_meta").fetchall())
+            records = conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+        except sqlite3.Error:
+            continue
+        finally:
+            conn.close()
+
+        archives.append({
+            'path': str(path),
+            'label': path.name[len(f"{db.stem}.archive."):-len(".db")],
+            'start': meta.get('period_start'),
+            'end': meta.get('period_end'),
+            'records': records
+        })
+
+    return sorted(archives, key=lambda a: a['start'] or '')
+
+
+def attendance_sources(db_path: str = "attendance.db", start: Optional[str] = None,
+                       end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Databases holding attendance for a timestamp range.
+
+    Args:
+        db_path: Path to the live database file
+        start: First timestamp (inclusive), None for unbounded
+        end: Last timestamp (exclusive), None for unbounded
+
+    Returns:
+        Overlapping archives (oldest first) followed by the live database,
+        each as a dict with 'path' and 'archive' flag
+    """
+    sources = [
+        {'path': a['path'], 'archive': True}
+        for a in list_archives(db_path)
+        if a['start'] is not None
+        and (end is None or a['start'] < end) and (start is None or a['end'] > start)
+    ]
+    sources.append({'path': db_path, 'archive': False})
+    return sources
+
+
+def connect_source(source: Dict[str, Any]) -> sqlite3.Connection:
+    """Open an attendance source; archives are opened read-only."""
+    if source['archive']:
+        return sqlite3.connect(f"file:{source['path']}?mode=ro", uri=True, check_same_thread=False)
+    return Database(source['path']).conn
+
+
+def archive_range(db_path: str, start_date: str, end_date: str, label: Optional[str] = None,
+                  vacuum: bool = False) -> int:
+    """
+    Move attendance for a closed date range into an archive file.
+
+    Rows are copied and deleted in one transaction across the live and archive
+    databases, so a crash never loses or duplicates records. Archiving into an
+    existing label appends and widens its period.
+
+    Args:
+        db_path: Path to the live database file
+        start_date: First day, YYYY-MM-DD
+        end_date: Last day, inclusive
+        label: Archive name (default: start_date_end_date)
+        vacuum: Reclaim the freed space in the live database afterwards
+
+    Returns:
+        Number of records moved
+
+    Raises:
+        ValueError: If the range includes today or later (still open)
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y-%m-%d %H:%M:%S")
+    end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+    today = datetime.now().strftime("%Y-%m-%d 00:00:00")
+    if end <= start:
+        raise ValueError("End date is before start date")
+    if end > today:
+        raise ValueError("Only closed periods (ending before today) can be archived")
+
+    label = label or f"{start_date}_{end_date}"
+    db = Database(db_path)
+    conn = db.conn
+    succeeded = False
+
+    try:
+        conn.execute("ATTACH DATABASE ? AS archive", (archive_path(db_path, label),))
+        _create_archive_tables(conn, "archive")
+        conn.commit()
+
+        conn.execute("""
+            INSERT OR IGNORE INTO archive.students (id, name, roll_number)
+            SELECT id, name, roll_number FROM main.students
+            WHERE id IN (SELECT DISTINCT student_id FROM main.attendance
+                         WHERE timestamp >= ? AND timestamp < ?)
+        """, (start, end))
+        moved = conn.execute("""
+            INSERT INTO archive.attendance (id, student_id, timestamp, device_id)
+            SELECT id, student_id, timestamp, device_id FROM main.attendance
+            WHERE timestamp >= ? AND timestamp < ?
+        """, (start, end)).rowcount
+        conn.execute("DELETE FROM main.attendance WHERE timestamp >= ? AND timestamp < ?", (start, end))
+
+        meta = dict(conn.execute("SELECT key, value FROM archive.archive_meta").fetchall())
+        conn.executemany("INSERT OR REPLACE INTO archive.archive_meta (key, value) VALUES (?, ?)", [
+            ('period_start', min(start, meta.get('period_start', start))),
+            ('period_end', max(end, meta.get('period_end', end))),
+        ])
+        conn.commit()
+        succeeded = True
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        try:
+            conn.execute("DETACH DATABASE archive")
+        except sqlite3.OperationalError:
+            pass
+        try:
+            # Only after a committed move; a failed VACUUM must not hide it
+            if vacuum and succeeded:
+                conn.execute("VACUUM")
+        finally:
+            db.close()
+
+    return moved
+
+
+def archive_before(db_path: str, before_date: str, vacuum: bool = False) -> Dict[str, int]:
+    """
+    Archive all attendance before a date, one archive file per month.
+
+    Args:
+        db_path: Path to the live database file
+        before_date: First day to keep live, YYYY-MM-DD
+        vacuum: Reclaim the freed space in the live database afterwards
+
+    Returns:
+        {month label: records moved}
+
+    Raises:
+        ValueError: If the cutoff is after today (the current period is still open)
+    """
+    cutoff = datetime.strptime(before_date, "%Y-%m-%d")
+    # Checked once up front: failing on the last month would leave a partial archive
+    if cutoff > datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
+        raise ValueError("Only closed periods (ending before today) can be archived")
+
+    db = Database(db_path)
+    db.cursor.execute("SELECT MIN(timestamp) FROM attendance WHERE timestamp < ?",
+                      (cutoff.strftime("%Y-%m-%d %H:%M:%S"),))
+    oldest = db.cursor.fetchone()[0]
+    db.close()
+
+    moved = {}
+    if oldest is None:
+        return moved
+
+    month = datetime.strptime(oldest[:7], "%Y-%m")
+    while month < cutoff:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        last_day = min(next_month, cutoff) - timedelta(days=1)
+        count = archive_range(db_path, month.strftime("%Y-%m-%d"), last_day.strftime("%Y-%m-%d"),
+                              label=month.strftime("%Y-%m"))
+        if count:
+            moved[month.strftime("%Y-%m")] = count
+        month = next_month
+
+    if vacuum and moved:
+        db = Database(db_path)
+        db.conn.execute("VACUUM")
+        db.close()
+
+    return moved
+
+
+def daily_counts(db_path: str = "attendance.db", days: int = 7) -> List[Dict[str, Any]]:
+    """
+    Students present per day for the most recent days with attendance,
+    reading archives when the live database holds fewer days.
+
+    Args:
+        db_path: Path to the live database file
+        days: Number of days to return
+
+    Returns:
+        List of {'date', 'count'}, newest first
+    """
+    counts = {}
+
+    # Newest source first; stop once enough days have been found
+    for source in reversed(attendance_sources(db_path)):
+        conn = connect_source(source)
+        try:
+            rows = conn.execute("""
+                SELECT DATE(timestamp) as date, COUNT(DISTINCT student_id) as count
+                FROM attendance
+                GROUP BY DATE(timestamp)
+                ORDER BY date DESC
+                LIMIT ?
+            """, (days,)).fetchall()
+        finally:
+            conn.close()
+
+        for date, count in rows:
+            counts[date] = counts.get(date, 0) + count
+        if len(counts) >= days:
+            break
+
+    return [{'date': date, 'count': counts[date]} for date in sorted(counts, reverse=True)[:days]]
@@ -0,0 +1,165 @@
+"""
+Gallery audit module.
+Finds students who may be the same person enrolled under different roll numbers.
+"""
+
+import numpy as np
+from typing import Optional, List, Dict, Any, Tuple, Iterator
+from .database import Database
+from .gallery import Gallery, pack_encodings
+
+
+# Encodings closer than this are treated as the same face (matching uses 0.5)
+DUPLICATE_THRESHOLD = 0.4
+
+
+def close_pairs(a: np.ndarray, b: Optional[np.ndarray] = None,
+                threshold: float = DUPLICATE_THRESHOLD,
+                block_size: int = 1024) -> Iterator[Tuple[int, int, float]]:
+    """
+    Find all encoding pairs closer than a threshold, one block at a time.
+
+    Distances come from ||x||^2 + ||y||^2 - 2 x.y over block_size x block_size
+    tiles, so memory stays at a few MB regardless of gallery size.
+
+    Args:
+        a: (N, 128) encodings
+        b: (M, 128) encodings to compare against; None compares a with
+            itself and yields each unordered pair once (i < j)
+        threshold: Maximum distance to report
+        block_size: Rows per tile
+
+    Yields:
+        Tuples of (index in a, index in b, distance)
+    """
+    same = b is None
+    b = a if same else b
+    a_norms = np.einsum('ij,ij->i', a, a)
+    b_norms = a_norms if same else np.einsum('ij,ij->i', b, b)
+    limit = threshold ** 2
+
+    for i0 in range(0, len(a), block_size):
+        a_block = a[i0:i0 + block_size]
+        a_block_norms = a_norms[i0:i0 + block_size, None]
+
+        # For self-comparison only the upper triangle of tiles is needed
+        for j0 in range(i0 if same else 0, len(b), block_size):
+            squared = a_block_norms + b_norms[None, j0:j0 + block_size] - 2.0 * (a_block @ b[j0:j0 + block_size].T)
+
+            if same and j0 == i0:
+                # Diagonal tile: keep strictly upper-triangular pairs
+                squared[np.tril_indices(len(squared), k=0, m=squared.shape[1])] = np.inf
+
+            rows, cols = np.nonzero(squared < limit)
+            for r, c in zip(rows, cols):
+                yield i0 + int(r), j0 + int(c), float(np.sqrt(max(squared[r, c], 0.0)))
+
+
+def cluster_pairs(count: int, pairs: List[Tuple[int, int, float]]) -> List[List[int]]:
+    """
+    Group indices connected by close pairs (union-find).
+
+    Args:
+        count: Number of indices
+        pairs: (i, j, distance) tuples
+
+    Returns:
+        Clusters with two or more members, largest first
+    """
+    parent = list(range(count))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j, _ in pairs:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[root_j] = root_i
+
+    groups = {}
+    for i, j, _ in pairs:
+        for index in (i, j):
+            groups.setdefault(find(index), set()).add(index)
+
+    return sorted((sorted(g) for g in groups.values()), key=len, reverse=True)
+
+
+def audit_duplicates(db_path: str = "attendance.db", threshold: float = DUPLICATE_THRESHOLD,
+                     block_size: int = 1024) -> Dict[str, Any]:
+    """
+    Report clusters of suspiciously similar students across the whole gallery.
+
+    Args:
+        db_path: Path to database file
+        threshold: Maximum encoding distance to flag
+        block_size: Tile size for the pairwise computation
+
+    Returns:
+        Report dict with clusters of students and their close pairs
+    """
+    db = Database(db_path)
+    students = db.get_all_students()
+    db.close()
+
+    encodings = pack_encodings([encoding for _, _, _, encoding in students])
+    pairs = list(close_pairs(encodings, threshold=threshold, block_size=block_size))
+
+    clusters = []
+    for members in cluster_pairs(len(students), pairs):
+        member_set = set(members)
+        clusters.append({
+            'students': [
+                {'id': students[i][0], 'name': students[i][1], 'roll_number': students[i][2]}
+                for i in members
+            ],
+            'pairs': [
+                {'a': students[i][2], 'b': students[j][2], 'distance': round(d, 4)}
+                for i, j, d in pairs if i in member_set
+            ]
+        })
+
+    return {
+        'students_total': len(students),
+        'threshold': threshold,
+        'suspicious_pairs': len(pairs),
+        'clusters': clusters
+    }
+
+
+def find_nearest_student(gallery: Gallery, encoding: np.ndarray) -> Optional[Tuple[int, str, float]]:
+    """
+    Closest existing student to a new encoding (same matcher as recognition).
+
+    Args:
+        gallery: Gallery of existing students
+        encoding: Candidate student's encoding
+
+    Returns:
+        Tuple of (student_id, name, distance) or None if the gallery is empty
+    """
+    index, distance = gallery.best_match(encoding)
+    if index is None:
+        return None
+    return gallery.student_ids[index], gallery.names[index], distance
+
+
+def print_audit_report(report: Dict[str, Any]) -> None:
+    """Print a human-readable duplicate audit report."""
+    print(f"\n{'='*50}")
+    print("DUPLICATE IDENTITY AUDIT")
+    print(f"{'='*50}")
+    print(f"Students checked:  {report['students_total']}")
+    print(f"Threshold:         {report['threshold']}")
+    print(f"Suspicious pairs:  {report['suspicious_pairs']}")
+    print(f"Clusters:          {len(report['clusters'])}")
+
+    for number, cluster in enumerate(report['clusters'], start=1):
+        print(f"\n  Cluster {number}:")
+        for student in cluster['students']:
+            print(f"    {student['roll_number']:15s} - {student['name']}")
+        for pair in cluster['pairs']:
+            print(f"      {pair['a']} <-> {pair['b']}: {pair['distance']:.3f}")
+    print(f"{'='*50}\n")
@@ -0,0 +1,260 @@
+"""
+Bulk enrollment module.
+Registers many students offline from folders of photos or a CSV manifest.
+"""
+
+import csv
+import os
+import time
+import multiprocessing
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Callable
+from .database import Database
+from .audit import DUPLICATE_THRESHOLD, close_pairs
+from .gallery import pack_encodings
+from .lazy import lazy_import
+
+# dlib and its models load on first use, not at import
+face_recognition = lazy_import('face_recognition')
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Reject reasons
+NO_FACE = 'no_face'
+MULTIPLE_FACES = 'multiple_faces'
+UNREADABLE = 'unreadable'
+
+
+def load_manifest(source: str) -> "OrderedDict[str, Dict[str, Any]]":
+    """
+    Collect students and their photos from a directory tree or CSV manifest.
+
+    Directory layout: one sub-folder per student named ``<roll_number>_<name>``
+    (or just ``<roll_number>``), containing that student's photos.
+    CSV manifest: columns ``roll_number,name,image_path`` with one row per
+    photo; relative paths are resolved against the CSV's folder.
+
+    Args:
+        source: Directory path or .csv file path
+
+    Returns:
+        Ordered dict: {roll_number: {'name': str, 'images': [paths]}}
+    """
+    students = OrderedDict()
+
+    if source.lower().endswith('.csv'):
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, newline='') as f:
+            for row in csv.DictReader(f):
+                roll_number = row['roll_number'].strip()
+                image_path = row['image_path'].strip()
+                if not os.path.isabs(image_path):
+                    image_path = os.path.join(base_dir, image_path)
+                entry = students.setdefault(roll_number, {
+                    'name': (row.get('name') or roll_number).strip(),
+                    'images': []
+                })
+                entry['images'].append(image_path)
+        return students
+
+    for folder in sorted(os.listdir(source)):
+        folder_path = os.path.join(source, folder)
+        if not os.path.isdir(folder_path):
+            continue
+
+        roll_number, _, name = folder.partition('_')
+        images = [
+            os.path.join(folder_path, f) for f in sorted(os.listdir(folder_path))
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        students[roll_number] = {
+            'name': name.replace('_', ' ').strip() or roll_number,
+            'images': images
+        }
+
+    return students
+
+
+def encode_image(task: Tuple[str, str, int]) -> Tuple[str, str, Optional[str], Optional[np.ndarray]]:
+    """
+    Detect and encode the single face in one photo (runs in a worker process).
+
+    Args:
+        task: Tuple of (roll_number, image_path, max_dimension)
+
+    Returns:
+        Tuple of (roll_number, image_path, reject reason or None, encoding or None)
+    """
+    roll_number, image_path, max_dimension = task
+
+    image = cv2.imread(image_path)
+    if image is None:
+        return roll_number, image_path, UNREADABLE, None
+
+    # Downscale large photos; HOG cost grows with pixel count
+    height, width = image.shape[:2]
+    scale = max_dimension / max(height, width)
+    if scale < 1:
+        image = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    face_locations = face_recognition.face_locations(image, model='hog')
+
+    if len(face_locations) == 0:
+        return roll_number, image_path, NO_FACE, None
+    if len(face_locations) > 1:
+        return roll_number, image_path, MULTIPLE_FACES, None
+
+    face_encodings = face_recognition.face_encodings(image, face_locations)
+    if len(face_encodings) == 0:
+        return roll_number, image_path, NO_FACE, None
+
+    return roll_number, image_path, None, face_encodings[0]
+
+
+def bulk_enroll(source: str, db_path: str = "attendance.db",
+                workers: Optional[int] = None, min_samples: int = 1,
+                max_dimension: int = 800,
+                duplicate_threshold: Optional[float] = DUPLICATE_THRESHOLD,
+                progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """
+    Enroll all students found in a directory tree or CSV manifest.
+
+    Photos are encoded in parallel across processes; each student's valid
+    samples are averaged exactly like StudentRegistration.register_student,
+    and all students are inserted in one transaction.
+
+    Args:
+        source: Directory path or .csv manifest
+        db_path: Path to database file
+        workers: Worker processes (default: CPU count)
+        min_samples: Minimum valid photos required per student
+        max_dimension: Photos are downscaled so their longest side fits this
+        duplicate_threshold: Students closer than this to an already enrolled
+            student, or to another student in the same batch, are not
+            inserted (None disables the check)
+        progress: Optional callback(images_done, images_total)
+
+    Returns:
+        Report dict with totals and per-student rejects
+    """
+    started = time.time()
+    manifest = load_manifest(source)
+
+    tasks = [
+        (roll_number, image_path, max_dimension)
+        for roll_number, entry in manifest.items()
+        for image_path in entry['images']
+    ]
+    encodings = {roll_number: [] for roll_number in manifest}
+    rejects = {roll_number: [] for roll_number in manifest}
+
+    workers = workers or os.cpu_count() or 1
+    print(f"Encoding {len(tasks)} photos of {len(manifest)} students with {workers} workers...")
+
+    # 'spawn' so it is also safe from the multithreaded engine process
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes=workers) as pool:
+        chunksize = max(1, len(tasks) // (workers * 8))
+        for done, (roll_number, image_path, reason, encoding) in enumerate(
+                pool.imap_unordered(encode_image, tasks, chunksize=chunksize), start=1):
+            if reason is None:
+                encodings[roll_number].append(encoding)
+            else:
+                rejects[roll_number].append({'image': image_path, 'reason': reason})
+            if progress is not None:
+                progress(done, len(tasks))
+
+    to_add = []
+    report_students = []
+    for roll_number, entry in manifest.items():
+        samples = encodings[roll_number]
+        status = 'enrolled'
+        if len(samples) < min_samples:
+            status = 'insufficient_samples'
+        else:
+            # Average the encodings (same as live registration)
+            to_add.append((entry['name'], roll_number, np.mean(samples, axis=0)))
+
+        report_students.append({
+            'roll_number': roll_number,
+            'name': entry['name'],
+            'status': status,
+            'samples': len(samples),
+            'rejects': rejects[roll_number]
+        })
+
+    db = Database(db_path)
+
+    if duplicate_threshold is not None and to_add:
+        # One blocked batch-vs-gallery pass instead of a lookup per student
+        enrolled = db.get_all_students()
+        batch = pack_encodings([s[2] for s in to_add])
+        candidates = [(i, enrolled[j][2], distance) for i, j, distance
+                      in close_pairs(batch, pack_encodings([s[3] for s in enrolled]),
+                                     threshold=duplicate_threshold)]
+        # ...and one within the batch: neither of two look-alikes is inserted,
+        # since nothing says which photo folder is the right one
+        for i, j, distance in close_pairs(batch, threshold=duplicate_threshold):
+            candidates.append((i, to_add[j][1], distance))
+            candidates.append((j, to_add[i][1], distance))
+
+        matches = {}
+        for i, matched_roll, distance in candidates:
+            # A re-run matching its own enrolled entry is reported as already_exists
+            if matched_roll == to_add[i][1]:
+                continue
+            if i not in matches or distance < matches[i][1]:
+                matches[i] = (matched_roll, distance)
+
+        by_roll = {s['roll_number']: s for s in report_students}
+        for i, (matched_roll, distance) in matches.items():
+            student = by_roll[to_add[i][1]]
+            student['status'] = 'possible_duplicate'
+            student['duplicate_of'] = {'roll_number': matched_roll, 'distance': round(distance, 4)}
+        to_add = [s for s in to_add if by_roll[s[1]]['status'] == 'enrolled']
+
+    added, existing = db.add_students_bulk(to_add, samples=encodings)
+    db.close()
+
+    existing = set(existing)
+    for student in report_students:
+        if student['roll_number'] in existing:
+            student['status'] = 'already_exists'
+
+    elapsed = time.time() - started
+    return {
+        'students_total': len(manifest),
+        'students_enrolled': added,
+        'students_failed': len(manifest) - added,
+        'images_total': len(tasks),
+        'images_rejected': sum(len(r) for r in rejects.values()),
+        'elapsed_seconds': round(elapsed, 1),
+        'students_per_minute': round(len(manifest) / elapsed * 60, 1) if elapsed > 0 else None,
+        'students': report_students
+    }
+
+
+def print_enroll_report(report: Dict[str, Any]) -> None:
+    """Print a human-readable summary of a bulk enrollment report."""
+    print(f"\n{'='*50}")
+    print("BULK ENROLLMENT REPORT")
+    print(f"{'='*50}")
+    print(f"Students enrolled: {report['students_enrolled']}/{report['students_total']}")
+    print(f"Photos rejected:   {report['images_rejected']}/{report['images_total']}")
+    print(f"Elapsed:           {report['elapsed_seconds']}s "
+          f"({report['students_per_minute']} students/min)")
+
+    for student in report['students']:
+        if student['status'] != 'enrolled' or student['rejects']:
+            print(f"  {student['roll_number']:15s} {student['status']:22s} "
+                  f"samples={student['samples']} rejects={len(student['rejects'])}")
+            if 'duplicate_of' in student:
+                print(f"      looks like {student['duplicate_of']['roll_number']} "
+                      f"(distance {student['duplicate_of']['distance']:.3f})")
+            for reject in student['rejects']:
+                print(f"      {reject['reason']:15s} {reject['image']}")
+    print(f"{'='*50}\n")
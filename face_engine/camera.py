@@ -3,27 +3,249 @@ Camera module for video capture and frame processing.
 Optimized for Raspberry Pi 5 with performance considerations.
 """
 
+import json
+import math
+import os
+import sys
 import cv2
 import numpy as np
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List, Dict, Any
+
+
+DEFAULT_CAMERA_CONFIG = "cameras.json"
+
+
+class FramePool:
+    """Small pool of reusable frame buffers.
+
+    A buffer is handed out again only once nobody else references it (the
+    preview, a registration tap, a worker thread or a view into it all keep
+    it alive), so frames passed on are never overwritten while in use. When
+    every pooled buffer is busy a fresh, unpooled array is returned.
+    """
+    
+    def __init__(self, size: int = 4):
+        """
+        Initialize frame pool.
+        
+        Args:
+            size: Maximum number of pooled buffers (0 disables reuse)
+        """
+        self.size = size
+        self.buffers = []
+        self.allocations = 0
+    
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Get a buffer that is not referenced outside the pool.
+        
+        Args:
+            shape: Array shape
+            dtype: Array dtype
+            
+        Returns:
+            Uninitialized array of the requested shape
+        """
+        for index in range(len(self.buffers)):
+            buffer = self.buffers[index]
+            # References: the pool list, this local and getrefcount's argument
+            if sys.getrefcount(buffer) > 3:
+                continue
+            if buffer.shape == shape and buffer.dtype == dtype:
+                return buffer
+            # Free but stale (resolution changed): drop it
+            del self.buffers[index]
+            break
+        
+        buffer = np.empty(shape, dtype=dtype)
+        self.allocations += 1
+        if len(self.buffers) < self.size:
+            self.buffers.append(buffer)
+        return buffer
+
+
+class RegionOfInterest:
+    """Parts of the frame where faces are looked for (e.g. the doorway).
+
+    Shapes are rectangles {"rect": [x, y, width, height]} or polygons
+    {"polygon": [[x, y], ...]} in pixels. The detector runs only on the
+    bounding box of all shapes; faces centred outside every shape are then
+    dropped, so polygons add no detector cost.
+    """
+    
+    def __init__(self, shapes: List[Dict[str, Any]]):
+        """
+        Initialize region of interest.
+        
+        Args:
+            shapes: Rectangles and/or polygons in full-frame pixels
+            
+        Raises:
+            ValueError: If a shape is malformed or none is given
+        """
+        polygons = []
+        for shape in shapes:
+            if 'rect' in shape and len(shape['rect']) == 4:
+                x, y, w, h = shape['rect']
+                points = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+            elif 'polygon' in shape and len(shape['polygon']) >= 3:
+                points = shape['polygon']
+            else:
+                raise ValueError(f"Malformed ROI shape: {shape}")
+            polygons.append(np.asarray(points, dtype=np.float32).reshape(-1, 2))
+        
+        if not polygons:
+            raise ValueError("A region of interest needs at least one shape")
+        
+        self.shapes = list(shapes)
+        self.polygons = polygons
+    
+    def scaled(self, factor: float) -> 'RegionOfInterest':
+        """The same region in a frame resized by factor (e.g. the detection frame)."""
+        return RegionOfInterest([{'polygon': (polygon * factor).tolist()} for polygon in self.polygons])
+    
+    def crop_box(self, frame_shape: Tuple[int, ...], scale_factor: float = 1.0) -> Tuple[int, int, int, int]:
+        """
+        Bounding box of all shapes, clipped to the frame.
+        
+        Args:
+            frame_shape: Shape of the frame the region applies to
+            scale_factor: Detection scale; edges snap to whole detection pixels
+            
+        Returns:
+            Tuple of (x0, y0, x1, y1), end exclusive
+        """
+        height, width = frame_shape[:2]
+        points = np.concatenate(self.polygons)
+        step = max(1, round(1 / scale_factor))
+        x0 = max(0, int(points[:, 0].min()) // step * step)
+        y0 = max(0, int(points[:, 1].min()) // step * step)
+        x1 = min(width, math.ceil(points[:, 0].max() / step) * step)
+        y1 = min(height, math.ceil(points[:, 1].max() / step) * step)
+        if x1 <= x0 or y1 <= y0:
+            return 0, 0, width, height
+        return x0, y0, x1, y1
+    
+    def coverage(self, frame_shape: Tuple[int, ...], scale_factor: float = 1.0) -> float:
+        """Fraction of the frame's pixels the detector still scans."""
+        x0, y0, x1, y1 = self.crop_box(frame_shape, scale_factor)
+        return (x1 - x0) * (y1 - y0) / float(frame_shape[0] * frame_shape[1])
+    
+    def contains(self, location: Tuple[int, int, int, int]) -> bool:
+        """Whether a (top, right, bottom, left) box is centred inside any shape."""
+        top, right, bottom, left = location
+        center = ((left + right) / 2.0, (top + bottom) / 2.0)
+        return any(cv2.pointPolygonTest(polygon, center, False) >= 0 for polygon in self.polygons)
+
+
+def load_camera_config(camera_index, path: str = DEFAULT_CAMERA_CONFIG) -> Dict[str, Any]:
+    """
+    Settings stored for one camera, e.g. {"roi": [shapes]}.
+    
+    Args:
+        camera_index: Camera index or source, as passed to Camera
+        path: JSON file mapping camera index to settings
+        
+    Returns:
+        Settings dict (empty if the file or camera entry does not exist)
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get(str(camera_index), {})
+
+
+def load_roi(camera_index, path: str = DEFAULT_CAMERA_CONFIG) -> Optional[RegionOfInterest]:
+    """Region of interest configured for a camera, or None to scan the whole frame."""
+    shapes = load_camera_config(camera_index, path).get('roi')
+    return RegionOfInterest(shapes) if shapes else None
+
+
+def save_camera_config(camera_index, settings: Dict[str, Any], path: str = DEFAULT_CAMERA_CONFIG) -> None:
+    """
+    Store settings for one camera, keeping the other cameras' entries.
+    
+    Args:
+        camera_index: Camera index or source
+        settings: Settings dict (an empty dict removes the camera's entry)
+        path: JSON file mapping camera index to settings
+    """
+    config = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            config = json.load(f)
+    
+    if settings:
+        config[str(camera_index)] = settings
+    else:
+        config.pop(str(camera_index), None)
+    
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp_path, path)
 
 
 class Camera:
     """Manages USB camera capture and frame preprocessing."""
     
-    def __init__(self, camera_index: int = 0, scale_factor: float = 0.25):
+    def __init__(self, camera_index: int = 0, scale_factor: float = 0.25,
+                 capture_mode: str = 'grab', fourcc: Optional[str] = None,
+                 buffer_size: Optional[int] = None, backend: Optional[int] = None,
+                 reuse_buffers: bool = True, roi: Optional[RegionOfInterest] = None,
+                 width: int = 640, height: int = 480, fps: int = 30,
+                 process_every_n_frames: int = 5):
         """
         Initialize camera capture.
         
         Args:
-            camera_index: USB camera device index (default 0)
+            camera_index: USB camera device index (default 0), or a video file/URL
             scale_factor: Frame scaling factor for performance (default 0.25 = 1/4 size)
+            capture_mode: 'grab' decodes only frames that are used (grab() every
+                frame, retrieve() on demand); 'read' decodes every frame
+            fourcc: Pixel format to request from the device, e.g. 'MJPG' or 'YUYV'
+            buffer_size: Frames the driver may queue (1 = always the newest frame)
+            backend: OpenCV capture API, e.g. cv2.CAP_V4L2 (default: auto)
+            reuse_buffers: Decode, resize and convert into pooled buffers
+                instead of allocating new arrays for every frame
+            roi: Only this part of the frame is scaled down for detection
+            width: Requested frame width
+            height: Requested frame height
+            fps: Requested frame rate
+            process_every_n_frames: Recognize at most every Nth frame
         """
+        if capture_mode not in ('grab', 'read'):
+            raise ValueError(f"Unsupported capture mode: {capture_mode}")
+        
         self.camera_index = camera_index
         self.scale_factor = scale_factor
+        self.capture_mode = capture_mode
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.backend = backend
         self.cap = None
         self.frame_count = 0
-        self.process_every_n_frames = 5
+        self.frames_decoded = 0
+        self.last_read_ok = False
+        self.process_every_n_frames = process_every_n_frames
+        self.width = width
+        self.height = height
+        self.fps = fps
+        
+        # Display and detection frames leave the camera, so they come from
+        # pools; the resized BGR intermediate never does and is reused as is
+        pool_size = 4 if reuse_buffers else 0
+        self.frame_pool = FramePool(pool_size)
+        self.small_pool = FramePool(pool_size)
+        self.small_bgr = None
+        self.scratch_allocations = 0
+        self.frame_shape = None
+        
+        # Detection frames are cut to the ROI's bounding box; detection_origin
+        # is the crop's (top, left) in the full detection frame
+        self.roi = roi
+        self.detection_region = roi.scaled(scale_factor) if roi is not None else None
+        self.detection_origin = (0, 0)
         
     def start(self) -> bool:
         """
@@ -32,51 +254,152 @@ class Camera:
         Returns:
             True if camera opened successfully, False otherwise
         """
-        self.cap = cv2.VideoCapture(self.camera_index)
+        if self.backend is None:
+            self.cap = cv2.VideoCapture(self.camera_index)
+        else:
+            self.cap = cv2.VideoCapture(self.camera_index, self.backend)
         
         if not self.cap.isOpened():
             print(f"✗ Error: Could not open camera {self.camera_index}")
             return False
         
+        # Pixel format first: it determines which sizes/rates the device offers
+        if self.fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        
         # Set camera properties for better performance
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        
+        if self.buffer_size is not None:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
         
         print(f"✓ Camera {self.camera_index} started successfully")
+        
+        if self.roi is not None:
+            frame_shape = (int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or self.height,
+                           int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or self.width)
+            print(f"✓ Region of interest: detector scans {self.roi.coverage(frame_shape, self.scale_factor):.0%} of the frame")
         return True
     
-    def read_frame(self) -> Tuple[bool, Optional[np.ndarray], Optional[np.ndarray]]:
+    def set_capture_format(self, width: int, height: int, fps: int) -> None:
+        """
+        Change the requested frame size and rate, on the open device too.
+        
+        Decode buffers follow the new size on the next frame.
+        
+        Args:
+            width: Frame width
+            height: Frame height
+            fps: Frame rate
+        """
+        self.width, self.height, self.fps = width, height, fps
+        if self.cap is not None and self.cap.isOpened():
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+            print(f"✓ Camera {self.camera_index} capture set to {width}x{height}@{fps}")
+    
+    def set_scale_factor(self, scale_factor: float) -> None:
+        """Change the detection scale; the ROI is rescaled to match."""
+        self.detection_region = self.roi.scaled(scale_factor) if self.roi is not None else None
+        self.scale_factor = scale_factor
+    
+    def read_frame(self, need_display: bool = True,
+                   need_process: bool = True) -> Tuple[bool, Optional[np.ndarray], Optional[np.ndarray]]:
         """
         Read and process a frame from camera.
         
+        In 'grab' mode a frame that is neither processed nor displayed is only
+        grabbed, never decoded; display_frame is then None while last_read_ok
+        stays True.
+        
+        Args:
+            need_display: Caller uses the full-size frame (preview, GUI)
+            need_process: Caller wants a detection frame if this one is due
+        
         Returns:
             Tuple of (should_process, display_frame, small_frame)
             - should_process: Whether this frame should be processed (every 5th frame)
             - display_frame: Original frame for display
             - small_frame: Scaled down frame for face detection
         """
+        self.last_read_ok = False
         if self.cap is None or not self.cap.isOpened():
             return False, None, None
         
-        ret, frame = self.cap.read()
-        if not ret:
-            return False, None, None
+        if self.capture_mode == 'grab':
+            if not self.cap.grab():
+                return False, None, None
+            frame = None
+        else:
+            frame = self._decode(grabbed=False)
+            if frame is None:
+                return False, None, None
         
+        self.last_read_ok = True
         self.frame_count += 1
         
         # Process only every Nth frame
-        should_process = (self.frame_count % self.process_every_n_frames == 0)
+        should_process = need_process and (self.frame_count % self.process_every_n_frames == 0)
+        
+        if frame is None:
+            if not (should_process or need_display):
+                return False, None, None
+            
+            # Decode only now that the frame is actually needed
+            frame = self._decode(grabbed=True)
+            if frame is None:
+                self.last_read_ok = False
+                return False, None, None
         
         # Create small frame for face detection
-        small_frame = None
-        if should_process:
-            small_frame = cv2.resize(frame, (0, 0), fx=self.scale_factor, fy=self.scale_factor)
-            # Convert BGR to RGB for face_recognition library
-            small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        small_frame = self._detection_frame(frame) if should_process else None
         
         return should_process, frame, small_frame
     
+    def _decode(self, grabbed: bool) -> Optional[np.ndarray]:
+        """Decode the current frame into a pooled buffer (retrieve() after grab(), else read())."""
+        buffer = self.frame_pool.acquire(self.frame_shape) if self.frame_shape else None
+        ret, frame = self.cap.retrieve(buffer) if grabbed else self.cap.read(buffer)
+        if not ret:
+            return None
+        
+        if frame is not buffer:
+            # First frame or resolution change: OpenCV allocated, remember the size
+            self.frame_shape = frame.shape
+            self.frame_pool.allocations += 1
+        
+        self.frames_decoded += 1
+        return frame
+    
+    def _detection_frame(self, frame: np.ndarray, crop: bool = True) -> np.ndarray:
+        """Scaled-down RGB copy of a frame (or its ROI), written into reused buffers."""
+        if crop and self.roi is not None:
+            x0, y0, x1, y1 = self.roi.crop_box(frame.shape, self.scale_factor)
+            frame = frame[y0:y1, x0:x1]
+            self.detection_origin = (round(y0 * self.scale_factor), round(x0 * self.scale_factor))
+        
+        height, width = frame.shape[:2]
+        size = (max(1, round(width * self.scale_factor)), max(1, round(height * self.scale_factor)))
+        shape = (size[1], size[0], 3)
+        
+        if self.small_bgr is None or self.small_bgr.shape != shape or self.small_pool.size == 0:
+            self.small_bgr = np.empty(shape, dtype=np.uint8)
+            self.scratch_allocations += 1
+        cv2.resize(frame, size, dst=self.small_bgr)
+        
+        # Convert BGR to RGB for face_recognition library
+        small_frame = self.small_pool.acquire(shape)
+        cv2.cvtColor(self.small_bgr, cv2.COLOR_BGR2RGB, dst=small_frame)
+        return small_frame
+    
+    @property
+    def allocations(self) -> int:
+        """Frame-sized arrays allocated so far (decoded, resized and converted)."""
+        return self.frame_pool.allocations + self.small_pool.allocations + self.scratch_allocations
+    
     def capture_single_frame(self) -> Optional[np.ndarray]:
         """
         Capture a single frame (for registration).
@@ -87,13 +410,12 @@ class Camera:
         if self.cap is None or not self.cap.isOpened():
             return None
         
-        ret, frame = self.cap.read()
-        if not ret:
+        frame = self._decode(grabbed=False)
+        if frame is None:
             return None
         
-        # Convert to RGB and scale down
-        small_frame = cv2.resize(frame, (0, 0), fx=self.scale_factor, fy=self.scale_factor)
-        return cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        # Convert to RGB and scale down (the whole frame: registration ignores the ROI)
+        return self._detection_frame(frame, crop=False)
     
     def stop(self) -> None:
         """Release camera resources."""
@@ -0,0 +1,225 @@
+"""
+Configuration module.
+Typed runtime settings layered as built-in defaults < config file <
+ATTENDAI_* environment variables. Each setting declares whether a running
+engine can apply it hot or needs a restart.
+"""
+
+import json
+import math
+import os
+import threading
+from typing import Optional, Mapping, Dict, Any, List
+from .gallery import GALLERY_MODES, check_gallery_mode
+
+
+DEFAULT_CONFIG_PATH = os.environ.get('ATTENDAI_CONFIG', 'attendai.json')
+ENV_PREFIX = 'ATTENDAI_'
+
+
+class Setting:
+    """One typed, validated setting."""
+
+    def __init__(self, name: str, kind: type, default, hot: bool, help: str,
+                 minimum=None, maximum=None, choices: Optional[tuple] = None):
+        """
+        Initialize setting.
+
+        Args:
+            name: Setting name (also the file key; env var is ATTENDAI_<NAME>)
+            kind: float, int, bool or str
+            default: Built-in default
+            hot: True if a running engine applies it without a restart
+            help: One-line description
+            minimum: Smallest accepted value (numbers)
+            maximum: Largest accepted value (numbers)
+            choices: Accepted values (strings)
+        """
+        self.name = name
+        self.kind = kind
+        self.default = default
+        self.hot = hot
+        self.help = help
+        self.minimum = minimum
+        self.maximum = maximum
+        self.choices = choices
+
+    def parse(self, value):
+        """
+        Convert and validate a value (strings from the environment included).
+
+        Raises:
+            ValueError: If the value has the wrong type or is out of range
+        """
+        try:
+            if self.kind is bool:
+                if isinstance(value, str):
+                    if value.strip().lower() not in ('1', '0', 'true', 'false', 'yes', 'no', 'on', 'off'):
+                        raise ValueError
+                    value = value.strip().lower() in ('1', 'true', 'yes', 'on')
+                elif not isinstance(value, bool):
+                    raise ValueError
+            elif self.kind is int:
+                if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                    raise ValueError
+                value = int(value)
+            elif self.kind is float:
+                if isinstance(value, bool):
+                    raise ValueError
+                value = float(value)
+            else:
+                value = str(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{self.name} must be a {self.kind.__name__}, got {value!r}")
+
+        # nan compares false against any bound and inf would disable one
+        if self.kind is float and not math.isfinite(value):
+            raise ValueError(f"{self.name} must be a finite number, got {value!r}")
+
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f"{self.name} must be at least {self.minimum}")
+        if self.maximum is not None and value > self.maximum:
+            raise ValueError(f"{self.name} must be at most {self.maximum}")
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f"{self.name} must be one of {', '.join(self.choices)}")
+        return value
+
+
+SETTINGS = {setting.name: setting for setting in (
+    Setting('tolerance', float, 0.5, True, "Face match distance threshold (lower = stricter)",
+            minimum=0.1, maximum=1.0),
+    Setting('scale_factor', float, 0.25, True, "Detection frame size relative to the camera frame",
+            minimum=0.1, maximum=1.0),
+    Setting('process_every_n_frames', int, 5, True, "Recognize at most every Nth captured frame",
+            minimum=1),
+    Setting('process_interval', float, 3.0, True, "Minimum seconds between recognition passes",
+            minimum=0.0),
+    Setting('cooldown_seconds', float, 600.0, True, "Minimum seconds between two marks of a student",
+            minimum=0.0),
+    Setting('low_rate_interval', float, 15.0, True, "Seconds between passes in low-rate power mode",
+            minimum=0.0),
+    Setting('check_pose', bool, False, True, "Quality gate also rejects turned heads"),
+    Setting('serial_port', str, '/dev/ttyACM0', True, "Arduino serial port or pyserial URL"),
+    Setting('capture_width', int, 640, True, "Requested camera frame width", minimum=160),
+    Setting('capture_height', int, 480, True, "Requested camera frame height", minimum=120),
+    Setting('capture_fps', int, 30, True, "Requested camera frame rate", minimum=1, maximum=120),
+    Setting('camera_index', int, 0, False, "USB camera device index", minimum=0),
+    Setting('baudrate', int, 9600, False, "Arduino serial baud rate", minimum=300),
+    Setting('gallery_mode', str, 'float64', False, "Gallery representation",
+            choices=GALLERY_MODES),
+    Setting('multi_sample', bool, False, False, "Match every registration sample, not just the mean"),
+)}
+
+
+class Config:
+    """Current values of all settings and where each came from.
+
+    Updates are validated as a whole (nothing changes if one value is bad)
+    and written back to the config file, so they survive a restart unless
+    an environment variable pins the setting.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CONFIG_PATH,
+                 env: Optional[Mapping[str, str]] = None):
+        """
+        Load settings.
+
+        Args:
+            path: JSON config file (None = defaults and environment only,
+                updates are not persisted)
+            env: Environment to read ATTENDAI_* overrides from (default os.environ)
+
+        Raises:
+            ValueError: If the file or an environment variable holds an invalid value
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.file_values = {}
+        self.values = {name: setting.default for name, setting in SETTINGS.items()}
+        self.sources = dict.fromkeys(SETTINGS, 'default')
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                stored = json.load(f)
+            for name, value in stored.items():
+                if name not in SETTINGS:
+                    print(f"⚠ Ignoring unknown setting in {path}: {name}")
+                    continue
+                self.file_values[name] = self.values[name] = SETTINGS[name].parse(value)
+                self.sources[name] = 'file'
+
+        env = os.environ if env is None else env
+        for name, setting in SETTINGS.items():
+            raw = env.get(ENV_PREFIX + name.upper())
+            if raw is not None:
+                self.values[name] = setting.parse(raw)
+                self.sources[name] = 'env'
+
+        self._check(self.values)
+
+    def __getattr__(self, name: str):
+        values = self.__dict__.get('values', {})
+        if name in values:
+            return values[name]
+        raise AttributeError(name)
+
+    def update(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate and store new values.
+
+        Args:
+            changes: {setting name: new value}
+
+        Returns:
+            The changed settings with their parsed values (unchanged ones omitted)
+
+        Raises:
+            ValueError: If a setting is unknown or a value is invalid
+        """
+        if not isinstance(changes, dict) or not changes:
+            raise ValueError("Expected an object of settings to change")
+
+        unknown = [name for name in changes if name not in SETTINGS]
+        if unknown:
+            raise ValueError(f"Unknown setting: {', '.join(unknown)}")
+        parsed = {name: SETTINGS[name].parse(value) for name, value in changes.items()}
+
+        with self.lock:
+            self._check(dict(self.values, **parsed))
+            changed = {name: value for name, value in parsed.items() if self.values[name] != value}
+            for name, value in changed.items():
+                self.values[name] = value
+                self.file_values[name] = value
+                if self.sources[name] != 'env':
+                    self.sources[name] = 'file'
+            if changed and self.path:
+                self._save()
+        return changed
+
+    @staticmethod
+    def _check(values: Dict[str, Any]) -> None:
+        """Reject combinations of individually valid settings that cannot work together."""
+        check_gallery_mode(values['gallery_mode'], values['multi_sample'])
+
+    def _save(self) -> None:
+        """Write the file layer atomically (lock held)."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.file_values, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Every setting with its value, default, source, type and hot flag."""
+        with self.lock:
+            return [{
+                'name': name,
+                'value': self.values[name],
+                'default': setting.default,
+                'source': self.sources[name],
+                'type': setting.kind.__name__,
+                'hot': setting.hot,
+                'help': setting.help,
+                **({'minimum': setting.minimum} if setting.minimum is not None else {}),
+                **({'maximum': setting.maximum} if setting.maximum is not None else {}),
+                **({'choices': list(setting.choices)} if setting.choices is not None else {}),
+            } for name, setting in SETTINGS.items()]
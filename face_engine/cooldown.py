@@ -0,0 +1,110 @@
+"""
+Cooldown cache module.
+Bounded TTL cache that suppresses duplicate attendance marks.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Tuple, Optional
+
+
+class CooldownCache:
+    """Tracks when each student was last marked, evicting entries once they expire.
+
+    Every entry has the same TTL, so keeping the dict in mark order means the
+    oldest entry is always at the front and eviction is amortised O(1).
+
+    Entries are only ever evicted once expired: dropping one early would let
+    that student be marked twice within the window. max_size is therefore a
+    soft bound; the cache can only grow past it with more distinct students
+    marked within one TTL than it allows, which the gallery size caps anyway,
+    and a warning is printed when that happens.
+    """
+
+    def __init__(self, ttl_seconds: float = 600, max_size: int = 10000):
+        """
+        Initialize cooldown cache.
+
+        Args:
+            ttl_seconds: Cooldown window in seconds (default 10 minutes)
+            max_size: Expected maximum of students in cooldown at once
+                (warned about, not enforced; see above)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.entries = OrderedDict()  # {student_id: marked_at}
+        self.over_size = False
+        self.lock = threading.Lock()
+
+    def warm_start(self, marks: Iterable[Tuple[int, float]]) -> int:
+        """
+        Seed the cache from persisted marks (e.g. after a restart).
+
+        Args:
+            marks: Iterable of (student_id, marked_at epoch seconds)
+
+        Returns:
+            Number of students still in their cooldown window
+        """
+        now = time.time()
+        with self.lock:
+            for student_id, marked_at in sorted(marks, key=lambda mark: mark[1]):
+                if now - marked_at < self.ttl_seconds:
+                    self._set(student_id, marked_at)
+            self._check_size()
+            return len(self.entries)
+
+    def in_cooldown(self, student_id: int, now: Optional[float] = None) -> bool:
+        """
+        Check whether a student was marked within the cooldown window.
+
+        Args:
+            student_id: Student's database ID
+            now: Current epoch time (default time.time())
+
+        Returns:
+            True if the student should not be marked again yet
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            self._evict_expired(now)
+            return student_id in self.entries
+
+    def mark(self, student_id: int, now: Optional[float] = None) -> None:
+        """
+        Record that a student has just been marked.
+
+        Args:
+            student_id: Student's database ID
+            now: Mark time as epoch seconds (default time.time())
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            self._set(student_id, now)
+            self._evict_expired(now)
+            self._check_size()
+
+    def _set(self, student_id: int, marked_at: float) -> None:
+        """Insert at the young end (lock held)."""
+        self.entries.pop(student_id, None)
+        self.entries[student_id] = marked_at
+
+    def _check_size(self) -> None:
+        """Warn once each time the cache grows past max_size (lock held)."""
+        over_size = len(self.entries) > self.max_size
+        if over_size and not self.over_size:
+            print(f"⚠ Cooldown cache holds {len(self.entries)} students in their window "
+                  f"(max_size {self.max_size}); none are evicted early")
+        self.over_size = over_size
+
+    def _evict_expired(self, now: float) -> None:
+        """Drop expired entries from the old end (lock held)."""
+        while self.entries:
+            student_id, marked_at = next(iter(self.entries.items()))
+            if now - marked_at < self.ttl_seconds:
+                break
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -7,7 +7,7 @@ import sqlite3
 import pickle
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict
 from pathlib import Path
 
 
@@ -55,15 +55,89 @@ class Database:
             )
         """)
         
+        # Individual registration samples (the students row keeps the mean)
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS student_samples (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                student_id INTEGER NOT NULL,
+                encoding BLOB NOT NULL,
+                FOREIGN KEY (student_id) REFERENCES students(id)
+            )
+        """)
+        
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_student_samples_student
+            ON student_samples(student_id)
+        """)
+        
         # Create index for faster attendance queries
         self.cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_attendance_student_timestamp 
             ON attendance(student_id, timestamp)
         """)
         
+        # Time-range queries (today, recent marks) without scanning the table
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_attendance_timestamp
+            ON attendance(timestamp)
+        """)
+        
+        # Courses, who is enrolled in them and when/where they meet
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS courses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                code TEXT UNIQUE NOT NULL,
+                name TEXT NOT NULL
+            )
+        """)
+        
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS enrolments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                course_id INTEGER NOT NULL,
+                student_id INTEGER NOT NULL,
+                UNIQUE (course_id, student_id),
+                FOREIGN KEY (course_id) REFERENCES courses(id),
+                FOREIGN KEY (student_id) REFERENCES students(id)
+            )
+        """)
+        
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rooms (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL
+            )
+        """)
+        
+        # weekday 0 = Monday; start/end as HH:MM, end exclusive
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS timetable (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                course_id INTEGER NOT NULL,
+                room_id INTEGER NOT NULL,
+                weekday INTEGER NOT NULL,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                FOREIGN KEY (course_id) REFERENCES courses(id),
+                FOREIGN KEY (room_id) REFERENCES rooms(id)
+            )
+        """)
+        
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_timetable_room_weekday
+            ON timetable(room_id, weekday, start_time)
+        """)
+        
+        # Which classroom device reported a mark (NULL for local recognition);
+        # added in place so existing databases keep working
+        self.cursor.execute("PRAGMA table_info(attendance)")
+        if 'device_id' not in {row[1] for row in self.cursor.fetchall()}:
+            self.cursor.execute("ALTER TABLE attendance ADD COLUMN device_id TEXT")
+        
         self.conn.commit()
     
-    def add_student(self, name: str, roll_number: str, face_encoding: np.ndarray) -> bool:
+    def add_student(self, name: str, roll_number: str, face_encoding: np.ndarray,
+                    samples: Optional[List[np.ndarray]] = None) -> bool:
         """
         Add a new student with their face encoding.
         
@@ -71,6 +145,7 @@ class Database:
             name: Student's full name
             roll_number: Unique roll number
             face_encoding: 128-dimensional face encoding from face_recognition
+            samples: Individual sample encodings behind face_encoding (optional)
             
         Returns:
             True if successful, False if roll number already exists
@@ -84,6 +159,9 @@ class Database:
                 VALUES (?, ?, ?)
             """, (name, roll_number, encoding_blob))
             
+            if samples:
+                self._insert_samples(self.cursor.lastrowid, samples)
+            
             self.conn.commit()
             print(f"✓ Added student: {name} ({roll_number})")
             return True
@@ -95,18 +173,73 @@ class Database:
             print(f"✗ Database error: {e}")
             return False
     
-    def get_all_students(self) -> List[Tuple[int, str, str, np.ndarray]]:
+    def _insert_samples(self, student_id: int, samples: List[np.ndarray]) -> None:
+        """Store a student's individual sample encodings (caller commits)."""
+        self.cursor.executemany("""
+            INSERT INTO student_samples (student_id, encoding)
+            VALUES (?, ?)
+        """, [(student_id, pickle.dumps(sample)) for sample in samples])
+    
+    def add_students_bulk(self, students: List[Tuple[str, str, np.ndarray]],
+                          samples: Optional[Dict[str, List[np.ndarray]]] = None) -> Tuple[int, List[str]]:
+        """
+        Add many students in a single transaction.
+        
+        Args:
+            students: List of tuples: (name, roll_number, face_encoding)
+            samples: Optional {roll_number: [sample encodings]}
+            
+        Returns:
+            Tuple of (number added, roll numbers skipped because they already exist)
+        """
+        self.cursor.execute("SELECT roll_number FROM students")
+        existing = {row[0] for row in self.cursor.fetchall()}
+        
+        rows, skipped = [], []
+        for name, roll_number, face_encoding in students:
+            if roll_number in existing:
+                skipped.append(roll_number)
+                continue
+            existing.add(roll_number)
+            rows.append((name, roll_number, pickle.dumps(face_encoding)))
+        
+        try:
+            with self.conn:
+                self.cursor.executemany("""
+                    INSERT INTO students (name, roll_number, face_encoding)
+                    VALUES (?, ?, ?)
+                """, rows)
+                
+                if samples:
+                    self.cursor.execute("SELECT roll_number, id FROM students")
+                    ids = dict(self.cursor.fetchall())
+                    for _, roll_number, _ in rows:
+                        if samples.get(roll_number):
+                            self._insert_samples(ids[roll_number], samples[roll_number])
+        except Exception as e:
+            print(f"✗ Database error: {e}")
+            return 0, skipped
+        
+        print(f"✓ Added {len(rows)} students")
+        return len(rows), skipped
+    
+    def get_all_students(self, student_ids: Optional[List[int]] = None) -> List[Tuple[int, str, str, np.ndarray]]:
         """
         Retrieve all students with their face encodings.
         
+        Args:
+            student_ids: Only these students (default: everyone)
+        
         Returns:
             List of tuples: (id, name, roll_number, face_encoding)
         """
-        self.cursor.execute("""
-            SELECT id, name, roll_number, face_encoding
-            FROM students
-            ORDER BY roll_number
-        """)
+        query = "SELECT id, name, roll_number, face_encoding FROM students"
+        params = []
+        if student_ids is not None:
+            query += f" WHERE id IN ({','.join('?' * len(student_ids))})"
+            params = list(student_ids)
+        
+        self.cursor.execute(query + " ORDER BY roll_number", params)
         
         students = []
         for row in self.cursor.fetchall():
@@ -117,6 +250,254 @@ class Database:
         
         return students
     
+    def get_all_samples(self, student_ids: Optional[List[int]] = None) -> Dict[int, List[np.ndarray]]:
+        """
+        Retrieve every stored sample encoding, grouped by student.
+        
+        Args:
+            student_ids: Only these students (default: everyone)
+        
+        Returns:
+            Dict: {student_id: [sample encodings]}
+        """
+        query = "SELECT student_id, encoding FROM student_samples"
+        params = []
+        if student_ids is not None:
+            query += f" WHERE student_id IN ({','.join('?' * len(student_ids))})"
+            params = list(student_ids)
+        
+        self.cursor.execute(query + " ORDER BY student_id, id", params)
+        
+        samples = {}
+        for student_id, encoding_blob in self.cursor.fetchall():
+            samples.setdefault(student_id, []).append(pickle.loads(encoding_blob))
+        
+        return samples
+    
+    def get_students_signature(self) -> Tuple[int, int, int, int]:
+        """
+        Get a cheap fingerprint of the students and their samples.
+        
+        Returns:
+            Tuple of (student count, highest student ID, sample count,
+            highest sample ID); changes whenever students or registration
+            samples are added or deleted
+        """
+        self.cursor.execute("""
+            SELECT (SELECT COUNT(*) FROM students), (SELECT COALESCE(MAX(id), 0) FROM students),
+                   (SELECT COUNT(*) FROM student_samples), (SELECT COALESCE(MAX(id), 0) FROM student_samples)
+        """)
+        return tuple(self.cursor.fetchone())
+    
+    def get_schedule_signature(self) -> Tuple[int, int, int, int]:
+        """
+        Get a cheap fingerprint of enrolments and the timetable.
+        
+        Returns:
+            Tuple of (enrolment count, highest enrolment ID, slot count,
+            highest slot ID); changes whenever either table changes
+        """
+        self.cursor.execute("""
+            SELECT (SELECT COUNT(*) FROM enrolments), (SELECT COALESCE(MAX(id), 0) FROM enrolments),
+                   (SELECT COUNT(*) FROM timetable), (SELECT COALESCE(MAX(id), 0) FROM timetable)
+        """)
+        return tuple(self.cursor.fetchone())
+    
+    def add_course(self, code: str, name: str) -> Optional[int]:
+        """
+        Add a course, or rename it if the code exists.
+        
+        Args:
+            code: Unique course code (e.g. CS101)
+            name: Course title
+            
+        Returns:
+            Course ID, or None on error
+        """
+        try:
+            self.cursor.execute("""
+                INSERT INTO courses (code, name) VALUES (?, ?)
+                ON CONFLICT(code) DO UPDATE SET name = excluded.name
+            """, (code, name))
+            self.conn.commit()
+            return self.get_course_id(code)
+            
+        except Exception as e:
+            print(f"✗ Database error: {e}")
+            return None
+    
+    def get_course_id(self, code: str) -> Optional[int]:
+        """Get a course's database ID by code (None if unknown)."""
+        self.cursor.execute("SELECT id FROM courses WHERE code = ?", (code,))
+        result = self.cursor.fetchone()
+        return result[0] if result else None
+    
+    def get_courses(self) -> List[Tuple[int, str, str, int]]:
+        """
+        Retrieve all courses.
+        
+        Returns:
+            List of tuples: (id, code, name, enrolled students)
+        """
+        self.cursor.execute("""
+            SELECT c.id, c.code, c.name, COUNT(e.id)
+            FROM courses c
+            LEFT JOIN enrolments e ON e.course_id = c.id
+            GROUP BY c.id
+            ORDER BY c.code
+        """)
+        return self.cursor.fetchall()
+    
+    def set_enrolment(self, course_code: str, roll_numbers: List[str],
+                      enrolled: bool = True) -> Tuple[int, List[str]]:
+        """
+        Enrol students in a course, or remove them from it.
+        
+        Args:
+            course_code: Course code
+            roll_numbers: Students' roll numbers
+            enrolled: True to enrol, False to unenrol
+            
+        Returns:
+            Tuple of (enrolments added or removed, roll numbers not found)
+            
+        Raises:
+            ValueError: If the course does not exist
+        """
+        course_id = self.get_course_id(course_code)
+        if course_id is None:
+            raise ValueError(f"Unknown course: {course_code}")
+        
+        self.cursor.execute(f"""
+            SELECT roll_number, id FROM students
+            WHERE roll_number IN ({','.join('?' * len(roll_numbers))})
+        """, list(roll_numbers))
+        ids = dict(self.cursor.fetchall())
+        missing = [roll for roll in roll_numbers if roll not in ids]
+        
+        before = self.conn.total_changes
+        with self.conn:
+            if enrolled:
+                self.cursor.executemany("""
+                    INSERT OR IGNORE INTO enrolments (course_id, student_id) VALUES (?, ?)
+                """, [(course_id, student_id) for student_id in ids.values()])
+            else:
+                self.cursor.executemany("""
+                    DELETE FROM enrolments WHERE course_id = ? AND student_id = ?
+                """, [(course_id, student_id) for student_id in ids.values()])
+        
+        return self.conn.total_changes - before, missing
+    
+    def get_roster(self, course_id: int) -> List[int]:
+        """
+        Get the students enrolled in a course.
+        
+        Args:
+            course_id: Course's database ID
+            
+        Returns:
+            Student IDs
+        """
+        self.cursor.execute("""
+            SELECT student_id FROM enrolments WHERE course_id = ? ORDER BY student_id
+        """, (course_id,))
+        return [row[0] for row in self.cursor.fetchall()]
+    
+    def get_room_id(self, name: str) -> Optional[int]:
+        """Get a room's database ID by name (None if unknown)."""
+        self.cursor.execute("SELECT id FROM rooms WHERE name = ?", (name,))
+        result = self.cursor.fetchone()
+        return result[0] if result else None
+    
+    def add_timetable_slot(self, course_code: str, room: str, weekday: int,
+                           start_time: str, end_time: str) -> int:
+        """
+        Schedule a course in a room (the room is created if new).
+        
+        Args:
+            course_code: Course code
+            room: Room name
+            weekday: 0 = Monday ... 6 = Sunday
+            start_time: HH:MM
+            end_time: HH:MM, exclusive
+            
+        Returns:
+            Slot ID
+            
+        Raises:
+            ValueError: If the course is unknown or the room is already booked
+        """
+        course_id = self.get_course_id(course_code)
+        if course_id is None:
+            raise ValueError(f"Unknown course: {course_code}")
+        if end_time <= start_time:
+            raise ValueError("Slot must end after it starts")
+        
+        with self.conn:
+            self.cursor.execute("INSERT OR IGNORE INTO rooms (name) VALUES (?)", (room,))
+            room_id = self.get_room_id(room)
+            
+            # One course per room at a time, so the roster for a moment is unambiguous
+            self.cursor.execute("""
+                SELECT c.code, t.start_time, t.end_time
+                FROM timetable t JOIN courses c ON c.id = t.course_id
+                WHERE t.room_id = ? AND t.weekday = ? AND t.start_time < ? AND t.end_time > ?
+            """, (room_id, weekday, end_time, start_time))
+            clash = self.cursor.fetchone()
+            if clash:
+                raise ValueError(f"{room} is booked for {clash[0]} {clash[1]}-{clash[2]}")
+            
+            self.cursor.execute("""
+                INSERT INTO timetable (course_id, room_id, weekday, start_time, end_time)
+                VALUES (?, ?, ?, ?, ?)
+            """, (course_id, room_id, weekday, start_time, end_time))
+            return self.cursor.lastrowid
+    
+    def delete_timetable_slot(self, slot_id: int) -> bool:
+        """
+        Remove a timetable slot.
+        
+        Args:
+            slot_id: Slot's database ID
+            
+        Returns:
+            True if a slot was removed
+        """
+        with self.conn:
+            self.cursor.execute("DELETE FROM timetable WHERE id = ?", (slot_id,))
+            return self.cursor.rowcount > 0
+    
+    def get_timetable(self, room: Optional[str] = None,
+                      weekday: Optional[int] = None) -> List[Tuple[int, int, str, str, str, int, str, str]]:
+        """
+        Retrieve timetable slots.
+        
+        Args:
+            room: Only this room
+            weekday: Only this day (0 = Monday)
+            
+        Returns:
+            List of tuples: (slot_id, course_id, course_code, course_name,
+            room, weekday, start_time, end_time), ordered by room, day and time
+        """
+        query = """
+            SELECT t.id, c.id, c.code, c.name, r.name, t.weekday, t.start_time, t.end_time
+            FROM timetable t
+            JOIN courses c ON c.id = t.course_id
+            JOIN rooms r ON r.id = t.room_id
+            WHERE 1 = 1
+        """
+        params = []
+        if room is not None:
+            query += " AND r.name = ?"
+            params.append(room)
+        if weekday is not None:
+            query += " AND t.weekday = ?"
+            params.append(weekday)
+        
+        self.cursor.execute(query + " ORDER BY r.name, t.weekday, t.start_time", params)
+        return self.cursor.fetchall()
+    
     def get_student_by_id(self, student_id: int) -> Optional[Tuple[str, str]]:
         """
         Get student name and roll number by ID.
@@ -176,6 +557,35 @@ class Database:
         
         return time_diff.total_seconds() < (minutes * 60)
     
+    def get_recent_marks(self, seconds: float) -> List[Tuple[int, float]]:
+        """
+        Get each student's latest attendance mark within a time window.
+        
+        Args:
+            seconds: Size of the window ending now
+            
+        Returns:
+            List of tuples: (student_id, marked_at as epoch seconds)
+        """
+        since = (datetime.now() - timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+        
+        self.cursor.execute("""
+            SELECT student_id, MAX(timestamp)
+            FROM attendance
+            WHERE timestamp >= ?
+            GROUP BY student_id
+        """, (since,))
+        
+        marks = []
+        for student_id, timestamp in self.cursor.fetchall():
+            try:
+                marked_at = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").timestamp()
+            except (TypeError, ValueError):
+                continue
+            marks.append((student_id, marked_at))
+        
+        return marks
+    
     def mark_attendance(self, student_id: int) -> bool:
         """
         Mark attendance for a student.
@@ -202,6 +612,59 @@ class Database:
             print(f"✗ Error marking attendance: {e}")
             return False
     
+    def mark_attendance_bulk(self, marks: List[Tuple[int, str, Optional[str]]]) -> int:
+        """
+        Insert many attendance marks in a single transaction.
+        
+        Args:
+            marks: List of tuples: (student_id, timestamp, device_id)
+            
+        Returns:
+            Number of marks written (0 on error)
+        """
+        if not marks:
+            return 0
+        
+        try:
+            with self.conn:
+                self.cursor.executemany("""
+                    INSERT INTO attendance (student_id, timestamp, device_id)
+                    VALUES (?, ?, ?)
+                """, marks)
+            return len(marks)
+            
+        except Exception as e:
+            print(f"✗ Error marking attendance: {e}")
+            return 0
+    
+    def get_marks_between(self, student_ids: List[int], start: str, end: str) -> Dict[int, List[str]]:
+        """
+        Get attendance timestamps for some students within a time range.
+        
+        Args:
+            student_ids: Students' database IDs
+            start: First timestamp (inclusive)
+            end: Last timestamp (exclusive)
+            
+        Returns:
+            Dict: {student_id: [timestamps]}
+        """
+        marks = {}
+        if not student_ids:
+            return marks
+        
+        self.cursor.execute(f"""
+            SELECT student_id, timestamp
+            FROM attendance
+            WHERE timestamp >= ? AND timestamp < ?
+            AND student_id IN ({','.join('?' * len(student_ids))})
+        """, [start, end] + list(student_ids))
+        
+        for student_id, timestamp in self.cursor.fetchall():
+            marks.setdefault(student_id, []).append(timestamp)
+        
+        return marks
+    
     def get_attendance_today(self) -> List[Tuple[str, str, str]]:
         """
         Get all attendance records for today.
@@ -261,8 +724,10 @@ class Database:
             
             student_id = result[0]
             
-            # Delete attendance records
+            # Delete attendance records and stored samples
             self.cursor.execute("DELETE FROM attendance WHERE student_id = ?", (student_id,))
+            self.cursor.execute("DELETE FROM student_samples WHERE student_id = ?", (student_id,))
+            self.cursor.execute("DELETE FROM enrolments WHERE student_id = ?", (student_id,))
             
             # Delete student
             self.cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
@@ -290,23 +755,18 @@ def export_attendance_csv(db_path: str = "attendance.db", output_file: str = "at
         db_path: Path to database file
         output_file: Output CSV filename
     """
-    import csv
-    
-    db = Database(db_path)
-    records = db.get_attendance_today()
+    from .export import export_attendance, iter_attendance
     
-    if not records:
+    # Checked before opening: an empty day must not overwrite an earlier export
+    rows = iter_attendance(db_path, batch_size=1)
+    first = next(rows, None)
+    rows.close()
+    if first is None:
         print("No attendance records for today")
-        db.close()
         return
     
-    with open(output_file, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Name', 'Roll Number', 'Timestamp'])
-        writer.writerows(records)
-    
-    print(f"✓ Exported {len(records)} records to {output_file}")
-    db.close()
+    count = export_attendance(output_file, db_path=db_path, fmt='csv')
+    print(f"✓ Exported {count} records to {output_file}")
 
 
 def print_database_stats(db_path: str = "attendance.db") -> None:
@@ -316,9 +776,14 @@ def print_database_stats(db_path: str = "attendance.db") -> None:
     Args:
         db_path: Path to database file
     """
+    from .archive import list_archives
+    
     db = Database(db_path)
     total_students = len(db.get_all_students())
     present_today = db.get_attendance_count_today()
+    db.cursor.execute("SELECT COUNT(*) FROM attendance")
+    live_records = db.cursor.fetchone()[0]
+    archives = list_archives(db_path)
     
     print(f"\n{'='*50}")
     print(f"DATABASE STATISTICS")
@@ -326,5 +791,7 @@ def print_database_stats(db_path: str = "attendance.db") -> None:
     print(f"Total Registered Students: {total_students}")
     print(f"Present Today: {present_today}")
     print(f"Absent Today: {total_students - present_today}")
+    print(f"Attendance Records (live): {live_records}")
+    print(f"Archived Records: {sum(a['records'] for a in archives)} in {len(archives)} archive files")
     print(f"{'='*50}\n")
     db.close()
@@ -0,0 +1,648 @@
+"""
+Recognition engine module.
+Owns the camera, recognizer and Arduino and runs the recognition loop.
+"""
+
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Optional, Tuple, Dict, Any
+from .camera import Camera, RegionOfInterest
+from .config import Config, SETTINGS
+from .recognize import FaceRecognizer
+from .quality import QualityGate
+from .register import StudentRegistration, check_num_samples
+from .preview import PreviewBuffer
+from .power import PowerController, SUSPENDED
+from .eventlog import EventLog
+from .jobs import JobManager, Job
+from .events import EventBus, event_bus, RECOGNITION_STARTED, RECOGNITION_STOPPED, POWER_MODE_CHANGED
+
+
+class FrameTap:
+    """Hands the latest camera frame from the engine loop to one consumer."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.frame = None
+        self.seq = 0
+        self.read_seq = 0
+
+    def put(self, frame: np.ndarray) -> None:
+        """Replace the pending frame (called from the engine loop, never blocks)."""
+        with self.cond:
+            self.frame = frame
+            self.seq += 1
+            self.cond.notify()
+
+    def get(self, timeout: float = 2.0) -> Optional[np.ndarray]:
+        """
+        Wait for a frame newer than the last one returned.
+
+        Args:
+            timeout: Seconds to wait
+
+        Returns:
+            BGR display frame or None on timeout
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq != self.read_seq, timeout=timeout):
+                return None
+            self.read_seq = self.seq
+            return self.frame
+
+
+class RecognitionEngine:
+    """Single owner of the recognition pipeline, driven over IPC or directly.
+
+    The recognizer (gallery, database connection) and the Arduino connection
+    are created on the first start and kept warm afterwards; start/stop only
+    resume and pause the frame loop.
+    """
+
+    def __init__(self, tolerance: float = 0.5, camera_index: int = 0,
+                 scale_factor: float = 0.25, process_interval: float = 3,
+                 release_camera_on_stop: bool = True, gallery_mode: str = 'float64',
+                 multi_sample: bool = False, capture_mode: str = 'grab',
+                 fourcc: Optional[str] = None, buffer_size: Optional[int] = 1,
+                 central_url: Optional[str] = None, device_id: Optional[str] = None,
+                 room: Optional[str] = None, check_pose: bool = False,
+                 roi: Optional[RegionOfInterest] = None, power: Optional[PowerController] = None,
+                 config: Optional[Config] = None, event_log: Optional[EventLog] = None,
+                 events: Optional[EventBus] = None):
+        """
+        Initialize recognition engine.
+
+        Args:
+            tolerance: Face matching tolerance passed to FaceRecognizer
+            camera_index: USB camera device index
+            scale_factor: Frame scaling factor for detection
+            process_interval: Minimum seconds between recognition passes
+            release_camera_on_stop: Close the camera while paused (camera LED off)
+            gallery_mode: 'float64', 'float16' or 'int8' (see FaceRecognizer)
+            multi_sample: Match against every stored registration sample
+            capture_mode: 'grab' (decode only used frames) or 'read' (see Camera)
+            fourcc: Pixel format to request from the camera, e.g. 'MJPG'
+            buffer_size: Driver frame queue length (1 keeps latency low)
+            central_url: Send encodings to this central server instead of
+                matching locally (see FaceRecognizer)
+            device_id: Name reported to the central server (default: room or hostname)
+            room: Match only the roster of the course scheduled in this room
+            check_pose: Quality gate also rejects turned heads (landmark-based)
+            roi: Detect faces only inside this region of the frame
+            power: Switch between active, low-rate and suspended (camera
+                released) on a schedule while recognition is running
+            config: Runtime settings for the camera, recognizer and Arduino,
+                changed live through update_settings (default: built-in
+                defaults, not persisted)
+            event_log: Binary log of every recognition decision (closed on shutdown)
+            events: Event bus for live notifications (default shared bus)
+        """
+        self.tolerance = tolerance
+        self.camera_index = camera_index
+        self.scale_factor = scale_factor
+        self.process_interval = process_interval
+        self.release_camera_on_stop = release_camera_on_stop
+        self.gallery_mode = gallery_mode
+        self.multi_sample = multi_sample
+        self.capture_mode = capture_mode
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.central_url = central_url
+        self.device_id = device_id
+        self.room = room
+        self.check_pose = check_pose
+        self.roi = roi
+        self.power = power
+        self.config = config if config is not None else Config(path=None, env={})
+        self.event_log = event_log
+        # Hot setting changes waiting for the loop to apply them between frames
+        self.pending_settings = {}
+        self.settings_lock = threading.Lock()
+        # Passes retried early because the quality gate rejected a face
+        self.max_deferrals = 2
+        self.events = events if events is not None else event_bus
+        self.preview = PreviewBuffer(max_fps=5.0)
+        self.jobs = JobManager(events=self.events)
+        self.gallery_changed = threading.Event()
+        self.frame_taps = []
+
+        self.recognizer = None
+        self.camera = None
+        self.thread = None
+        self.is_running = False
+        self.lock = threading.Lock()
+
+        # Loop signalling: resume_event wakes the loop, pause_requested
+        # interrupts it, paused is set once it has finished its current frame
+        self.resume_event = threading.Event()
+        self.pause_requested = threading.Event()
+        self.paused = threading.Event()
+        self.paused.set()
+        self.shutting_down = False
+
+        # Start-to-first-recognition latency
+        self.start_requested_at = None
+        self.last_start_latency = None
+
+    def start(self) -> Tuple[bool, str]:
+        """
+        Start (or resume) recognition.
+
+        Returns:
+            Tuple of (success, error message)
+        """
+        with self.lock:
+            if self.is_running:
+                return False, 'Recognition already running'
+
+            self.start_requested_at = time.time()
+            self._warm_up()
+
+            # In room mode an empty gallery just means no class right now
+            if not (self.recognizer.remote or self.room) and len(self.recognizer.gallery) == 0:
+                return False, 'No students registered'
+
+            if not self._open_camera():
+                return False, 'Failed to start camera'
+
+            self.is_running = True
+            self._resume_loop()
+
+        self.events.publish(RECOGNITION_STARTED, {})
+        return True, ''
+
+    def _open_camera(self) -> bool:
+        """Open the camera unless it is already open (lock held)."""
+        if self.camera is None:
+            camera = Camera(camera_index=self.camera_index, scale_factor=self.scale_factor,
+                            capture_mode=self.capture_mode, fourcc=self.fourcc,
+                            buffer_size=self.buffer_size, roi=self.roi,
+                            width=self.config.capture_width, height=self.config.capture_height,
+                            fps=self.config.capture_fps,
+                            process_every_n_frames=self.config.process_every_n_frames)
+            if not camera.start():
+                return False
+            self.camera = camera
+        return True
+
+    def _resume_loop(self) -> None:
+        """Wake the frame loop, starting its thread on first use (lock held)."""
+        self.pause_requested.clear()
+        self.paused.clear()
+        self.resume_event.set()
+
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._loop, daemon=True)
+            self.thread.start()
+
+    def warm_up(self) -> None:
+        """Load the gallery and connect the Arduino ahead of the first start."""
+        with self.lock:
+            self._warm_up()
+
+    def _warm_up(self) -> None:
+        """Create the recognizer once, or refresh its gallery if students changed (lock held)."""
+        if self.recognizer is None:
+            self.recognizer = FaceRecognizer(tolerance=self.tolerance, events=self.events,
+                                             gallery_mode=self.gallery_mode,
+                                             multi_sample=self.multi_sample,
+                                             central_url=self.central_url,
+                                             device_id=self.device_id,
+                                             room=self.room,
+                                             quality_gate=QualityGate(check_pose=self.check_pose),
+                                             cooldown_seconds=self.config.cooldown_seconds,
+                                             serial_port=self.config.serial_port,
+                                             baudrate=self.config.baudrate,
+                                             event_log=self.event_log)
+            self.recognizer.start()
+        else:
+            self.recognizer.refresh_known_faces()
+
+    def stop(self) -> Tuple[bool, str]:
+        """
+        Pause recognition; models, gallery and Arduino stay loaded.
+
+        Returns:
+            Tuple of (success, error message)
+        """
+        with self.lock:
+            if not self.is_running:
+                return False, 'Recognition is not running'
+
+            self._pause()
+
+        self.events.publish(RECOGNITION_STOPPED, {'reason': 'requested'})
+        return True, ''
+
+    def _pause(self) -> None:
+        """Stop recognizing; pause the frame loop unless a frame tap still needs it (lock held)."""
+        self.is_running = False
+        if self.power is not None:
+            self.power.stop()
+        if not self.frame_taps:
+            self._halt_loop()
+
+    def _halt_loop(self) -> None:
+        """Signal the loop to pause and wait until it has (lock held)."""
+        self.pause_requested.set()
+        self.paused.wait(timeout=5)
+
+        if self.release_camera_on_stop and self.camera is not None:
+            self.camera.stop()
+            self.camera = None
+
+    def _loop(self) -> None:
+        """Recognition loop (runs in background thread for the engine's lifetime)."""
+        while True:
+            self.resume_event.wait()
+            if self.shutting_down:
+                break
+
+            failed = not self._run_until_paused()
+
+            self.resume_event.clear()
+            self.paused.set()
+
+            if failed:
+                # Loop ended on its own (camera lost or error)
+                threading.Thread(target=self._cleanup_after_error, daemon=True).start()
+
+            print("Recognition stopped")
+
+    def _run_until_paused(self) -> bool:
+        """
+        Process frames until a pause is requested.
+
+        Returns:
+            False if the loop ended because of a camera or processing error
+        """
+        last_process_time = 0
+        deferrals = 0
+        recognized_faces = []
+        draw_scale = 1.0 / self.scale_factor
+
+        while not self.pause_requested.is_set():
+            try:
+                if self.pending_settings:
+                    # Apply between frames; boxes from the old scale are dropped
+                    with self.settings_lock:
+                        settings, self.pending_settings = self.pending_settings, {}
+                    self._apply_settings(settings)
+                    recognized_faces = []
+                    draw_scale = 1.0 / self.scale_factor
+
+                current_time = time.time()
+                process_interval = self.process_interval
+
+                if self.power is not None and self.is_running:
+                    mode, changed = self.power.update()
+                    if changed:
+                        self._power_mode_changed(mode)
+                    if mode == SUSPENDED and not self.frame_taps:
+                        # Camera off until the next boundary; the recognizer stays warm
+                        self._suspend_camera()
+                        self.pause_requested.wait(min(self.power.seconds_to_change(), 1.0))
+                        continue
+                    process_interval = self.power.interval(self.process_interval)
+
+                if self.camera is None:
+                    # Coming back from a suspended period
+                    if not self.lock.acquire(blocking=False):
+                        self.pause_requested.wait(0.1)
+                        continue
+                    try:
+                        opened = self._open_camera()
+                    finally:
+                        self.lock.release()
+                    if not opened:
+                        return False
+
+                # Decode only what someone will use: the preview/registration
+                # need every frame, recognition only once per process_interval
+                need_display = self.preview.viewers > 0 or bool(self.frame_taps)
+                need_process = (self.is_running and not self.frame_taps
+                                and current_time - last_process_time >= process_interval)
+                should_process, display_frame, small_frame = self.camera.read_frame(need_display, need_process)
+
+                if not self.camera.last_read_ok:
+                    return False
+
+                if self.gallery_changed.is_set():
+                    # Students were added/removed; reload between frames
+                    self.gallery_changed.clear()
+                    self.recognizer.refresh_known_faces()
+
+                # Registration borrows frames; recognition pauses meanwhile so
+                # the student being enrolled isn't flagged as unknown
+                if display_frame is not None:
+                    for tap in self.frame_taps:
+                        tap.put(display_frame)
+
+                if should_process and small_frame is not None:
+                    pass_started = time.perf_counter()
+                    recognized_faces = self.recognizer.recognize_faces(
+                        small_frame, origin=self.camera.detection_origin,
+                        region=self.camera.detection_region)
+                    if self.power is not None:
+                        self.power.record_pass(time.perf_counter() - pass_started)
+
+                    # A blurred or dark face may be usable a few frames later:
+                    # retry on the next due frame instead of a full interval later
+                    if self.recognizer.deferred and deferrals < self.max_deferrals:
+                        deferrals += 1
+                    else:
+                        deferrals = 0
+                        last_process_time = current_time
+                    self._record_start_latency()
+
+                # Boxes from the last pass stay on the preview until the next one
+                if display_frame is not None:
+                    self.preview.update(display_frame, recognized_faces, draw_scale)
+
+                # Frame pacing; returns immediately when a pause is requested
+                self.pause_requested.wait(0.1)
+
+            except Exception as e:
+                print(f"Recognition error: {e}")
+                return False
+
+        return True
+
+    def _power_mode_changed(self, mode: str) -> None:
+        """Announce a power mode switch."""
+        until = self.power.valid_until.strftime("%H:%M")
+        print(f"✓ Power mode: {mode} until {until}")
+        self.events.publish(POWER_MODE_CHANGED, {'mode': mode, 'until': until})
+
+    def _suspend_camera(self) -> None:
+        """Release the camera while suspended (loop thread; retried if the lock is busy)."""
+        if self.camera is None or not self.lock.acquire(blocking=False):
+            return
+        try:
+            if not self.frame_taps and self.camera is not None:
+                self.camera.stop()
+                self.camera = None
+        finally:
+            self.lock.release()
+
+    def update_settings(self, changes: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Validate, persist and apply setting changes.
+
+        Hot settings reach the running camera, recognizer and scheduler
+        before the next frame; the others are stored for the next start.
+
+        Args:
+            changes: {setting name: new value}
+
+        Returns:
+            Tuple of (dict with 'applied' and 'restart_required' names, or
+            None on a validation error; error message)
+        """
+        try:
+            changed = self.config.update(changes)
+        except ValueError as e:
+            return None, str(e)
+
+        hot = {name: value for name, value in changed.items() if SETTINGS[name].hot}
+        with self.lock:
+            if self.paused.is_set():
+                self._apply_settings(hot)
+            else:
+                with self.settings_lock:
+                    self.pending_settings.update(hot)
+
+        return {
+            'applied': sorted(hot),
+            'restart_required': sorted(set(changed) - set(hot))
+        }, ''
+
+    def _apply_settings(self, settings: Dict[str, Any]) -> None:
+        """Push hot setting values into the live components (loop thread, or lock held while paused)."""
+        if not settings:
+            return
+        for name in ('tolerance', 'scale_factor', 'process_interval', 'check_pose'):
+            if name in settings:
+                setattr(self, name, settings[name])
+
+        camera, recognizer = self.camera, self.recognizer
+        if camera is not None:
+            if 'scale_factor' in settings:
+                camera.set_scale_factor(settings['scale_factor'])
+            if 'process_every_n_frames' in settings:
+                camera.process_every_n_frames = settings['process_every_n_frames']
+            if any(name.startswith('capture_') for name in settings):
+                camera.set_capture_format(self.config.capture_width, self.config.capture_height,
+                                          self.config.capture_fps)
+
+        if recognizer is not None:
+            if 'tolerance' in settings:
+                recognizer.tolerance = settings['tolerance']
+            if 'cooldown_seconds' in settings:
+                recognizer.set_cooldown(settings['cooldown_seconds'])
+            if 'check_pose' in settings:
+                recognizer.quality.check_pose = settings['check_pose']
+            if 'serial_port' in settings:
+                recognizer.arduino.set_port(settings['serial_port'])
+
+        if self.power is not None and 'low_rate_interval' in settings:
+            self.power.low_rate_interval = settings['low_rate_interval']
+
+        print(f"✓ Settings applied: {', '.join(f'{k}={v}' for k, v in sorted(settings.items()))}")
+
+    def reload_gallery(self) -> None:
+        """Pick up added or deleted students without restarting recognition."""
+        if self.power is not None:
+            # The timetable may have changed too
+            self.power.refresh()
+        with self.lock:
+            if self.recognizer is None:
+                return
+            if self.is_running:
+                # Let the loop thread swap it in between frames
+                self.gallery_changed.set()
+            else:
+                self.recognizer.refresh_known_faces()
+
+    def enroll_bulk(self, source: str, workers: Optional[int] = None) -> Job:
+        """
+        Start a bulk enrollment job from a photo folder or CSV manifest.
+
+        Args:
+            source: Directory path or .csv manifest on this machine
+            workers: Worker processes (default: CPU count)
+
+        Returns:
+            The submitted job
+        """
+        from .bulk_enroll import bulk_enroll
+
+        def run(job: Job):
+            def progress(done, total):
+                # ~100 progress events per job, not one per photo
+                if done == total or done % max(1, total // 100) == 0:
+                    job.update(images_done=done, images_total=total)
+
+            report = bulk_enroll(source, workers=workers, progress=progress)
+            self.reload_gallery()
+            return report
+
+        return self.jobs.submit('bulk_enroll', run)
+
+    def _record_start_latency(self) -> None:
+        """Record time from the start request to the first completed recognition pass."""
+        if self.start_requested_at is None:
+            return
+        self.last_start_latency = time.time() - self.start_requested_at
+        self.start_requested_at = None
+        print(f"✓ First recognition {self.last_start_latency * 1000:.0f} ms after start")
+
+    def _cleanup_after_error(self) -> None:
+        """Release the camera after the loop died without a stop request."""
+        with self.lock:
+            was_running = self.is_running
+            self.is_running = False
+            if self.power is not None:
+                self.power.stop()
+            if self.camera is not None:
+                self.camera.stop()
+                self.camera = None
+        if was_running:
+            self.events.publish(RECOGNITION_STOPPED, {'reason': 'error'})
+
+    def open_tap(self) -> Optional[FrameTap]:
+        """
+        Borrow frames from the camera pipeline, opening the camera if needed.
+
+        Returns:
+            FrameTap fed by the engine loop, or None if the camera failed
+        """
+        with self.lock:
+            return self._open_tap()
+
+    def _open_tap(self) -> Optional[FrameTap]:
+        """Open a frame tap (lock held)."""
+        if not self._open_camera():
+            return None
+        tap = FrameTap()
+        self.frame_taps = self.frame_taps + [tap]
+        self._resume_loop()
+        return tap
+
+    def close_tap(self, tap: FrameTap) -> None:
+        """Return a borrowed tap; pauses the loop if nothing else needs it."""
+        with self.lock:
+            self.frame_taps = [t for t in self.frame_taps if t is not tap]
+            if not self.is_running and not self.frame_taps:
+                self._halt_loop()
+
+    def register(self, name: str, roll_number: str, num_samples: int = 15) -> Tuple[Optional[Job], str]:
+        """
+        Start a registration job that captures from the engine's camera.
+
+        Args:
+            name: Student's full name
+            roll_number: Unique roll number
+            num_samples: Number of face samples to capture
+
+        Returns:
+            Tuple of (job or None, error message)
+        """
+        try:
+            num_samples = check_num_samples(num_samples)
+        except ValueError as e:
+            return None, str(e)
+
+        with self.lock:
+            # One student in front of the camera at a time
+            if self.frame_taps:
+                return None, 'A registration is already in progress'
+            tap = self._open_tap()
+
+        if tap is None:
+            return None, 'Failed to start camera'
+
+        def read_frame():
+            frame = tap.get(timeout=2.0)
+            if frame is None:
+                return None
+            small_frame = cv2.resize(frame, (0, 0), fx=self.scale_factor, fy=self.scale_factor)
+            return cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+
+        def run(job: Job):
+            def progress(**fields):
+                if any(job.progress.get(k) != v for k, v in fields.items()):
+                    job.update(**fields)
+
+            try:
+                registrar = StudentRegistration(num_samples=num_samples, frame_source=read_frame)
+                try:
+                    success = registrar.register_student(name, roll_number, progress=progress)
+                finally:
+                    registrar.db.close()
+            finally:
+                self.close_tap(tap)
+
+            if not success:
+                raise RuntimeError(registrar.last_error or 'Registration failed')
+
+            # Publish the new student into the live gallery
+            self.reload_gallery()
+            return {'name': name, 'roll_number': roll_number}
+
+        return self.jobs.submit('registration', run), ''
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get engine status.
+
+        Returns:
+            Dict with running/camera/arduino flags and start latency
+        """
+        recognizer = self.recognizer
+        latency = self.last_start_latency
+        return {
+            'recognition_running': self.is_running,
+            'camera_connected': self.camera is not None,
+            'arduino_connected': recognizer.arduino.is_connected if recognizer else False,
+            'arduino_signals': dict(recognizer.arduino.stats) if recognizer else None,
+            'central': dict(recognizer.ingest.stats, pending=recognizer.ingest.pending)
+                       if recognizer and recognizer.remote else None,
+            'preview_viewers': self.preview.viewers,
+            'registration_active': bool(self.frame_taps),
+            'room': self.room,
+            'slot': recognizer.slot if recognizer else None,
+            'quality': recognizer.quality.stats if recognizer else None,
+            'roi': self.roi.shapes if self.roi is not None else None,
+            'power': self.power.stats if self.power is not None else None,
+            'event_log': self.event_log.stats if self.event_log is not None else None,
+            'warm': recognizer is not None,
+            'last_start_latency_ms': round(latency * 1000) if latency is not None else None
+        }
+
+    def shutdown(self) -> None:
+        """Stop the loop and release everything (used on service exit)."""
+        with self.lock:
+            if self.is_running:
+                self._pause()
+
+            self.shutting_down = True
+            self.resume_event.set()
+            if self.thread is not None:
+                self.thread.join(timeout=5)
+
+            if self.camera is not None:
+                self.camera.stop()
+                self.camera = None
+
+            if self.recognizer is not None:
+                self.recognizer.stop()
+                self.recognizer = None
+
+            if self.power is not None:
+                self.power.schedule.close()
+
+            if self.event_log is not None:
+                self.event_log.close()
@@ -0,0 +1,294 @@
+"""
+Recognition event log module.
+Every recognition decision (marked, cooldown, unknown, skipped...) is kept as
+a fixed-width binary record: appended to an in-memory buffer on the hot path
+and written by a background thread into day files that rotate by size.
+read_event_log loads a day back as a NumPy structured array.
+"""
+
+import glob
+import os
+import re
+import threading
+import time
+import numpy as np
+from datetime import date, datetime
+from typing import Optional, Tuple, Dict, Union
+
+
+# Decision codes stored in the 'decision' column
+MARKED = 0        # matched and attendance written
+COOLDOWN = 1      # matched, marked recently
+NOT_MARKED = 2    # matched, the database refused the mark
+UNKNOWN = 3       # no gallery entry within tolerance
+LOW_QUALITY = 4   # rejected by the quality gate before encoding
+NO_CLASS = 5      # room mode with no class scheduled
+SENT = 6          # client mode: encoding sent to the central server
+DECISIONS = ('marked', 'cooldown', 'not_marked', 'unknown', 'low_quality', 'no_class', 'sent')
+
+# One record per face and decision; box in detection-frame pixels,
+# student_id/distance are the best candidate (-1/NaN if none was compared)
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('camera', '<u2'),
+    ('decision', 'u1'),
+    ('top', '<i2'), ('right', '<i2'), ('bottom', '<i2'), ('left', '<i2'),
+    ('student_id', '<i4'),
+    ('distance', '<f4'),
+    ('detect_ms', '<f4'),
+    ('quality_ms', '<f4'),
+    ('encode_ms', '<f4'),
+    ('match_ms', '<f4'),
+])
+
+MAGIC = b'ATTNLOG1'
+HEADER_BYTES = 16  # magic, record size (u4), reserved (u4)
+
+
+def _day_files(directory: str, day: str) -> list:
+    """A day's log segments in write order."""
+    paths = glob.glob(os.path.join(directory, f"recognition-{day}*.bin"))
+
+    def segment(path):
+        match = re.search(r'\.(\d+)\.bin$', path)
+        return int(match.group(1)) if match else 0
+
+    return sorted(paths, key=segment)
+
+
+def read_event_log(day: Union[str, date, None] = None, directory: str = "logs") -> np.ndarray:
+    """
+    Load one day's recognition events.
+
+    Args:
+        day: Day as YYYY-MM-DD or a date (default today)
+        directory: Log directory
+
+    Returns:
+        Structured array with RECORD_DTYPE columns (e.g. events['distance']),
+        in write order; empty if nothing was logged
+
+    Raises:
+        ValueError: If a file is not a recognition log of this format
+    """
+    if day is None:
+        day = date.today()
+    if isinstance(day, (date, datetime)):
+        day = day.strftime("%Y-%m-%d")
+
+    chunks = []
+    for path in _day_files(directory, day):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_BYTES)
+            if len(header) < HEADER_BYTES:
+                continue
+            if header[:8] != MAGIC or int.from_bytes(header[8:12], 'little') != RECORD_DTYPE.itemsize:
+                raise ValueError(f"Not a recognition event log (or another version): {path}")
+            # A crash may leave a partial record at the end; it is ignored
+            count = (os.path.getsize(path) - HEADER_BYTES) // RECORD_DTYPE.itemsize
+            chunks.append(np.fromfile(f, dtype=RECORD_DTYPE, count=count))
+
+    if not chunks:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.concatenate(chunks)
+
+
+class EventLog:
+    """Buffered, append-only writer of recognition events.
+
+    record() only fills a row of a preallocated buffer under a lock; a
+    background thread swaps buffers every flush_interval and appends them to
+    recognition-YYYY-MM-DD[.N].bin (the day of each record's own timestamp),
+    starting a new segment once a file reaches max_bytes. If the writer falls a full buffer behind, new
+    records are dropped (and counted) rather than blocking recognition.
+    """
+
+    def __init__(self, directory: str = "logs", camera: int = 0, max_bytes: int = 64 * 1024 * 1024,
+                 buffer_records: int = 4096, flush_interval: float = 1.0):
+        """
+        Initialize event log.
+
+        Args:
+            directory: Directory for the log files (created if missing)
+            camera: Camera index stored in every record
+            max_bytes: Size at which a day's file is rotated to a new segment
+            buffer_records: Records held in memory between writes
+            flush_interval: Seconds between background writes
+        """
+        self.directory = directory
+        self.camera = camera
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.buffer = np.zeros(buffer_records, dtype=RECORD_DTYPE)
+        self.spare = np.zeros(buffer_records, dtype=RECORD_DTYPE)
+        self.count = 0
+        self.counters = {'records': 0, 'dropped': 0, 'lost': 0, 'bytes': 0, 'files': 0}
+        # Records accepted so far whose buffer the writer has finished with
+        self.written_records = 0
+
+        self.file = None
+        self.file_day = None
+        self.file_segment = 0
+
+        self.wake = threading.Event()
+        self.written = threading.Condition()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def record(self, decision: int, location: Tuple[int, int, int, int],
+               student_id: Optional[int] = None, distance: Optional[float] = None,
+               detect_ms: float = 0.0, quality_ms: float = 0.0, encode_ms: float = 0.0,
+               match_ms: float = 0.0, when: Optional[float] = None) -> bool:
+        """
+        Append one decision (hot path: no I/O, no allocation).
+
+        Args:
+            decision: One of the decision codes (MARKED, UNKNOWN, ...)
+            location: Face box (top, right, bottom, left), detection-frame pixels
+            student_id: Best candidate's ID, if any was compared
+            distance: Best candidate's distance
+            detect_ms: Detection time for the pass
+            quality_ms: Quality gate time for the pass
+            encode_ms: Encoding time for the pass
+            match_ms: Gallery search time for this face
+            when: Epoch time (default now)
+
+        Returns:
+            False if the record was dropped because the buffer is full
+        """
+        with self.lock:
+            if self.count == len(self.buffer):
+                self.counters['dropped'] += 1
+                self.wake.set()
+                return False
+            top, right, bottom, left = location
+            self.buffer[self.count] = (
+                time.time() if when is None else when, self.camera, decision,
+                top, right, bottom, left,
+                -1 if student_id is None else student_id,
+                np.nan if distance is None else distance,
+                detect_ms, quality_ms, encode_ms, match_ms
+            )
+            self.count += 1
+            self.counters['records'] += 1
+            if self.count == len(self.buffer):
+                self.wake.set()
+        return True
+
+    def _run(self) -> None:
+        """Writer thread: periodically move buffered records to disk."""
+        while True:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            stopping = self.stopped
+            try:
+                self._write_pending()
+            except OSError as e:
+                print(f"✗ Event log write failed: {e}")
+            with self.written:
+                self.written.notify_all()
+            if stopping:
+                break
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _write_pending(self) -> None:
+        """Swap buffers and append the full one to the day files."""
+        with self.lock:
+            if self.count == 0:
+                return
+            full, count = self.buffer, self.count
+            self.buffer, self.spare, self.count = self.spare, full, 0
+            taken = self.counters['records']
+
+        records = full[:count]
+        try:
+            for day, chunk in self._split_by_day(records):
+                data = chunk.tobytes()
+                self._open_for(day, len(data))
+                self.file.write(data)
+                self.file.flush()
+                self.counters['bytes'] += len(data)
+        except OSError:
+            self.counters['lost'] += count
+            raise
+        finally:
+            self.written_records = taken
+
+    @staticmethod
+    def _split_by_day(records: np.ndarray) -> list:
+        """(day, records) pairs by the local day of each record's timestamp."""
+        times = records['time']
+        first = datetime.fromtimestamp(times.min()).strftime("%Y-%m-%d")
+        if datetime.fromtimestamp(times.max()).strftime("%Y-%m-%d") == first:
+            return [(first, records)]
+
+        # Around midnight (or for back-dated records): group, keeping write order
+        days = np.array([datetime.fromtimestamp(t).strftime("%Y-%m-%d") for t in times])
+        return [(day, records[days == day]) for day in sorted(set(days))]
+
+    def _open_for(self, day: str, size: int) -> None:
+        """Make sure the open file is the day's and has room for size more bytes."""
+        if day != self.file_day:
+            self._close_file()
+            self.file_day = day
+            # Continue after the day's last segment (e.g. after a restart)
+            existing = _day_files(self.directory, day)
+            self.file_segment = len(existing) - 1 if existing else 0
+
+        if self.file is not None and self.file.tell() + size > self.max_bytes:
+            self._close_file()
+            self.file_segment += 1
+
+        while self.file is None:
+            suffix = f".{self.file_segment}" if self.file_segment else ""
+            path = os.path.join(self.directory, f"recognition-{day}{suffix}.bin")
+            f = open(path, 'ab')
+            if f.tell() == 0:
+                f.write(MAGIC + RECORD_DTYPE.itemsize.to_bytes(4, 'little') + bytes(4))
+            elif f.tell() + size > self.max_bytes:
+                # Reopened a segment that is already full
+                f.close()
+                self.file_segment += 1
+                continue
+            self.file = f
+            self.counters['files'] += 1
+
+    def _close_file(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Write buffered records now and wait for it.
+
+        Returns:
+            True if everything recorded so far is on disk
+        """
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            target, lost = self.counters['records'], self.counters['lost']
+        with self.written:
+            # count drops to zero at the swap, before the write; wait for the write
+            while self.written_records < target and time.monotonic() < deadline:
+                self.wake.set()
+                self.written.wait(deadline - time.monotonic())
+        return self.written_records >= target and self.counters['lost'] == lost
+
+    def close(self) -> None:
+        """Write what is buffered and stop the writer thread."""
+        self.stopped = True
+        self.wake.set()
+        self.thread.join(timeout=5)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Records logged, dropped, lost to write errors, bytes written and files opened."""
+        return dict(self.counters, buffered=self.count)
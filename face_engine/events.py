@@ -0,0 +1,171 @@
+"""
+Event bus module for pushing live system events.
+In-process publish/subscribe with bounded per-client queues.
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any
+
+
+# Event types
+ATTENDANCE_MARKED = 'attendance_marked'
+UNKNOWN_FACE = 'unknown_face'
+RECOGNITION_STARTED = 'recognition_started'
+RECOGNITION_STOPPED = 'recognition_stopped'
+JOB_PROGRESS = 'job_progress'
+JOB_FINISHED = 'job_finished'
+POWER_MODE_CHANGED = 'power_mode_changed'
+
+
+class Subscription:
+    """A single client's view of the event stream."""
+
+    def __init__(self, max_queue: int):
+        """
+        Initialize subscription.
+
+        Args:
+            max_queue: Maximum number of undelivered events before the
+                subscription is dropped
+        """
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def get(self, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next event.
+
+        Args:
+            timeout: Seconds to wait (None = forever)
+
+        Returns:
+            Event dict, or None on timeout
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """Fans events out to subscribers without ever blocking the publisher."""
+
+    def __init__(self, history_size: int = 500, max_queue: int = 100,
+                 first_id: Optional[int] = None):
+        """
+        Initialize event bus.
+
+        Args:
+            history_size: Number of recent events kept for resuming clients
+            max_queue: Per-subscriber queue size (slow clients beyond this are dropped)
+            first_id: Starting event ID (default: current time in ms)
+        """
+        self.max_queue = max_queue
+        self.history = deque(maxlen=history_size)
+        self.subscribers = set()
+        # IDs start from the wall clock (ms) so they keep increasing across
+        # restarts and resuming clients never see them go backwards
+        self.last_id = first_id if first_id is not None else int(time.time() * 1000)
+        self.lock = threading.Lock()
+
+    def publish(self, event_type: str, data: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Publish an event to all subscribers.
+
+        Args:
+            event_type: Event name (e.g. 'attendance_marked')
+            data: JSON-serialisable payload
+
+        Returns:
+            The published event
+        """
+        with self.lock:
+            self.last_id += 1
+            event = {
+                'id': self.last_id,
+                'type': event_type,
+                'data': data or {},
+                'timestamp': time.time()
+            }
+            self._deliver(event)
+        return event
+
+    def republish(self, event: Dict[str, Any]) -> None:
+        """
+        Deliver an event that was numbered by another bus, keeping its ID.
+
+        Args:
+            event: Event dict as returned by publish()
+        """
+        with self.lock:
+            if event['id'] <= self.last_id:
+                return
+            self.last_id = event['id']
+            self._deliver(event)
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        """Append to history and enqueue for subscribers (lock held)."""
+        self.history.append(event)
+
+        for sub in list(self.subscribers):
+            try:
+                sub.queue.put_nowait(event)
+            except queue.Full:
+                # Slow client: drop it rather than stall the publisher.
+                # It will reconnect and resume from its last event ID.
+                sub.overflowed = True
+                self.subscribers.discard(sub)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Register a new subscriber.
+
+        Args:
+            last_event_id: Last event ID the client saw; newer events still
+                in history are replayed first
+
+        Returns:
+            Subscription to read events from
+        """
+        sub = Subscription(self.max_queue)
+
+        with self.lock:
+            if last_event_id is not None:
+                missed = [e for e in self.history if e['id'] > last_event_id]
+                for event in missed[-self.max_queue:]:
+                    sub.queue.put_nowait(event)
+            self.subscribers.add(sub)
+
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        """Remove a subscriber."""
+        with self.lock:
+            self.subscribers.discard(sub)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the most recent events."""
+        with self.lock:
+            return list(self.history)[-limit:]
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """
+    Format an event as a server-sent events message.
+
+    Args:
+        event: Event dict
+
+    Returns:
+        SSE wire format string
+    """
+    payload = dict(event['data'], timestamp=event['timestamp'])
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(payload)}\n\n"
+
+
+# Shared bus for the running process
+event_bus = EventBus()
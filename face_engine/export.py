@@ -0,0 +1,219 @@
+"""
+Attendance export module.
+Streams attendance for a date range into CSV, gzip-compressed CSV or NDJSON
+in constant memory.
+"""
+
+import csv
+import heapq
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+from typing import Optional, List, Iterator, Tuple, Iterable
+from .archive import attendance_sources, connect_source
+
+
+EXPORT_FORMATS = ('csv', 'csv.gz', 'ndjson')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'csv.gz': 'application/gzip',
+    'ndjson': 'application/x-ndjson',
+}
+
+CSV_HEADER = ['Name', 'Roll Number', 'Timestamp']
+
+
+def parse_date_range(start_date: Optional[str], end_date: Optional[str]) -> Tuple[str, str]:
+    """
+    Turn inclusive YYYY-MM-DD dates into a half-open timestamp range.
+
+    Args:
+        start_date: First day (default: today)
+        end_date: Last day, inclusive (default: start_date)
+
+    Returns:
+        Tuple of (start timestamp, end timestamp) strings, end exclusive
+
+    Raises:
+        ValueError: If a date is malformed or the range is reversed
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else \
+        datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else start
+
+    if end < start:
+        raise ValueError("End date is before start date")
+
+    return start.strftime("%Y-%m-%d %H:%M:%S"), (end + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def iter_attendance(db_path: str = "attendance.db", start_date: Optional[str] = None,
+                    end_date: Optional[str] = None, roll_numbers: Optional[List[str]] = None,
+                    student_ids: Optional[List[int]] = None,
+                    batch_size: int = 1000) -> Iterator[Tuple[str, str, str]]:
+    """
+    Yield attendance rows in timestamp order, fetched in batches from the
+    live database and any archive files covering the range.
+
+    Args:
+        db_path: Path to database file
+        start_date: First day, YYYY-MM-DD (default: today)
+        end_date: Last day, inclusive (default: start_date)
+        roll_numbers: Only these students (by roll number)
+        student_ids: Only these students (by database ID)
+        batch_size: Rows per fetchmany() call
+
+    Yields:
+        Tuples of (name, roll_number, timestamp)
+    """
+    start, end = parse_date_range(start_date, end_date)
+
+    query = """
+        SELECT s.name, s.roll_number, a.timestamp
+        FROM attendance a
+        JOIN students s ON a.student_id = s.id
+        WHERE a.timestamp >= ? AND a.timestamp < ?
+    """
+    params = [start, end]
+
+    if roll_numbers:
+        query += f" AND s.roll_number IN ({','.join('?' * len(roll_numbers))})"
+        params.extend(roll_numbers)
+    if student_ids:
+        query += f" AND a.student_id IN ({','.join('?' * len(student_ids))})"
+        params.extend(student_ids)
+
+    query += " ORDER BY a.timestamp"
+
+    # Archived periods are read from their own files; every source is already
+    # in timestamp order, so a lazy k-way merge keeps the output ordered
+    sources = attendance_sources(db_path, start, end)
+    streams = [_fetch_batches(source, query, params, batch_size) for source in sources]
+    if len(streams) == 1:
+        yield from streams[0]
+    else:
+        yield from heapq.merge(*streams, key=lambda row: row[2])
+
+
+def _fetch_batches(source: dict, query: str, params: list, batch_size: int) -> Iterator[Tuple[str, str, str]]:
+    """Run a query on one attendance source and yield rows one batch at a time."""
+    conn = connect_source(source)
+    try:
+        # A dedicated cursor steps through the result; only one batch is in memory
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def encode_rows(rows: Iterable[Tuple[str, str, str]], fmt: str = 'csv',
+                batch_size: int = 1000) -> Iterator[bytes]:
+    """
+    Encode attendance rows into chunks of an export file.
+
+    Args:
+        rows: (name, roll_number, timestamp) tuples
+        fmt: 'csv', 'csv.gz' or 'ndjson'
+        batch_size: Rows per emitted chunk
+
+    Yields:
+        Byte chunks of the encoded file
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    # wbits=31 writes a gzip header, so the stream is a regular .gz file
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if fmt == 'csv.gz' else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt != 'ndjson' else None
+
+    def drain() -> bytes:
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    if writer:
+        writer.writerow(CSV_HEADER)
+
+    pending = 0
+    for name, roll_number, timestamp in rows:
+        if writer:
+            writer.writerow((name, roll_number, timestamp))
+        else:
+            buffer.write(json.dumps({'name': name, 'roll_number': roll_number, 'timestamp': timestamp}))
+            buffer.write('\n')
+
+        pending += 1
+        if pending >= batch_size:
+            pending = 0
+            chunk = drain()
+            if chunk:
+                yield chunk
+
+    chunk = drain()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def format_for_path(path: str) -> str:
+    """Guess the export format from a file name (default csv)."""
+    if path.endswith('.gz'):
+        return 'csv.gz'
+    if path.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+
+def export_attendance(output_file: str, db_path: str = "attendance.db", fmt: Optional[str] = None,
+                      start_date: Optional[str] = None, end_date: Optional[str] = None,
+                      roll_numbers: Optional[List[str]] = None,
+                      student_ids: Optional[List[int]] = None) -> int:
+    """
+    Export attendance for a date range to a file.
+
+    Args:
+        output_file: Destination path
+        db_path: Path to database file
+        fmt: 'csv', 'csv.gz' or 'ndjson' (default: from the file extension)
+        start_date: First day, YYYY-MM-DD (default: today)
+        end_date: Last day, inclusive (default: start_date)
+        roll_numbers: Only these students (by roll number)
+        student_ids: Only these students (by database ID)
+
+    Returns:
+        Number of rows exported
+
+    Raises:
+        ValueError: If a date or the format is invalid (the file is left untouched)
+    """
+    # Generators check their arguments lazily; open() would truncate first
+    fmt = fmt or format_for_path(output_file)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    parse_date_range(start_date, end_date)
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    rows = iter_attendance(db_path, start_date, end_date, roll_numbers, student_ids)
+    with open(output_file, 'wb') as f:
+        for chunk in encode_rows(counted(rows), fmt):
+            f.write(chunk)
+
+    return count
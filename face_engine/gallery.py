@@ -0,0 +1,333 @@
+"""
+Gallery module for face matching.
+Packs known encodings into one array and finds the nearest student.
+"""
+
+import os
+import numpy as np
+from typing import List, Tuple, Optional, Dict
+
+
+ENCODING_DIMS = 128
+GALLERY_MODES = ('float64', 'float16', 'int8')
+
+
+def check_gallery_mode(mode: str, multi_sample: bool = False) -> None:
+    """
+    Validate a gallery configuration up front, before anything is loaded.
+
+    Raises:
+        ValueError: If the mode is unknown or combined with multi-sample
+            matching, which only the exact float64 gallery supports
+    """
+    if mode not in GALLERY_MODES:
+        raise ValueError(f"Unknown gallery mode: {mode} (expected {', '.join(GALLERY_MODES)})")
+    if multi_sample and mode != 'float64':
+        raise ValueError(f"Multi-sample matching needs the float64 gallery, not {mode}")
+
+
+def pack_encodings(encodings: List[np.ndarray]) -> np.ndarray:
+    """Stack encodings into an (N, 128) float64 matrix (works for N = 0)."""
+    if len(encodings) == 0:
+        return np.zeros((0, ENCODING_DIMS), dtype=np.float64)
+    return np.asarray(encodings, dtype=np.float64)
+
+
+class Gallery:
+    """Known face encodings packed into a single float64 matrix."""
+
+    def __init__(self, student_ids: List[int], names: List[str], encodings: List[np.ndarray]):
+        """
+        Initialize gallery.
+
+        Args:
+            student_ids: Database ID per student
+            names: Display name per student
+            encodings: 128-dimensional face encoding per student
+        """
+        self.student_ids = list(student_ids)
+        self.names = list(names)
+        self.encodings = pack_encodings(encodings)
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+    def distances(self, encoding: np.ndarray) -> np.ndarray:
+        """
+        Euclidean distance from an encoding to every student.
+
+        Args:
+            encoding: 128-dimensional face encoding
+
+        Returns:
+            Array of distances, one per student
+        """
+        return np.linalg.norm(self.encodings - encoding, axis=1)
+
+    def best_match(self, encoding: np.ndarray) -> Tuple[Optional[int], float]:
+        """
+        Find the closest student.
+
+        Args:
+            encoding: 128-dimensional face encoding
+
+        Returns:
+            Tuple of (gallery index or None if empty, distance)
+        """
+        if len(self) == 0:
+            return None, float('inf')
+        distances = self.distances(encoding)
+        index = int(np.argmin(distances))
+        return index, float(distances[index])
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the encoding arrays."""
+        return self.encodings.nbytes
+
+
+class QuantizedGallery(Gallery):
+    """Compact gallery searched in float16 or int8, with exact re-ranking.
+
+    int8 uses one shared scale around the per-dimension mean, so squared
+    distances can be computed as ||c||^2 - 2 c.q + ||q||^2 on the codes.
+    The top candidates are then re-ranked against full-precision vectors
+    held in a memory-mapped file, which every process shares through the
+    page cache instead of keeping its own copy.
+    """
+
+    BLOCK_ROWS = 4096
+
+    def __init__(self, student_ids: List[int], names: List[str], encodings: List[np.ndarray],
+                 dtype: str = 'int8', rerank: int = 8, exact_path: Optional[str] = None):
+        """
+        Initialize quantized gallery.
+
+        Args:
+            student_ids: Database ID per student
+            names: Display name per student
+            encodings: 128-dimensional face encoding per student
+            dtype: 'int8' or 'float16'
+            rerank: Number of nearest candidates re-ranked exactly
+            exact_path: .npy file for the memory-mapped full-precision copy
+                (None keeps it in memory)
+        """
+        if dtype not in ('int8', 'float16'):
+            raise ValueError(f"Unsupported gallery dtype: {dtype}")
+
+        self.student_ids = list(student_ids)
+        self.names = list(names)
+        self.dtype = dtype
+        self.rerank = rerank
+
+        full = pack_encodings(encodings)
+
+        if dtype == 'float16':
+            self.codes = full.astype(np.float16)
+        else:
+            self.center = full.mean(axis=0) if len(full) else np.zeros(full.shape[1])
+            spread = np.abs(full - self.center).max() if len(full) else 1.0
+            self.scale = float(spread / 127.0) or 1.0
+            self.codes = np.clip(np.rint((full - self.center) / self.scale), -127, 127).astype(np.int8)
+            self.code_norms = np.einsum('ij,ij->i', self.codes, self.codes, dtype=np.float32)
+
+        self.encodings = self._store_exact(full, exact_path)
+
+    @staticmethod
+    def _store_exact(full: np.ndarray, exact_path: Optional[str]) -> np.ndarray:
+        """Map full-precision vectors read-only, writing the file only if it differs."""
+        if exact_path is None or len(full) == 0:
+            return full.astype(np.float32)
+
+        full = full.astype(np.float32)
+        # Other processes and reloads usually find the same gallery already
+        # on disk; comparing reads it through the shared page cache, while
+        # rewriting it would give every process its own copy again
+        try:
+            existing = np.load(exact_path, mmap_mode='r')
+            if existing.shape == full.shape and existing.dtype == full.dtype and np.array_equal(existing, full):
+                return existing
+        except (OSError, ValueError):
+            pass
+
+        tmp_path = f"{exact_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, full)
+        os.replace(tmp_path, exact_path)
+        return np.load(exact_path, mmap_mode='r')
+
+    def approximate_distances(self, encoding: np.ndarray) -> np.ndarray:
+        """
+        Distances computed on the quantized codes only.
+
+        Args:
+            encoding: 128-dimensional face encoding
+
+        Returns:
+            Approximate distance per student
+        """
+        n = len(self)
+        squared = np.empty(n, dtype=np.float32)
+
+        if self.dtype == 'float16':
+            query = encoding.astype(np.float32)
+            for start in range(0, n, self.BLOCK_ROWS):
+                block = self.codes[start:start + self.BLOCK_ROWS].astype(np.float32)
+                block -= query
+                squared[start:start + len(block)] = np.einsum('ij,ij->i', block, block)
+        else:
+            query = ((encoding - self.center) / self.scale).astype(np.float32)
+            query_norm = float(query @ query)
+            for start in range(0, n, self.BLOCK_ROWS):
+                block = self.codes[start:start + self.BLOCK_ROWS].astype(np.float32)
+                squared[start:start + len(block)] = (
+                    self.code_norms[start:start + len(block)] - 2.0 * (block @ query) + query_norm
+                )
+            squared *= self.scale ** 2
+
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def distances(self, encoding: np.ndarray) -> np.ndarray:
+        """Exact distances (reads the full-precision copy; used for audits/benchmarks)."""
+        return np.linalg.norm(np.asarray(self.encodings, dtype=np.float64) - encoding, axis=1)
+
+    def best_match(self, encoding: np.ndarray) -> Tuple[Optional[int], float]:
+        """
+        Find the closest student: quantized search, then exact re-rank.
+
+        Args:
+            encoding: 128-dimensional face encoding
+
+        Returns:
+            Tuple of (gallery index or None if empty, exact distance)
+        """
+        n = len(self)
+        if n == 0:
+            return None, float('inf')
+
+        approximate = self.approximate_distances(encoding)
+        k = min(self.rerank, n)
+        candidates = np.sort(np.argpartition(approximate, k - 1)[:k]) if k < n else np.arange(n)
+
+        # Fancy indexing only touches the candidate rows of the memory map
+        exact = np.linalg.norm(np.asarray(self.encodings[candidates], dtype=np.float64) - encoding, axis=1)
+        best = int(np.argmin(exact))
+        return int(candidates[best]), float(exact[best])
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes resident in RAM for search (the exact copy is memory-mapped)."""
+        resident = self.codes.nbytes
+        if self.dtype == 'int8':
+            resident += self.code_norms.nbytes + self.center.nbytes
+        if not isinstance(self.encodings, np.memmap):
+            resident += self.encodings.nbytes
+        return resident
+
+
+class MultiSampleGallery(Gallery):
+    """Every registration sample per student, matched by per-student minimum distance.
+
+    Samples are packed student by student into one matrix; offsets[i] is the
+    first row of student i. One GEMV gives squared distances to all samples
+    and np.minimum.reduceat takes each student's minimum, with no Python
+    loop per student.
+    """
+
+    def __init__(self, student_ids: List[int], names: List[str],
+                 samples: List[List[np.ndarray]]):
+        """
+        Initialize multi-sample gallery.
+
+        Args:
+            student_ids: Database ID per student
+            names: Display name per student
+            samples: Sample encodings per student (each list non-empty)
+        """
+        self.student_ids = list(student_ids)
+        self.names = list(names)
+
+        counts = np.array([len(s) for s in samples], dtype=np.int64)
+        if np.any(counts == 0):
+            raise ValueError("Every student needs at least one sample")
+
+        self.samples = pack_encodings([e for student_samples in samples for e in student_samples])
+        self.offsets = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+        self.sample_norms = np.einsum('ij,ij->i', self.samples, self.samples)
+        # Centroids keep the single-vector interface for audits and callers of .encodings
+        self.encodings = pack_encodings([np.mean(s, axis=0) for s in samples])
+
+    def distances(self, encoding: np.ndarray) -> np.ndarray:
+        """
+        Per-student minimum distance over that student's samples.
+
+        Args:
+            encoding: 128-dimensional face encoding
+
+        Returns:
+            Array of distances, one per student
+        """
+        squared = self.sample_norms - 2.0 * (self.samples @ encoding) + float(encoding @ encoding)
+        per_student = np.minimum.reduceat(squared, self.offsets)
+        return np.sqrt(np.maximum(per_student, 0.0))
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the sample and centroid arrays."""
+        return self.samples.nbytes + self.sample_norms.nbytes + self.offsets.nbytes + self.encodings.nbytes
+
+
+def build_gallery(student_ids: List[int], names: List[str], encodings: List[np.ndarray],
+                  mode: str = 'float64', exact_path: Optional[str] = None,
+                  samples: Optional[Dict[int, List[np.ndarray]]] = None) -> Gallery:
+    """
+    Build a gallery in the requested representation.
+
+    Args:
+        student_ids: Database ID per student
+        names: Display name per student
+        encodings: Face encoding per student
+        mode: 'float64' (exact), 'float16' or 'int8'
+        exact_path: Memory-mapped full-precision file for quantized modes
+        samples: {student_id: [sample encodings]} to match against every
+            sample (float64 only); students without samples use their mean
+
+    Returns:
+        Gallery instance
+    """
+    check_gallery_mode(mode, samples is not None)
+    if samples is not None:
+        per_student = [samples.get(sid) or [enc] for sid, enc in zip(student_ids, encodings)]
+        return MultiSampleGallery(student_ids, names, per_student)
+
+    if mode == 'float64':
+        return Gallery(student_ids, names, encodings)
+    return QuantizedGallery(student_ids, names, encodings, dtype=mode, exact_path=exact_path)
+
+
+def load_gallery(db, mode: str = 'float64', multi_sample: bool = False,
+                 student_ids: Optional[List[int]] = None) -> Gallery:
+    """
+    Build a gallery from the students in a database.
+
+    Args:
+        db: Database instance
+        mode: 'float64' (exact), 'float16' or 'int8'
+        multi_sample: Match against every stored registration sample
+        student_ids: Only these students, e.g. a course roster (default: everyone)
+
+    Returns:
+        Gallery instance
+    """
+    known_encodings, known_student_ids, known_names = [], [], []
+    for student_id, name, roll_number, encoding in db.get_all_students(student_ids):
+        known_encodings.append(encoding)
+        known_student_ids.append(student_id)
+        known_names.append(f"{name} ({roll_number})")
+
+    return build_gallery(
+        known_student_ids, known_names, known_encodings,
+        mode=mode,
+        # Rosters are small enough to keep in memory; only the school-wide gallery is mapped
+        exact_path=f"{db.db_path}.gallery.npy" if student_ids is None else None,
+        samples=db.get_all_samples(student_ids) if multi_sample else None
+    )
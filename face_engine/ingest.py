@@ -0,0 +1,477 @@
+"""
+Edge-to-central ingestion module.
+Classroom devices send face encodings (128 float32 = 512 bytes each) instead
+of frames; a central server matches them against one gallery and writes
+attendance in bulk. Devices spool encodings locally while the server is
+unreachable and retry in batches.
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from typing import Optional, List, Tuple, Dict, Any, Callable
+import numpy as np
+from .database import Database
+from .gallery import ENCODING_DIMS, load_gallery
+from .timetable import RosterGalleries, NO_CLASS_LABEL
+
+
+ENCODING_BYTES = ENCODING_DIMS * 4
+
+INGEST_PATH = '/api/ingest'
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def pack_encoding(encoding: np.ndarray) -> bytes:
+    """Face encoding as 128 little-endian float32 (512 bytes)."""
+    return np.asarray(encoding, dtype='<f4').tobytes()
+
+
+def parse_batch(payload: Any) -> Tuple[str, np.ndarray, List[str], List[Optional[List[int]]]]:
+    """
+    Validate an ingestion request body.
+
+    The body is {"device_id": ..., "detections": [{"encoding": base64 of 512
+    bytes, "captured_at": "YYYY-MM-DD HH:MM:SS", "box": [top, right, bottom,
+    left]}, ...]}; box is optional and in detection-frame pixels.
+
+    Args:
+        payload: Decoded JSON body
+
+    Returns:
+        Tuple of (device_id, (N, 128) float64 encodings, capture timestamps, boxes)
+
+    Raises:
+        ValueError: If the body is malformed
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Body must be a JSON object")
+
+    device_id = payload.get('device_id')
+    detections = payload.get('detections')
+    if not isinstance(device_id, str) or not device_id:
+        raise ValueError("device_id is required")
+    if not isinstance(detections, list):
+        raise ValueError("detections must be a list")
+
+    raw, captured, boxes = [], [], []
+    for index, detection in enumerate(detections):
+        try:
+            data = base64.b64decode(detection['encoding'], validate=True)
+            captured_at = datetime.strptime(detection['captured_at'], TIMESTAMP_FORMAT)
+            box = detection.get('box')
+            if box is not None:
+                box = [int(v) for v in box]
+                if len(box) != 4:
+                    raise ValueError
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError(f"Malformed detection at index {index}")
+
+        if len(data) != ENCODING_BYTES:
+            raise ValueError(f"Encoding at index {index} is {len(data)} bytes, expected {ENCODING_BYTES}")
+
+        raw.append(data)
+        captured.append(captured_at.strftime(TIMESTAMP_FORMAT))
+        boxes.append(box)
+
+    encodings = np.frombuffer(b''.join(raw), dtype='<f4').reshape(-1, ENCODING_DIMS).astype(np.float64)
+    return device_id, encodings, captured, boxes
+
+
+class CentralMatcher:
+    """Matches encodings from many devices against one gallery.
+
+    A device whose ID is a room in the timetable is matched against the
+    roster of the course scheduled there at each capture time instead of the
+    whole school.
+
+    A detection is marked unless the same student already has a mark within
+    the cooldown window of its capture time. The check runs against the
+    database, in capture time rather than arrival time, so batches that were
+    buffered on a device, or resent after a lost response, never produce
+    duplicate marks.
+    """
+
+    def __init__(self, db_path: str = "attendance.db", tolerance: float = 0.5,
+                 gallery_mode: str = 'float64', multi_sample: bool = False,
+                 cooldown_seconds: float = 600):
+        """
+        Initialize central matcher.
+
+        Args:
+            db_path: Path to the central database file
+            tolerance: Face matching tolerance (lower = stricter)
+            gallery_mode: 'float64', 'float16' or 'int8' (see FaceRecognizer)
+            multi_sample: Match against every stored registration sample
+            cooldown_seconds: Minimum time between two marks of one student
+        """
+        self.db = Database(db_path)
+        self.tolerance = tolerance
+        self.gallery_mode = gallery_mode
+        self.multi_sample = multi_sample
+        self.cooldown_seconds = cooldown_seconds
+        self.gallery = None
+        self.gallery_signature = None
+        self.rosters = {}  # {device_id: RosterGalleries or None}
+        self.lock = threading.Lock()
+        self.stats = {'batches': 0, 'detections': 0, 'matched': 0, 'marked': 0}
+
+    def _refresh_gallery(self) -> None:
+        """Drop galleries built before students, enrolments or the timetable changed (lock held)."""
+        signature = self.db.get_students_signature() + self.db.get_schedule_signature()
+        if signature != self.gallery_signature:
+            self.gallery = None
+            self.rosters = {}
+            self.gallery_signature = signature
+
+    def _gallery_for(self, device_id: str, captured_at: str):
+        """Slot (or None) and gallery to match a detection against (lock held)."""
+        if device_id not in self.rosters:
+            is_room = self.db.get_room_id(device_id) is not None
+            self.rosters[device_id] = RosterGalleries(
+                self.db, device_id, mode=self.gallery_mode, multi_sample=self.multi_sample
+            ) if is_room else None
+
+        rosters = self.rosters[device_id]
+        if rosters is not None:
+            return rosters.at(datetime.strptime(captured_at, TIMESTAMP_FORMAT))
+
+        # Devices outside the timetable match the whole school, loaded on first use
+        if self.gallery is None:
+            self.gallery = load_gallery(self.db, mode=self.gallery_mode, multi_sample=self.multi_sample)
+        return None, self.gallery
+
+    def ingest(self, payload: Any) -> Dict[str, Any]:
+        """
+        Match one batch of detections and write the resulting marks.
+
+        Args:
+            payload: Decoded JSON body (see parse_batch)
+
+        Returns:
+            Dict with device_id, received, marked and one result per
+            detection (student_id/name or None/"Unknown", distance, course,
+            marked, box)
+
+        Raises:
+            ValueError: If the body is malformed
+        """
+        device_id, encodings, captured, boxes = parse_batch(payload)
+
+        with self.lock:
+            self._refresh_gallery()
+
+            results = []
+            for encoding, captured_at, box in zip(encodings, captured, boxes):
+                slot, gallery = self._gallery_for(device_id, captured_at)
+                in_class = slot is not None or self.rosters[device_id] is None
+                index, distance = gallery.best_match(encoding) if in_class else (None, float('inf'))
+                matched = index is not None and distance <= self.tolerance
+                results.append({
+                    'student_id': gallery.student_ids[index] if matched else None,
+                    'name': gallery.names[index] if matched else ("Unknown" if in_class else NO_CLASS_LABEL),
+                    'distance': round(distance, 4) if index is not None else None,
+                    'course': slot['course_code'] if slot else None,
+                    'captured_at': captured_at,
+                    'box': box,
+                    'marked': False
+                })
+
+            marks = self._select_marks(device_id, results)
+            written = self.db.mark_attendance_bulk(marks)
+            if written == 0:
+                for result in results:
+                    result['marked'] = False
+
+            self.stats['batches'] += 1
+            self.stats['detections'] += len(results)
+            self.stats['matched'] += sum(r['student_id'] is not None for r in results)
+            self.stats['marked'] += written
+
+        return {'device_id': device_id, 'received': len(results), 'marked': written, 'results': results}
+
+    def _select_marks(self, device_id: str, results: List[Dict[str, Any]]) -> List[Tuple[int, str, str]]:
+        """Pick the matched detections outside every cooldown window (lock held)."""
+        matched = [r for r in results if r['student_id'] is not None]
+        if not matched:
+            return []
+
+        window = timedelta(seconds=self.cooldown_seconds)
+        first = datetime.strptime(min(r['captured_at'] for r in matched), TIMESTAMP_FORMAT) - window
+        last = datetime.strptime(max(r['captured_at'] for r in matched), TIMESTAMP_FORMAT) + window
+        existing = self.db.get_marks_between(
+            sorted({r['student_id'] for r in matched}),
+            first.strftime(TIMESTAMP_FORMAT), last.strftime(TIMESTAMP_FORMAT)
+        )
+        # Timestamps as epoch seconds per student, including marks accepted in this batch
+        marked_at = {
+            student_id: [datetime.strptime(t, TIMESTAMP_FORMAT).timestamp() for t in timestamps]
+            for student_id, timestamps in existing.items()
+        }
+
+        marks = []
+        for result in sorted(matched, key=lambda r: r['captured_at']):
+            at = datetime.strptime(result['captured_at'], TIMESTAMP_FORMAT).timestamp()
+            previous = marked_at.setdefault(result['student_id'], [])
+            if any(abs(at - t) < self.cooldown_seconds for t in previous):
+                continue
+            previous.append(at)
+            result['marked'] = True
+            marks.append((result['student_id'], result['captured_at'], device_id))
+
+        return marks
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.db.close()
+
+
+class IngestClient:
+    """Ships encodings from a classroom device to the central server.
+
+    submit() only appends to a local SQLite spool, so recognition never waits
+    on the network. A background thread posts the oldest spooled detections
+    in batches and deletes them once the server has accepted them; while the
+    server is unreachable they stay spooled (across restarts, too) and the
+    retry interval backs off up to max_retry_interval.
+    """
+
+    def __init__(self, server_url: str, device_id: str, spool_path: str = "edge_spool.db",
+                 batch_size: int = 64, flush_interval: float = 1.0, retry_interval: float = 2.0,
+                 max_retry_interval: float = 60.0, max_pending: int = 100000, timeout: float = 5.0,
+                 token: Optional[str] = None,
+                 on_results: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        """
+        Initialize ingestion client.
+
+        Args:
+            server_url: Central server base URL, e.g. http://central:5000
+            device_id: Name of this device (e.g. the classroom)
+            spool_path: SQLite file buffering detections not yet accepted
+            batch_size: Detections per request
+            flush_interval: Seconds to wait for more detections before sending
+            retry_interval: First delay after a failed request (doubles per failure)
+            max_retry_interval: Upper bound for the retry delay
+            max_pending: Spool size limit; the oldest detections are dropped beyond it
+            timeout: HTTP request timeout in seconds
+            token: Shared secret sent as X-Ingest-Token
+            on_results: Called from the sender thread with the server's
+                per-detection results
+        """
+        self.url = server_url.rstrip('/') + INGEST_PATH
+        self.device_id = device_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.token = token
+        self.on_results = on_results
+
+        self.conn = sqlite3.connect(spool_path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                captured_at TEXT NOT NULL,
+                box TEXT,
+                encoding BLOB NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.idle = threading.Condition()
+        self.thread = None
+        self.sending = False
+        self.close_when_stopped = False
+        self.reachable = True
+        self.stats = {'submitted': 0, 'sent': 0, 'batches': 0, 'failed': 0, 'rejected': 0, 'dropped': 0}
+
+    @property
+    def pending(self) -> int:
+        """Detections spooled but not yet accepted by the server."""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def start(self) -> None:
+        """Start the background sender (sends anything left over from a previous run)."""
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping.clear()
+            self.sending = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            self.wake.set()
+
+    def submit(self, encodings: List[np.ndarray], boxes: List[Tuple[int, int, int, int]],
+               captured_at: Optional[str] = None) -> None:
+        """
+        Spool detections from one frame for sending.
+
+        Args:
+            encodings: 128-dimensional face encodings
+            boxes: (top, right, bottom, left) per encoding, detection-frame pixels
+            captured_at: Capture time, YYYY-MM-DD HH:MM:SS (default now)
+        """
+        if len(encodings) == 0:
+            return
+        captured_at = captured_at or datetime.now().strftime(TIMESTAMP_FORMAT)
+        rows = [(captured_at, json.dumps([int(v) for v in box]), pack_encoding(encoding))
+                for encoding, box in zip(encodings, boxes)]
+
+        with self.lock:
+            self.conn.executemany("INSERT INTO pending (captured_at, box, encoding) VALUES (?, ?, ?)", rows)
+            # Bounded spool: a long outage sheds the oldest detections
+            excess = self.conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0] - self.max_pending
+            if excess > 0:
+                self.conn.execute("""
+                    DELETE FROM pending WHERE id IN (SELECT id FROM pending ORDER BY id LIMIT ?)
+                """, (excess,))
+                self.stats['dropped'] += excess
+            self.conn.commit()
+            self.stats['submitted'] += len(rows)
+
+        if self.pending >= self.batch_size:
+            self.wake.set()
+
+    def _next_batch(self) -> List[Tuple[int, str, Optional[str], bytes]]:
+        """Oldest spooled detections, up to batch_size."""
+        with self.lock:
+            return self.conn.execute("""
+                SELECT id, captured_at, box, encoding FROM pending ORDER BY id LIMIT ?
+            """, (self.batch_size,)).fetchall()
+
+    def _post(self, rows: List[Tuple[int, str, Optional[str], bytes]]) -> Dict[str, Any]:
+        """Send one batch; raises urllib errors on failure."""
+        body = json.dumps({
+            'device_id': self.device_id,
+            'detections': [
+                {
+                    'encoding': base64.b64encode(encoding).decode('ascii'),
+                    'captured_at': captured_at,
+                    'box': json.loads(box) if box else None
+                }
+                for _, captured_at, box, encoding in rows
+            ]
+        }).encode('utf-8')
+
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['X-Ingest-Token'] = self.token
+
+        request = urllib.request.Request(self.url, data=body, headers=headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def _run(self) -> None:
+        """Sender loop (see _send_loop); closes the spool if stop() gave up waiting."""
+        try:
+            self._send_loop()
+        finally:
+            with self.lock:
+                self.sending = False
+                if self.close_when_stopped:
+                    self.conn.close()
+
+    def _send_loop(self) -> None:
+        """Drain the spool in batches, backing off while the server is down."""
+        delay = self.retry_interval
+
+        while not self.stopping.is_set():
+            rows = self._next_batch()
+            if not rows:
+                with self.idle:
+                    self.idle.notify_all()
+                self.wake.wait(self.flush_interval)
+                self.wake.clear()
+                continue
+
+            try:
+                response = self._post(rows)
+            except urllib.error.HTTPError as e:
+                if e.code < 500:
+                    # The server will never accept this batch; don't retry it forever
+                    print(f"✗ Central server rejected {len(rows)} detections: HTTP {e.code}")
+                    self.stats['rejected'] += len(rows)
+                    self._discard(rows)
+                    continue
+                response = None
+            except (urllib.error.URLError, OSError, ValueError):
+                response = None
+
+            if response is None:
+                self.stats['failed'] += 1
+                if self.reachable:
+                    self.reachable = False
+                    print(f"⚠ Central server unreachable; buffering detections ({self.pending} pending)")
+                self.stopping.wait(delay)
+                delay = min(delay * 2, self.max_retry_interval)
+                continue
+
+            self._discard(rows)
+            delay = self.retry_interval
+            self.stats['sent'] += len(rows)
+            self.stats['batches'] += 1
+            if not self.reachable:
+                self.reachable = True
+                print(f"✓ Central server reachable again ({self.pending} pending)")
+
+            if self.on_results:
+                try:
+                    self.on_results(response.get('data', {}).get('results', []))
+                except Exception as e:
+                    print(f"✗ Error handling central results: {e}")
+
+    def _discard(self, rows: List[Tuple[int, str, Optional[str], bytes]]) -> None:
+        """Remove sent (or rejected) detections from the spool."""
+        with self.lock:
+            self.conn.executemany("DELETE FROM pending WHERE id = ?", [(row[0],) for row in rows])
+            self.conn.commit()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until every spooled detection has been accepted.
+
+        Args:
+            timeout: Seconds to wait
+
+        Returns:
+            True if the spool is empty
+        """
+        deadline = time.time() + timeout
+        self.wake.set()
+        with self.idle:
+            while self.pending > 0:
+                remaining = deadline - time.time()
+                if remaining <= 0 or self.thread is None or not self.thread.is_alive():
+                    return False
+                self.idle.wait(min(remaining, 0.1))
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """
+        Stop the sender after a short final flush; unsent detections stay spooled.
+
+        Args:
+            timeout: Seconds to spend flushing
+        """
+        if self.thread is not None:
+            self.flush(timeout)
+            self.stopping.set()
+            self.wake.set()
+            self.thread.join(timeout=self.timeout + 1)
+            self.thread = None
+        with self.lock:
+            if self.sending:
+                # Still inside a request: the sender closes the spool when it returns
+                self.close_when_stopped = True
+            else:
+                self.conn.close()
@@ -0,0 +1,316 @@
+"""
+IPC module for the recognition engine.
+Newline-delimited JSON control/status channel over a Unix socket.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from typing import Optional, Dict, Any, Iterator, Callable
+from .events import EventBus
+
+
+DEFAULT_SOCKET_PATH = os.environ.get('ATTENDAI_ENGINE_SOCKET', '/tmp/attendai-engine.sock')
+
+
+class EngineUnavailable(ConnectionError):
+    """Raised when the recognition engine process cannot be reached."""
+
+
+class _EngineRequestHandler(socketserver.StreamRequestHandler):
+    """Handles one client connection: one request line, then a reply or a stream."""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            message = json.loads(line)
+            cmd = message.pop('cmd')
+        except (ValueError, KeyError, AttributeError):
+            self._send({'success': False, 'error': 'Malformed request'})
+            return
+
+        server = self.server
+        try:
+            if cmd in server.streams:
+                server.streams[cmd](self, **message)
+            elif cmd in server.commands:
+                self._send(server.commands[cmd](**message))
+            else:
+                self._send({'success': False, 'error': f'Unknown command: {cmd}'})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            print(f"✗ IPC error handling '{cmd}': {e}")
+            try:
+                self._send({'success': False, 'error': str(e)})
+            except OSError:
+                pass
+
+    def _send(self, payload: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(payload).encode() + b'\n')
+        self.wfile.flush()
+
+
+class EngineServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves engine commands to API workers and CLI tools."""
+
+    daemon_threads = True
+
+    def __init__(self, engine, socket_path: str = DEFAULT_SOCKET_PATH):
+        """
+        Initialize IPC server.
+
+        Args:
+            engine: RecognitionEngine instance to control
+            socket_path: Unix socket path to listen on
+        """
+        self.engine = engine
+        self.socket_path = socket_path
+
+        # Request/reply commands: fn(**args) -> response dict
+        self.commands: Dict[str, Callable[..., Dict[str, Any]]] = {
+            'ping': lambda: {'success': True},
+            'status': lambda: {'success': True, 'data': engine.status()},
+            'start': self._wrap(engine.start),
+            'stop': self._wrap(engine.stop),
+            'reload_gallery': self._reload_gallery,
+            'enroll_bulk': lambda source, workers=None: {
+                'success': True, 'data': engine.enroll_bulk(source, workers).to_dict()
+            },
+            'register': self._register,
+            'job': self._get_job,
+            'jobs': lambda: {'success': True, 'data': [j.to_dict() for j in engine.jobs.list()]},
+            'config': lambda: {'success': True, 'data': engine.config.describe()},
+            'update_config': self._update_config,
+        }
+        # Streaming commands: fn(handler, **args) writes until the client leaves
+        self.streams: Dict[str, Callable[..., None]] = {
+            'subscribe': self._stream_events,
+            'preview': self._stream_preview,
+        }
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _EngineRequestHandler)
+        os.chmod(socket_path, 0o660)
+
+    @staticmethod
+    def _wrap(action: Callable[[], tuple]) -> Callable[[], Dict[str, Any]]:
+        """Adapt an engine (success, error) action into a response dict."""
+        def command():
+            success, error = action()
+            return {'success': True} if success else {'success': False, 'error': error}
+        return command
+
+    def _update_config(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        result, error = self.engine.update_settings(changes)
+        if result is None:
+            return {'success': False, 'error': error}
+        return {'success': True, 'data': result}
+
+    def _reload_gallery(self) -> Dict[str, Any]:
+        self.engine.reload_gallery()
+        return {'success': True}
+
+    def _register(self, name: str, roll_number: str, num_samples: int = 15) -> Dict[str, Any]:
+        job, error = self.engine.register(name, roll_number, num_samples)
+        if job is None:
+            return {'success': False, 'error': error}
+        return {'success': True, 'data': job.to_dict()}
+
+    def _get_job(self, job_id: str) -> Dict[str, Any]:
+        job = self.engine.jobs.get(job_id)
+        if job is None:
+            return {'success': False, 'error': 'Job not found'}
+        return {'success': True, 'data': job.to_dict()}
+
+    def _stream_events(self, handler: _EngineRequestHandler,
+                       last_event_id: Optional[int] = None) -> None:
+        """Push engine events to a subscriber until it disconnects."""
+        bus = self.engine.events
+        subscription = bus.subscribe(last_event_id)
+        try:
+            handler._send({'success': True})
+            while not (subscription.overflowed and subscription.queue.empty()):
+                event = subscription.get(timeout=15)
+                # Empty object doubles as a keep-alive to detect dead clients
+                handler._send(event if event is not None else {})
+        finally:
+            bus.unsubscribe(subscription)
+
+    def _stream_preview(self, handler: _EngineRequestHandler) -> None:
+        """Push shared preview JPEGs as length-prefixed frames."""
+        if not self.engine.is_running:
+            handler._send({'success': False, 'error': 'Recognition is not running'})
+            return
+
+        handler._send({'success': True})
+        for jpeg in self.engine.preview.frames():
+            handler.wfile.write(f"{len(jpeg)}\n".encode())
+            handler.wfile.write(jpeg)
+            handler.wfile.flush()
+
+    def serve_in_background(self) -> threading.Thread:
+        """Run the server loop in a daemon thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        print(f"✓ Engine listening on {self.socket_path}")
+        return thread
+
+    def close(self) -> None:
+        """Stop serving and remove the socket file."""
+        self.shutdown()
+        self.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class EngineClient:
+    """Stateless client used by API workers to talk to the engine."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 10.0):
+        """
+        Initialize engine client.
+
+        Args:
+            socket_path: Unix socket path of the engine
+            timeout: Socket timeout for request/reply commands
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _open(self, timeout: Optional[float]) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise EngineUnavailable(f"Recognition engine not reachable at {self.socket_path}: {e}")
+        return sock
+
+    def request(self, cmd: str, **args) -> Dict[str, Any]:
+        """
+        Send a command and wait for its reply.
+
+        Args:
+            cmd: Command name (e.g. 'status', 'start', 'stop')
+            **args: JSON-serialisable command arguments
+
+        Returns:
+            Response dict (always has a 'success' key)
+        """
+        sock = self._open(self.timeout)
+        try:
+            sock.sendall(json.dumps(dict(args, cmd=cmd)).encode() + b'\n')
+            with sock.makefile('rb') as reader:
+                line = reader.readline()
+        except OSError as e:
+            raise EngineUnavailable(f"Recognition engine connection failed: {e}")
+        finally:
+            sock.close()
+
+        if not line:
+            raise EngineUnavailable("Recognition engine closed the connection")
+        return json.loads(line)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream engine events.
+
+        Args:
+            last_event_id: Resume after this event ID
+
+        Yields:
+            Event dicts (keep-alives are filtered out)
+        """
+        # Server sends a keep-alive every 15s, so a long timeout detects a dead engine
+        sock = self._open(timeout=45)
+        try:
+            sock.sendall(json.dumps({'cmd': 'subscribe', 'last_event_id': last_event_id}).encode() + b'\n')
+            with sock.makefile('rb') as reader:
+                reader.readline()  # acknowledgement
+                for line in reader:
+                    event = json.loads(line)
+                    if event:
+                        yield event
+        except OSError as e:
+            raise EngineUnavailable(f"Recognition engine event stream failed: {e}")
+        finally:
+            sock.close()
+
+
+    def preview(self) -> Iterator[bytes]:
+        """
+        Stream live preview frames.
+
+        Yields:
+            JPEG bytes per frame
+
+        Raises:
+            EngineUnavailable: If the engine is unreachable
+            RuntimeError: If the engine refused (e.g. recognition not running)
+        """
+        sock = self._open(timeout=15)
+        reader = sock.makefile('rb')
+        try:
+            sock.sendall(b'{"cmd": "preview"}\n')
+            response = json.loads(reader.readline() or b'{}')
+            if not response.get('success'):
+                raise RuntimeError(response.get('error', 'Preview unavailable'))
+
+            while True:
+                header = reader.readline()
+                if not header:
+                    return
+                yield reader.read(int(header))
+        except OSError as e:
+            raise EngineUnavailable(f"Recognition engine preview stream failed: {e}")
+        finally:
+            reader.close()
+            sock.close()
+
+
+class EventRelay:
+    """Mirrors the engine's event stream into a local EventBus (one per API worker)."""
+
+    def __init__(self, client: EngineClient, bus: EventBus, retry_delay: float = 2.0):
+        """
+        Initialize event relay.
+
+        Args:
+            client: Engine client to subscribe with
+            bus: Local bus that SSE clients subscribe to
+            retry_delay: Seconds to wait before reconnecting
+        """
+        self.client = client
+        self.bus = bus
+        self.retry_delay = retry_delay
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def ensure_running(self) -> None:
+        """Start the relay thread on first use."""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def _run(self) -> None:
+        last_event_id = None
+        while True:
+            try:
+                for event in self.client.subscribe(last_event_id):
+                    self.bus.republish(event)
+                    last_event_id = event['id']
+            except EngineUnavailable:
+                pass
+            except Exception as e:
+                print(f"✗ Event relay error: {e}")
+            time.sleep(self.retry_delay)
@@ -0,0 +1,118 @@
+"""
+Background job module.
+Runs long operations (enrollment, registration) off the request path.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Callable
+from .events import EventBus, event_bus, JOB_PROGRESS, JOB_FINISHED
+
+
+class Job:
+    """A single background job with progress reporting."""
+
+    def __init__(self, kind: str, events: EventBus):
+        """
+        Initialize job.
+
+        Args:
+            kind: Job type (e.g. 'bulk_enroll')
+            events: Bus that progress updates are published on
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.state = 'queued'
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.events = events
+
+    def update(self, **progress) -> None:
+        """Merge progress fields and notify subscribers."""
+        self.progress.update(progress)
+        self.events.publish(JOB_PROGRESS, self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise job state for IPC/JSON responses."""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'state': self.state,
+            'progress': dict(self.progress),
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobManager:
+    """Runs jobs in daemon threads and keeps a bounded history of them."""
+
+    def __init__(self, events: Optional[EventBus] = None, max_jobs: int = 50):
+        """
+        Initialize job manager.
+
+        Args:
+            events: Event bus for progress notifications (default shared bus)
+            max_jobs: Number of jobs remembered (oldest finished jobs are dropped)
+        """
+        self.events = events if events is not None else event_bus
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Start a job.
+
+        Args:
+            kind: Job type
+            fn: Callable invoked as fn(job, *args, **kwargs); its return value
+                becomes the job result
+            *args, **kwargs: Extra arguments for fn
+
+        Returns:
+            The submitted job
+        """
+        job = Job(kind, self.events)
+
+        with self.lock:
+            self.jobs[job.id] = job
+            self._trim()
+
+        def run():
+            job.state = 'running'
+            try:
+                job.result = fn(job, *args, **kwargs)
+                job.state = 'done'
+            except Exception as e:
+                print(f"✗ Job {job.kind} {job.id} failed: {e}")
+                job.error = str(e)
+                job.state = 'failed'
+            job.finished_at = time.time()
+            self.events.publish(JOB_FINISHED, job.to_dict())
+
+        threading.Thread(target=run, daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by ID."""
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        """All remembered jobs, oldest first."""
+        with self.lock:
+            return list(self.jobs.values())
+
+    def _trim(self) -> None:
+        """Forget the oldest finished jobs beyond max_jobs (lock held)."""
+        excess = len(self.jobs) - self.max_jobs
+        for job_id in [j.id for j in self.jobs.values() if j.finished_at is not None][:max(excess, 0)]:
+            del self.jobs[job_id]
@@ -0,0 +1,57 @@
+"""
+Lazy import helper.
+Defers heavy dependencies (face_recognition/dlib and its models) until first use.
+"""
+
+import importlib
+import threading
+from types import ModuleType
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name: str):
+        """
+        Initialize lazy module.
+
+        Args:
+            name: Importable module name
+        """
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        """Import the real module (once, even if several threads race here)."""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Return a proxy that imports a module the first time it is used.
+
+    Args:
+        name: Importable module name
+
+    Returns:
+        LazyModule proxy
+    """
+    return LazyModule(name)
+
+
+def preload(module) -> None:
+    """Import a lazy module now (e.g. during warm-up, off the first frame's critical path)."""
+    if isinstance(module, LazyModule):
+        module._load()
@@ -0,0 +1,240 @@
+"""
+Power mode module.
+Decides from the timetable (or opening hours) how hard the recognition loop
+should work: full rate while students arrive, a slow trickle during
+lectures, and camera off outside hours. Time, CPU and busy time are
+accounted per mode.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Dict, Any
+from .timetable import parse_time, parse_weekday, ARRIVAL_LEAD_MINUTES
+
+
+ACTIVE = 'active'
+LOW_RATE = 'low_rate'
+SUSPENDED = 'suspended'
+POWER_MODES = (ACTIVE, LOW_RATE, SUSPENDED)
+
+
+def parse_hours(value: str) -> Tuple[str, str]:
+    """
+    Parse opening hours 'HH:MM-HH:MM'.
+
+    Raises:
+        ValueError: If the range is malformed or empty
+    """
+    start, _, end = value.partition('-')
+    start, end = parse_time(start), parse_time(end)
+    if end <= start:
+        raise ValueError(f"Opening hours must end after they start: {value}")
+    return start, end
+
+
+class PowerSchedule:
+    """Maps a moment to a power mode.
+
+    With a room, each timetable slot is active from changeover_before until
+    changeover_after past its start (students arriving) and low-rate for
+    the rest of the lecture; the room is suspended between slots. Active
+    wins over low-rate, so the changeover into a back-to-back slot is active
+    even though the previous lecture is still running; the roster already
+    follows the arriving class then (see RosterGalleries). Without a room,
+    the loop is active during opening hours on open days and suspended
+    otherwise.
+    """
+
+    def __init__(self, room: Optional[str] = None, open_hours: str = "07:30-18:00",
+                 open_days: str = "mon,tue,wed,thu,fri",
+                 changeover_before: float = ARRIVAL_LEAD_MINUTES,
+                 changeover_after: float = 15, db_path: str = "attendance.db"):
+        """
+        Initialize power schedule.
+
+        Args:
+            room: Follow this room's timetable (see manage.py timetable)
+            open_hours: 'HH:MM-HH:MM' active hours when no room is given
+            open_days: Comma-separated weekdays the opening hours apply to
+            changeover_before: Minutes before a slot starts to go active (keep
+                it at most the roster lead, or early arrivals see "No class")
+            changeover_after: Minutes after a slot starts to stay active
+            db_path: Database holding the timetable
+        """
+        self.room = room
+        self.open_hours = parse_hours(open_hours)
+        self.open_days = {parse_weekday(day) for day in open_days.split(',')}
+        self.changeover_before = timedelta(minutes=changeover_before)
+        self.changeover_after = timedelta(minutes=changeover_after)
+        self.db_path = db_path
+        self.db = None
+
+    def mode_at(self, when: datetime) -> Tuple[str, datetime]:
+        """
+        Find the power mode at a moment.
+
+        Args:
+            when: Moment to look up
+
+        Returns:
+            Tuple of (mode, valid_until): the mode holds until the next
+            boundary (at the latest, midnight)
+        """
+        day = when.replace(hour=0, minute=0, second=0, microsecond=0)
+        # Windows of (start, end, mode); active wins where they overlap
+        windows = []
+        for start, end in self._periods(day):
+            if self.room is not None:
+                windows.append((start - self.changeover_before, start + self.changeover_after, ACTIVE))
+                windows.append((start, end, LOW_RATE))
+            else:
+                windows.append((start, end, ACTIVE))
+
+        mode = SUSPENDED
+        for start, end, window_mode in sorted(windows, key=lambda w: POWER_MODES.index(w[2])):
+            if start <= when < end:
+                mode = window_mode
+                break
+
+        boundaries = [t for start, end, _ in windows for t in (start, end) if t > when]
+        return mode, min(boundaries + [day + timedelta(days=1)])
+
+    def _periods(self, day: datetime) -> list:
+        """Scheduled (start, end) datetimes on a day: timetable slots or opening hours."""
+        def at(hhmm):
+            return datetime.combine(day.date(), datetime.strptime(hhmm, "%H:%M").time())
+
+        if self.room is None:
+            if day.weekday() not in self.open_days:
+                return []
+            return [(at(self.open_hours[0]), at(self.open_hours[1]))]
+
+        if self.db is None:
+            from .database import Database
+            self.db = Database(self.db_path)
+        return [(at(start), at(end)) for *_, start, end
+                in self.db.get_timetable(room=self.room, weekday=day.weekday())]
+
+    def close(self) -> None:
+        """Close the timetable database connection."""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+class PowerController:
+    """Tracks the current power mode and what each mode costs.
+
+    The engine loop calls update() every iteration; the schedule is only
+    consulted again once the current mode's validity runs out, so the check
+    is one comparison per frame.
+    """
+
+    def __init__(self, schedule: PowerSchedule, low_rate_interval: float = 15.0):
+        """
+        Initialize power controller.
+
+        Args:
+            schedule: Schedule deciding the mode
+            low_rate_interval: Seconds between recognition passes in low-rate mode
+        """
+        self.schedule = schedule
+        self.low_rate_interval = low_rate_interval
+        self.lock = threading.Lock()
+        self.mode = None
+        self.valid_until = None
+        self.transitions = 0
+        self.seconds = dict.fromkeys(POWER_MODES, 0.0)
+        self.cpu_seconds = dict.fromkeys(POWER_MODES, 0.0)
+        self.busy_seconds = dict.fromkeys(POWER_MODES, 0.0)
+        self.passes = dict.fromkeys(POWER_MODES, 0)
+        self.mark_wall = None
+        self.mark_cpu = None
+
+    def update(self, when: Optional[datetime] = None) -> Tuple[str, bool]:
+        """
+        Get the current mode, switching if a boundary has passed.
+
+        Args:
+            when: Current moment (default now)
+
+        Returns:
+            Tuple of (mode, changed)
+        """
+        when = when or datetime.now()
+        if self.valid_until is not None and when < self.valid_until:
+            return self.mode, False
+
+        mode, valid_until = self.schedule.mode_at(when)
+        with self.lock:
+            self._account()
+            changed = mode != self.mode
+            if changed and self.mode is not None:
+                self.transitions += 1
+            self.mode, self.valid_until = mode, valid_until
+        return mode, changed
+
+    def stop(self) -> None:
+        """Stop charging time to any mode (recognition paused); the next update restarts."""
+        with self.lock:
+            self._account()
+            self.mode = None
+            self.valid_until = None
+
+    def refresh(self) -> None:
+        """Consult the schedule again on the next update (after timetable edits)."""
+        self.valid_until = None
+
+    def interval(self, active_interval: float) -> float:
+        """Seconds between recognition passes in the current mode."""
+        if self.mode == LOW_RATE:
+            return max(active_interval, self.low_rate_interval)
+        return active_interval
+
+    def seconds_to_change(self, when: Optional[datetime] = None) -> float:
+        """Seconds until the schedule should be consulted again."""
+        if self.valid_until is None:
+            return 0.0
+        return max(0.0, (self.valid_until - (when or datetime.now())).total_seconds())
+
+    def record_pass(self, seconds: float) -> None:
+        """Count a recognition pass and the time it took."""
+        with self.lock:
+            if self.mode is None:
+                return
+            self.passes[self.mode] += 1
+            self.busy_seconds[self.mode] += seconds
+
+    def _account(self) -> None:
+        """Charge wall and CPU time since the last call to the current mode (lock held)."""
+        wall, cpu = time.monotonic(), time.process_time()
+        if self.mode is not None:
+            self.seconds[self.mode] += wall - self.mark_wall
+            self.cpu_seconds[self.mode] += cpu - self.mark_cpu
+        self.mark_wall, self.mark_cpu = wall, cpu
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Current mode and, per mode, time share, CPU time and duty cycle."""
+        with self.lock:
+            self._account()
+            total = sum(self.seconds.values()) or 1.0
+            modes = {}
+            for mode in POWER_MODES:
+                seconds = self.seconds[mode]
+                modes[mode] = {
+                    'seconds': round(seconds, 1),
+                    'share': round(seconds / total, 3),
+                    'cpu_seconds': round(self.cpu_seconds[mode], 1),
+                    'cpu_percent': round(100 * self.cpu_seconds[mode] / seconds, 1) if seconds else 0.0,
+                    'passes': self.passes[mode],
+                    # Fraction of the mode's wall time spent recognizing
+                    'duty_cycle': round(self.busy_seconds[mode] / seconds, 4) if seconds else 0.0
+                }
+            return {
+                'mode': self.mode,
+                'until': self.valid_until.strftime("%Y-%m-%d %H:%M") if self.valid_until else None,
+                'transitions': self.transitions,
+                'modes': modes
+            }
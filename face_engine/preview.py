@@ -0,0 +1,123 @@
+"""
+Live preview module.
+Keeps the latest camera frame and JPEG-encodes it once for all viewers.
+"""
+
+import cv2
+import threading
+import time
+from typing import Optional, List, Tuple, Iterator
+import numpy as np
+from .recognize import draw_recognition_results
+
+
+class PreviewBuffer:
+    """Latest-frame buffer with a single capped-FPS encoder shared by all viewers."""
+
+    def __init__(self, max_fps: float = 5.0, jpeg_quality: int = 70):
+        """
+        Initialize preview buffer.
+
+        Args:
+            max_fps: Maximum preview frame rate (encoder never runs faster)
+            jpeg_quality: JPEG quality 0-100
+        """
+        self.max_fps = max_fps
+        self.jpeg_quality = jpeg_quality
+
+        self.cond = threading.Condition()
+        self.frame = None
+        self.faces = []
+        self.draw_scale = 4.0
+        self.frame_seq = 0
+        self.jpeg = None
+        self.jpeg_seq = 0
+        self.viewers = 0
+        self.encoder_thread = None
+
+    def update(self, frame: np.ndarray,
+               faces: List[Tuple[str, Tuple[int, int, int, int]]],
+               draw_scale: float = 4.0) -> None:
+        """
+        Publish the latest frame (called from the recognition loop).
+
+        Only stores references, so it costs nothing when nobody is watching.
+
+        Args:
+            frame: Display frame (BGR), must not be modified afterwards
+            faces: Recognition results to overlay
+            draw_scale: Scale from detection coords to display coords
+        """
+        if self.viewers == 0:
+            return
+
+        with self.cond:
+            self.frame = frame
+            self.faces = faces
+            self.draw_scale = draw_scale
+            self.frame_seq += 1
+
+    def _encode_loop(self) -> None:
+        """Encode new frames at most max_fps times per second while viewers exist."""
+        interval = 1.0 / self.max_fps
+        encoded_seq = 0
+        annotated = None
+
+        while True:
+            started = time.time()
+
+            with self.cond:
+                if self.viewers == 0:
+                    self.encoder_thread = None
+                    self.frame = None
+                    return
+                frame, faces, scale, seq = self.frame, self.faces, self.draw_scale, self.frame_seq
+
+            if frame is not None and seq != encoded_seq:
+                # Annotate a copy so the recognition loop's frame stays untouched;
+                # the copy goes into a buffer reused across encodes
+                if annotated is None or annotated.shape != frame.shape:
+                    annotated = np.empty_like(frame)
+                np.copyto(annotated, frame)
+                draw_recognition_results(annotated, faces, scale_factor=scale)
+                ok, buffer = cv2.imencode('.jpg', annotated, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if ok:
+                    with self.cond:
+                        self.jpeg = buffer.tobytes()
+                        self.jpeg_seq += 1
+                        self.cond.notify_all()
+                encoded_seq = seq
+
+            time.sleep(max(0.0, interval - (time.time() - started)))
+
+    def frames(self, idle_timeout: float = 10.0) -> Iterator[bytes]:
+        """
+        Yield encoded JPEG frames as they are produced.
+
+        Args:
+            idle_timeout: Stop if no new frame arrives for this many seconds
+
+        Yields:
+            JPEG bytes (the same object is shared by every viewer)
+        """
+        with self.cond:
+            self.viewers += 1
+            if self.encoder_thread is None:
+                self.encoder_thread = threading.Thread(target=self._encode_loop, daemon=True)
+                self.encoder_thread.start()
+            last_seq = self.jpeg_seq
+
+        try:
+            while True:
+                with self.cond:
+                    if not self.cond.wait_for(lambda: self.jpeg_seq != last_seq, timeout=idle_timeout):
+                        return
+                    jpeg, last_seq = self.jpeg, self.jpeg_seq
+                yield jpeg
+        finally:
+            with self.cond:
+                self.viewers -= 1
+
+    def latest(self) -> Optional[bytes]:
+        """Return the most recently encoded JPEG, if any."""
+        return self.jpeg
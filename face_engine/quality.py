@@ -0,0 +1,158 @@
+"""
+Face quality module.
+Cheap checks (size, sharpness, brightness, optional head pose) run on each
+detected box before the expensive encoder, so encoder time is only spent on
+faces that can actually match.
+"""
+
+import cv2
+import numpy as np
+from typing import Optional, List, Tuple, Dict
+from .lazy import lazy_import
+
+# dlib and its models load on first use, not at import
+face_recognition = lazy_import('face_recognition')
+
+
+REJECT_REASONS = ('too_small', 'blurry', 'too_dark', 'too_bright', 'turned', 'no_landmarks')
+
+
+def face_sharpness(gray: np.ndarray) -> float:
+    """Variance of the Laplacian of a grayscale face crop (blurred faces score low)."""
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def head_pose(frame: np.ndarray, location: Tuple[int, int, int, int]) -> Optional[Tuple[float, float]]:
+    """
+    Estimate head pose from the 5-point landmark model (a few ms, unlike encoding).
+
+    Args:
+        frame: RGB image frame
+        location: Face location (top, right, bottom, left)
+
+    Returns:
+        Tuple of (yaw, pitch) as nose offsets from the eye midpoint in units
+        of eye distance (0 yaw = frontal), or None without landmarks
+    """
+    landmarks = face_recognition.face_landmarks(frame, [location], model='small')
+    if not landmarks:
+        return None
+
+    left_eye = np.mean(landmarks[0]['left_eye'], axis=0)
+    right_eye = np.mean(landmarks[0]['right_eye'], axis=0)
+    nose = np.mean(landmarks[0]['nose_tip'], axis=0)
+    eye_mid = (left_eye + right_eye) / 2
+    eye_distance = np.linalg.norm(right_eye - left_eye) or 1.0
+    yaw = float((nose[0] - eye_mid[0]) / eye_distance)
+    pitch = float((nose[1] - eye_mid[1]) / eye_distance)
+    return yaw, pitch
+
+
+def face_crop(frame: np.ndarray, location: Tuple[int, int, int, int]) -> np.ndarray:
+    """Grayscale copy of a face box, clipped to the frame (empty if the box is outside)."""
+    top, right, bottom, left = location
+    face = frame[max(top, 0):max(bottom, 0), max(left, 0):max(right, 0)]
+    if face.size == 0:
+        return face
+    return cv2.cvtColor(face, cv2.COLOR_RGB2GRAY)
+
+
+class QualityGate:
+    """Rejects detections that are not worth encoding, counting why.
+
+    Checks run cheapest first and stop at the first failure. Thresholds are
+    for detection-frame pixels (the 1/4-scale frame by default).
+    """
+
+    def __init__(self, min_face_size: int = 30, min_sharpness: float = 20.0,
+                 min_brightness: float = 40.0, max_brightness: float = 220.0,
+                 check_pose: bool = False, max_yaw: float = 0.35):
+        """
+        Initialize quality gate.
+
+        Args:
+            min_face_size: Faces narrower than this (pixels) are rejected
+            min_sharpness: Minimum Laplacian variance of the face crop
+            min_brightness: Minimum mean gray level of the face crop
+            max_brightness: Maximum mean gray level of the face crop
+            check_pose: Also reject turned heads using 5-point landmarks
+                (costs a few ms per face)
+            max_yaw: Largest accepted |yaw| when check_pose is on
+        """
+        self.min_face_size = min_face_size
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.check_pose = check_pose
+        self.max_yaw = max_yaw
+        self.counters = dict.fromkeys(('checked', 'passed') + REJECT_REASONS, 0)
+
+    def check(self, frame: np.ndarray, location: Tuple[int, int, int, int]) -> Optional[str]:
+        """
+        Check one detected face.
+
+        Args:
+            frame: RGB image frame the face was detected in
+            location: Face location (top, right, bottom, left)
+
+        Returns:
+            Rejection reason (one of REJECT_REASONS) or None if the face is usable
+        """
+        reason = self._reason(frame, location)
+        self.counters['checked'] += 1
+        self.counters[reason or 'passed'] += 1
+        return reason
+
+    def _reason(self, frame: np.ndarray, location: Tuple[int, int, int, int]) -> Optional[str]:
+        """First failed check for a face, cheapest checks first."""
+        top, right, bottom, left = location
+        if right - left < self.min_face_size:
+            return 'too_small'
+
+        gray = face_crop(frame, location)
+        if gray.size == 0:
+            return 'too_small'
+
+        brightness = float(gray.mean())
+        if brightness < self.min_brightness:
+            return 'too_dark'
+        if brightness > self.max_brightness:
+            return 'too_bright'
+
+        if face_sharpness(gray) < self.min_sharpness:
+            return 'blurry'
+
+        if self.check_pose:
+            pose = head_pose(frame, location)
+            if pose is None:
+                return 'no_landmarks'
+            if abs(pose[0]) > self.max_yaw:
+                return 'turned'
+
+        return None
+
+    def split(self, frame: np.ndarray,
+              locations: List[Tuple[int, int, int, int]]) -> Tuple[list, List[Tuple[tuple, str]]]:
+        """
+        Separate usable faces from rejected ones.
+
+        Args:
+            frame: RGB image frame
+            locations: Detected face locations
+
+        Returns:
+            Tuple of (usable locations, [(location, reason)] for rejected ones)
+        """
+        usable, rejected = [], []
+        for location in locations:
+            reason = self.check(frame, location)
+            if reason is None:
+                usable.append(location)
+            else:
+                rejected.append((location, reason))
+        return usable, rejected
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Faces checked, passed and rejected per reason."""
+        return dict(self.counters)
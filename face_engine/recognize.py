@@ -3,111 +3,269 @@ Face recognition module for attendance marking.
 Detects and recognizes faces in real-time from camera feed.
 """
 
-import face_recognition
 import cv2
 import numpy as np
+import socket
 import time
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict, Any
 from datetime import datetime
 from .database import Database
 from .serial_comm import ArduinoSerial
+from .cooldown import CooldownCache
+from .gallery import Gallery, load_gallery
+from .events import EventBus, event_bus, ATTENDANCE_MARKED, UNKNOWN_FACE
+from .ingest import IngestClient, TIMESTAMP_FORMAT
+from .timetable import RosterGalleries, NO_CLASS_LABEL
+from .quality import QualityGate
+from . import eventlog
+from .lazy import lazy_import, preload
+
+# dlib and its models load on first use, not at import
+face_recognition = lazy_import('face_recognition')
+
+# Box label while a central server decides who a face is
+REMOTE_LABEL = "Sent"
+
+# Box label for detections the quality gate kept from the encoder
+LOW_QUALITY_LABEL = "Low quality"
 
 
 class FaceRecognizer:
     """Handles real-time face recognition and attendance marking."""
     
-    def __init__(self, tolerance: float = 0.5):
+    def __init__(self, tolerance: float = 0.5, events: Optional[EventBus] = None,
+                 gallery_mode: str = 'float64', multi_sample: bool = False,
+                 central_url: Optional[str] = None, device_id: Optional[str] = None,
+                 room: Optional[str] = None, quality_gate: Optional[QualityGate] = None,
+                 cooldown_seconds: float = 600, serial_port: str = '/dev/ttyACM0',
+                 baudrate: int = 9600, event_log: Optional[eventlog.EventLog] = None):
         """
         Initialize face recognizer.
         
         Args:
             tolerance: Face matching tolerance (lower = stricter, default 0.5)
+            events: Event bus for live notifications (default shared bus)
+            gallery_mode: Gallery representation: 'float64' (exact), or the
+                compact 'float16' / 'int8' with exact re-ranking
+            multi_sample: Match against every stored registration sample
+                instead of each student's mean encoding
+            central_url: Central server base URL; when set, encodings are
+                sent there for matching instead of using a local gallery
+            device_id: Name this device reports to the central server
+                (default: the room, else the hostname)
+            room: Room this camera is in; only the roster of the course
+                scheduled there right now is matched (default: everyone)
+            quality_gate: Checks run on each detection before encoding
+                (default QualityGate(); pass QualityGate(min_sharpness=0, ...)
+                to loosen it)
+            cooldown_seconds: Minimum seconds between two marks of a student
+            serial_port: Arduino serial port or pyserial URL
+            baudrate: Arduino baud rate
+            event_log: Record every decision (with distances and stage
+                timings) in this binary log
         """
         self.tolerance = tolerance
+        self.events = events if events is not None else event_bus
+        self.gallery_mode = gallery_mode
+        self.multi_sample = multi_sample
         self.db = Database()
-        self.arduino = ArduinoSerial()
+        self.arduino = ArduinoSerial(port=serial_port, baudrate=baudrate)
+        self.quality = quality_gate if quality_gate is not None else QualityGate()
+        self.event_log = event_log
+        
+        # True when the last pass skipped faces that may be usable a moment later
+        self.deferred = False
+        
+        # Client mode: the central server holds the gallery and the attendance
+        self.ingest = None
+        if central_url:
+            self.ingest = IngestClient(central_url, device_id or room or socket.gethostname(),
+                                       on_results=self._on_central_results)
+        
+        # Room mode: the gallery follows the room's timetable
+        self.room = room
+        self.rosters = None
+        self.slot = None
+        if room and self.ingest is None:
+            self.rosters = RosterGalleries(self.db, room, mode=gallery_mode, multi_sample=multi_sample)
         
         # Load known faces from database
-        self.known_encodings = []
-        self.known_student_ids = []
-        self.known_names = []
-        self._load_known_faces()
+        self.gallery = Gallery([], [], [])
+        self.gallery_signature = None
+        if self.ingest is None:
+            self._load_known_faces()
         
-        # In-memory cache to prevent rapid duplicate entries
-        self.last_marked = {}  # {student_id: timestamp}
-        self.cooldown_seconds = 600  # 10 minutes in seconds
+        # In-memory cache to prevent rapid duplicate entries, seeded from
+        # the database so a restart doesn't re-mark everyone in the window
+        self.cooldown_seconds = cooldown_seconds
+        self.last_marked = CooldownCache(ttl_seconds=self.cooldown_seconds)
+        recent = self.last_marked.warm_start(self.db.get_recent_marks(self.cooldown_seconds))
+        if recent:
+            print(f"✓ {recent} students still in attendance cooldown")
+    
+    def _signature(self) -> tuple:
+        """Fingerprint of everything the gallery was built from."""
+        if self.rosters is None:
+            return self.db.get_students_signature()
+        return self.db.get_students_signature() + self.db.get_schedule_signature()
     
     def _load_known_faces(self) -> None:
         """Load all registered students' face encodings from database."""
         print("Loading registered students...")
         
-        students = self.db.get_all_students()
+        self.gallery_signature = self._signature()
+        
+        if self.rosters is not None:
+            self.rosters.refresh()
+            self.slot, self.gallery = self.rosters.at()
+            if self.slot:
+                print(f"✓ Loaded {len(self.gallery)} students enrolled in {self.slot['course_code']} "
+                      f"({self.room} {self.slot['start']}-{self.slot['end']})")
+            else:
+                print(f"✓ No class scheduled in {self.room} right now")
+            return
         
-        for student_id, name, roll_number, encoding in students:
-            self.known_encodings.append(encoding)
-            self.known_student_ids.append(student_id)
-            self.known_names.append(f"{name} ({roll_number})")
+        # Single attribute swap, so a reload never exposes a half-built gallery
+        self.gallery = load_gallery(self.db, mode=self.gallery_mode, multi_sample=self.multi_sample)
         
-        print(f"✓ Loaded {len(self.known_encodings)} registered students")
+        print(f"✓ Loaded {len(self.gallery)} registered students")
     
-    def recognize_faces(self, frame: np.ndarray) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+    def refresh_known_faces(self) -> bool:
+        """
+        Reload the gallery if students were added or deleted since it was loaded.
+        
+        Returns:
+            True if the gallery was reloaded
+        """
+        if self.ingest is not None or self._signature() == self.gallery_signature:
+            return False
+        
+        self._load_known_faces()
+        return True
+    
+    def set_cooldown(self, cooldown_seconds: float) -> None:
+        """Change the cooldown window; students already marked keep their mark time."""
+        self.cooldown_seconds = cooldown_seconds
+        self.last_marked.ttl_seconds = cooldown_seconds
+    
+    def recognize_faces(self, frame: np.ndarray, origin: Tuple[int, int] = (0, 0),
+                        region=None) -> List[Tuple[str, Tuple[int, int, int, int]]]:
         """
         Detect and recognize faces in a frame.
         
         Args:
-            frame: RGB image frame
+            frame: RGB image frame, possibly cropped to a region of interest
+                (see Camera.detection_origin)
+            origin: (top, left) of frame within the full detection frame
+            region: Only faces centred inside this RegionOfInterest
+                (detection-frame coordinates) are considered
             
         Returns:
-            List of tuples: (name, face_location)
+            List of tuples: (name, face_location), locations in full
+            detection-frame coordinates
         """
+        faces = self._recognize_faces(frame, origin, region)
+        if origin == (0, 0):
+            return faces
+        return [(name, offset_location(location, origin)) for name, location in faces]
+    
+    def _recognize_faces(self, frame: np.ndarray, origin: Tuple[int, int],
+                         region) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+        """Recognize faces; locations stay relative to frame (the crop)."""
+        if self.rosters is not None:
+            self._follow_timetable()
+        
+        self.deferred = False
+        log = self.event_log
+        
         # Detect faces using HOG model
+        started = time.perf_counter()
         face_locations = face_recognition.face_locations(frame, model='hog')
+        detect_ms = (time.perf_counter() - started) * 1000
+        
+        if region is not None:
+            # The crop is the region's bounding box; drop faces outside its shapes
+            face_locations = [location for location in face_locations
+                              if region.contains(offset_location(location, origin))]
         
         if len(face_locations) == 0:
             return []
         
+        if self.rosters is not None and self.slot is None:
+            # Nobody is expected in the room; don't mark or flag anyone
+            if log is not None:
+                for location in face_locations:
+                    log.record(eventlog.NO_CLASS, offset_location(location, origin), detect_ms=detect_ms)
+            return [(NO_CLASS_LABEL, face_location) for face_location in face_locations]
+        
+        # Only faces that can match are encoded; the rest are neither marked
+        # nor flagged as unknown, and the caller may retry them sooner
+        started = time.perf_counter()
+        face_locations, rejected = self.quality.split(frame, face_locations)
+        quality_ms = (time.perf_counter() - started) * 1000
+        low_quality = [(LOW_QUALITY_LABEL, location) for location, reason in rejected]
+        self.deferred = bool(rejected)
+        
+        if log is not None:
+            for location, reason in rejected:
+                log.record(eventlog.LOW_QUALITY, offset_location(location, origin),
+                           detect_ms=detect_ms, quality_ms=quality_ms)
+        
+        if len(face_locations) == 0:
+            return low_quality
+        
         # Generate encodings for detected faces
+        started = time.perf_counter()
         face_encodings = face_recognition.face_encodings(frame, face_locations)
+        encode_ms = (time.perf_counter() - started) * 1000
+        
+        if self.ingest is not None:
+            # Matching, attendance and LED feedback happen once the server answers
+            self.ingest.submit(face_encodings, [offset_location(location, origin) for location in face_locations])
+            if log is not None:
+                for location in face_locations:
+                    log.record(eventlog.SENT, offset_location(location, origin), detect_ms=detect_ms,
+                               quality_ms=quality_ms, encode_ms=encode_ms)
+            return [(REMOTE_LABEL, face_location) for face_location in face_locations] + low_quality
         
         recognized_faces = []
         
+        gallery = self.gallery
+        
         for face_encoding, face_location in zip(face_encodings, face_locations):
-            # Compare with known faces
-            matches = face_recognition.compare_faces(
-                self.known_encodings,
-                face_encoding,
-                tolerance=self.tolerance
-            )
-            
             name = "Unknown"
             student_id = None
             should_mark = False
+            decision = eventlog.UNKNOWN
+            
+            # Find best match (one vectorized pass over the packed gallery)
+            started = time.perf_counter()
+            best_match_index, best_distance = gallery.best_match(face_encoding)
+            match_ms = (time.perf_counter() - started) * 1000
             
-            # Find best match
-            if True in matches:
-                # Calculate face distances
-                face_distances = face_recognition.face_distance(
-                    self.known_encodings,
-                    face_encoding
-                )
-                
-                best_match_index = np.argmin(face_distances)
-                
-                if matches[best_match_index]:
-                    student_id = self.known_student_ids[best_match_index]
-                    name = self.known_names[best_match_index]
+            if best_match_index is not None:
+                if best_distance <= self.tolerance:
+                    student_id = gallery.student_ids[best_match_index]
+                    name = gallery.names[best_match_index]
+                    decision = eventlog.COOLDOWN
                     
-                    # Check in-memory cache first (faster than database)
+                    # In-memory cooldown only; no database read per detection
                     current_time = time.time()
                     
-                    if student_id not in self.last_marked or \
-                       (current_time - self.last_marked[student_id]) >= self.cooldown_seconds:
+                    if not self.last_marked.in_cooldown(student_id, current_time):
+                        decision = eventlog.NOT_MARKED
                         # Mark attendance
                         if self.db.mark_attendance(student_id):
-                            self.last_marked[student_id] = current_time
+                            self.last_marked.mark(student_id, current_time)
                             should_mark = True
+                            decision = eventlog.MARKED
                             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                             print(f"✓ ATTENDANCE MARKED: {name} at {timestamp}")
+                            self.events.publish(ATTENDANCE_MARKED, {
+                                'student_id': student_id,
+                                'name': name,
+                                'marked_at': timestamp
+                            })
             
             # Send signal to Arduino ONLY when new attendance is marked
             if should_mark:
@@ -118,10 +276,65 @@ class FaceRecognizer:
             else:
                 # Unknown person
                 self.arduino.send_red()
+                self.events.publish(UNKNOWN_FACE, {
+                    'location': [int(v) for v in offset_location(face_location, origin)]
+                })
+            
+            if log is not None:
+                # Near misses keep their best candidate and distance
+                best_id = None if best_match_index is None else gallery.student_ids[best_match_index]
+                log.record(decision, offset_location(face_location, origin), best_id,
+                           None if best_id is None else best_distance,
+                           detect_ms, quality_ms, encode_ms, match_ms)
             
             recognized_faces.append((name, face_location))
         
-        return recognized_faces
+        return recognized_faces + low_quality
+    
+    def _follow_timetable(self) -> None:
+        """Swap in the next roster when a slot starts or ends (one comparison otherwise)."""
+        slot, gallery = self.rosters.at()
+        if (slot or {}).get('slot_id') == (self.slot or {}).get('slot_id'):
+            return
+        
+        previous, self.slot, self.gallery = self.slot, slot, gallery
+        if slot is None:
+            print(f"✓ {previous['course_code']} ended; no class in {self.room}")
+            return
+        
+        # A new class: marks from the previous one must not suppress this one's
+        self.last_marked = CooldownCache(ttl_seconds=self.cooldown_seconds)
+        print(f"✓ {slot['course_code']} started in {self.room}: "
+              f"matching {len(gallery)} enrolled students")
+    
+    def _on_central_results(self, results: List[Dict[str, Any]]) -> None:
+        """Signal and publish the central server's decisions (sender thread)."""
+        now = datetime.now()
+        
+        for result in results:
+            if result.get('marked'):
+                print(f"✓ ATTENDANCE MARKED: {result['name']} at {result['captured_at']}")
+                self.events.publish(ATTENDANCE_MARKED, {
+                    'student_id': result['student_id'],
+                    'name': result['name'],
+                    'marked_at': result['captured_at']
+                })
+            
+            # Detections that waited in the spool are too old to signal
+            captured_at = datetime.strptime(result['captured_at'], TIMESTAMP_FORMAT)
+            if (now - captured_at).total_seconds() > 10:
+                continue
+            
+            if result.get('marked'):
+                self.arduino.send_green()
+            elif result.get('student_id') is None and result.get('name') != NO_CLASS_LABEL:
+                self.arduino.send_red()
+                self.events.publish(UNKNOWN_FACE, {'location': result.get('box')})
+    
+    @property
+    def remote(self) -> bool:
+        """True in client mode (matching happens on the central server)."""
+        return self.ingest is not None
     
     def start(self) -> bool:
         """
@@ -130,18 +343,36 @@ class FaceRecognizer:
         Returns:
             True if initialization successful
         """
+        # Load dlib models now so the first frame doesn't pay for it
+        preload(face_recognition)
+        
         # Connect to Arduino
         if not self.arduino.connect():
             print("⚠ Warning: Arduino not connected. Continuing without Arduino.")
         
-        return len(self.known_encodings) > 0
+        if self.ingest is not None:
+            self.ingest.start()
+            print(f"✓ Sending encodings to {self.ingest.url} as '{self.ingest.device_id}'")
+            return True
+        
+        return len(self.gallery) > 0
     
     def stop(self) -> None:
         """Clean up resources."""
+        if self.ingest is not None:
+            self.ingest.stop()
         self.arduino.disconnect()
         self.db.close()
 
 
+def offset_location(location: Tuple[int, int, int, int],
+                    origin: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """Move a (top, right, bottom, left) box from a crop into the frame it was cut from."""
+    top, right, bottom, left = location
+    dy, dx = origin
+    return (top + dy, right + dx, bottom + dy, left + dx)
+
+
 def draw_recognition_results(frame: np.ndarray, 
                              recognized_faces: List[Tuple[str, Tuple[int, int, int, int]]],
                              scale_factor: float = 4.0) -> np.ndarray:
@@ -163,8 +394,13 @@ def draw_recognition_results(frame: np.ndarray,
         bottom = int(bottom * scale_factor)
         left = int(left * scale_factor)
         
-        # Choose color based on recognition
-        color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
+        # Choose color based on recognition (gray: not matched on purpose)
+        if name == "Unknown":
+            color = (0, 0, 255)
+        elif name in (LOW_QUALITY_LABEL, NO_CLASS_LABEL):
+            color = (128, 128, 128)
+        else:
+            color = (0, 255, 0)
         
         # Draw rectangle
         cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
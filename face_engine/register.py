@@ -3,119 +3,278 @@ Student registration module.
 Captures multiple face images and creates averaged face encoding.
 """
 
-import face_recognition
 import numpy as np
-import cv2
 import time
-from typing import Optional, List
+from typing import Optional, List, Tuple, Callable
 from .camera import Camera
 from .database import Database
+from .gallery import Gallery
+from .audit import DUPLICATE_THRESHOLD, find_nearest_student
+from .quality import face_crop, face_sharpness, head_pose
+from .lazy import lazy_import
+
+# dlib and its models load on first use, not at import
+face_recognition = lazy_import('face_recognition')
+
+# Valid encodings needed to enroll, and the most a registration may request
+MIN_SAMPLES = 5
+MAX_SAMPLES = 50
+
+
+def check_num_samples(num_samples) -> int:
+    """
+    Validate a requested sample count (digit strings from JSON/forms included).
+
+    Raises:
+        ValueError: If it is not an integer between MIN_SAMPLES and MAX_SAMPLES
+    """
+    if isinstance(num_samples, str) and num_samples.strip().isdigit():
+        num_samples = int(num_samples)
+    if not isinstance(num_samples, int) or isinstance(num_samples, bool) \
+            or not MIN_SAMPLES <= num_samples <= MAX_SAMPLES:
+        raise ValueError(f"num_samples must be an integer from {MIN_SAMPLES} to {MAX_SAMPLES}")
+    return num_samples
 
 
 class StudentRegistration:
     """Handles student face registration process."""
     
-    def __init__(self, num_samples: int = 15):
+    def __init__(self, num_samples: int = 15, min_capture_seconds: float = 2.0,
+                 max_capture_seconds: float = 8.0, min_face_size: int = 30,
+                 duplicate_threshold: Optional[float] = DUPLICATE_THRESHOLD,
+                 frame_source: Optional[Callable[[], Optional[np.ndarray]]] = None):
         """
         Initialize registration handler.
         
         Args:
             num_samples: Number of face samples to capture (default 15)
+            min_capture_seconds: Keep collecting candidates at least this long
+                so the student has time to turn their head
+            max_capture_seconds: Give up collecting candidates after this long
+            min_face_size: Minimum face width in detection-frame pixels
+            duplicate_threshold: Refuse faces closer than this to an existing
+                student (None disables the check)
+            frame_source: Callable returning small RGB frames (e.g. borrowed
+                from the recognition engine); default opens its own Camera
         """
         self.num_samples = num_samples
-        self.camera = Camera()
+        self.min_capture_seconds = min_capture_seconds
+        self.max_capture_seconds = max_capture_seconds
+        self.min_face_size = min_face_size
+        self.duplicate_threshold = duplicate_threshold
+        self.frame_source = frame_source
+        self.camera = Camera() if frame_source is None else None
         self.db = Database()
+        self.last_error = None
     
-    def register_student(self, name: str, roll_number: str) -> bool:
+    def register_student(self, name: str, roll_number: str,
+                         progress: Optional[Callable[..., None]] = None) -> bool:
         """
         Complete registration process for a student.
         
         Args:
             name: Student's full name
             roll_number: Unique roll number
+            progress: Optional callback receiving keyword progress fields
             
         Returns:
-            True if registration successful, False otherwise
+            True if registration successful, False otherwise (see last_error)
         """
         print(f"\n{'='*50}")
         print(f"REGISTERING STUDENT: {name} ({roll_number})")
         print(f"{'='*50}")
         
         # Start camera
-        if not self.camera.start():
+        if self.camera is not None and not self.camera.start():
+            self.last_error = 'Failed to start camera'
             return False
         
         try:
             # Capture face encodings
-            encodings = self._capture_encodings()
+            encodings = self._capture_encodings(progress)
             
-            if len(encodings) < 5:  # Minimum 5 valid samples
+            if len(encodings) < MIN_SAMPLES:
                 print(f"✗ Failed: Only {len(encodings)} valid samples captured")
-                print("  Need at least 5 clear face images")
+                print(f"  Need at least {MIN_SAMPLES} clear face images")
+                self.last_error = f'Only {len(encodings)} valid samples captured (need {MIN_SAMPLES})'
                 return False
             
             # Average the encodings
             averaged_encoding = np.mean(encodings, axis=0)
             
+            # Same person already enrolled under another roll number?
+            duplicate = self._find_duplicate(averaged_encoding)
+            if duplicate is not None:
+                student_id, existing_name, distance = duplicate
+                print(f"✗ Face matches existing student {existing_name} (distance {distance:.3f})")
+                self.last_error = f'Face matches existing student {existing_name} (distance {distance:.3f})'
+                return False
+            
             # Save to database
-            success = self.db.add_student(name, roll_number, averaged_encoding)
+            success = self.db.add_student(name, roll_number, averaged_encoding, samples=encodings)
             
             if success:
                 print(f"✓ Registration complete!")
                 print(f"  Captured {len(encodings)} valid samples")
+            else:
+                self.last_error = f'Could not save student {roll_number} (roll number may already exist)'
             
             return success
             
         finally:
-            self.camera.stop()
+            if self.camera is not None:
+                self.camera.stop()
+    
+    def _find_duplicate(self, encoding: np.ndarray) -> Optional[Tuple[int, str, float]]:
+        """Nearest enrolled student if it is within duplicate_threshold."""
+        if self.duplicate_threshold is None:
+            return None
+        
+        students = self.db.get_all_students()
+        gallery = Gallery([s[0] for s in students], [s[1] for s in students], [s[3] for s in students])
+        nearest = find_nearest_student(gallery, encoding)
+        
+        if nearest is not None and nearest[2] < self.duplicate_threshold:
+            return nearest
+        return None
+    
+    def _read_frame(self) -> Optional[np.ndarray]:
+        """Get the next small RGB frame from the frame source or own camera."""
+        if self.frame_source is not None:
+            return self.frame_source()
+        return self.camera.capture_single_frame()
     
-    def _capture_encodings(self) -> List[np.ndarray]:
+    def _capture_encodings(self, progress: Optional[Callable[..., None]] = None) -> List[np.ndarray]:
         """
         Capture multiple face encodings.
         
+        Reads the camera continuously, scores every single-face frame cheaply
+        (sharpness, face size, head pose) and only runs the expensive encoder
+        on the best num_samples frames with distinct poses.
+        
+        Args:
+            progress: Optional callback receiving keyword progress fields
+        
         Returns:
             List of face encodings
         """
-        encodings = []
-        attempts = 0
-        max_attempts = self.num_samples * 3  # Allow retries
+        report = progress or (lambda **fields: None)
+        candidates = []  # [(quality, pose, frame, location)]
+        pool_size = self.num_samples * 3
+        started = time.time()
         
         print(f"\nCapturing {self.num_samples} face samples...")
         print("Please look at the camera and move your head slightly")
-        print("between captures for better accuracy.\n")
+        print("left, right, up and down for better accuracy.\n")
         
-        while len(encodings) < self.num_samples and attempts < max_attempts:
-            attempts += 1
-            
+        while time.time() - started < self.max_capture_seconds:
             # Capture frame
-            frame = self.camera.capture_single_frame()
+            frame = self._read_frame()
             if frame is None:
                 continue
             
             # Detect faces using HOG model (faster on Raspberry Pi)
             face_locations = face_recognition.face_locations(frame, model='hog')
             
-            if len(face_locations) == 0:
-                print(f"  [{len(encodings)}/{self.num_samples}] No face detected, retrying...")
-                time.sleep(0.3)
+            if len(face_locations) != 1:
                 continue
             
-            if len(face_locations) > 1:
-                print(f"  [{len(encodings)}/{self.num_samples}] Multiple faces detected, retrying...")
-                time.sleep(0.3)
+            scored = score_face(frame, face_locations[0], self.min_face_size)
+            if scored is None:
                 continue
             
+            quality, pose = scored
+            candidates.append((quality, pose, frame, face_locations[0]))
+            report(stage='capturing', candidates=min(len(candidates), pool_size))
+            
+            # Keep the pool bounded: drop the weakest candidate
+            if len(candidates) > pool_size:
+                candidates.remove(min(candidates, key=lambda c: c[0]))
+            
+            if len(candidates) == pool_size and time.time() - started >= self.min_capture_seconds:
+                break
+        
+        print(f"  Scored {len(candidates)} candidate frames in {time.time() - started:.1f}s")
+        
+        encodings = []
+        for quality, pose, frame, location in select_diverse(candidates, self.num_samples):
             # Generate face encoding
-            face_encodings = face_recognition.face_encodings(frame, face_locations)
+            face_encodings = face_recognition.face_encodings(frame, [location])
             
             if len(face_encodings) > 0:
                 encodings.append(face_encodings[0])
-                print(f"  ✓ [{len(encodings)}/{self.num_samples}] Sample captured")
-                time.sleep(0.5)  # Delay between captures
+                print(f"  ✓ [{len(encodings)}/{self.num_samples}] Sample captured "
+                      f"(quality {quality:.0f}, yaw {pose[0]:+.2f})")
+                report(stage='encoding', samples=len(encodings))
         
         return encodings
 
 
+def score_face(frame: np.ndarray, location: Tuple[int, int, int, int],
+               min_face_size: int = 30) -> Optional[Tuple[float, Tuple[float, float]]]:
+    """
+    Cheaply score a detected face for use as a registration sample.
+    
+    Args:
+        frame: RGB image frame
+        location: Face location (top, right, bottom, left)
+        min_face_size: Faces narrower than this (pixels) are rejected
+        
+    Returns:
+        Tuple of (quality, (yaw, pitch)) or None if the face is unusable
+    """
+    top, right, bottom, left = location
+    width = right - left
+    if width < min_face_size:
+        return None
+    
+    gray = face_crop(frame, location)
+    if gray.size == 0:
+        return None
+    
+    sharpness = face_sharpness(gray)
+    
+    pose = head_pose(frame, location)
+    if pose is None:
+        return None
+    
+    # Larger, sharper faces encode more reliably
+    quality = sharpness * min(width / 100.0, 1.5)
+    return quality, pose
+
+
+def select_diverse(candidates: list, count: int, min_pose_delta: float = 0.08) -> list:
+    """
+    Pick the best candidates while spreading them across head poses.
+    
+    Args:
+        candidates: List of (quality, (yaw, pitch), frame, location)
+        count: Number of candidates to select
+        min_pose_delta: Minimum pose distance between picks in the first pass
+        
+    Returns:
+        Selected candidates, best quality first
+    """
+    ranked = sorted(candidates, key=lambda c: c[0], reverse=True)
+    selected = []
+    
+    for candidate in ranked:
+        if len(selected) >= count:
+            break
+        pose = np.array(candidate[1])
+        if all(np.linalg.norm(pose - np.array(s[1])) >= min_pose_delta for s in selected):
+            selected.append(candidate)
+    
+    # Not enough distinct poses: fill up with the next best frames
+    for candidate in ranked:
+        if len(selected) >= count:
+            break
+        if not any(candidate is s for s in selected):
+            selected.append(candidate)
+    
+    return selected
+
+
 def register_new_student():
     """Interactive CLI function to register a new student."""
     print("\n" + "="*50)
@@ -4,84 +4,225 @@ Sends attendance status signals to Arduino.
 """
 
 import serial
+import queue
+import threading
 import time
-from typing import Optional
+from typing import Optional, Dict
 
 
 class ArduinoSerial:
-    """Manages serial communication with Arduino."""
+    """Manages serial communication with Arduino.
+    
+    Signals are queued and written by a background sender thread, so the
+    recognition loop never blocks on a slow or missing device. Repeats of a
+    signal within the coalescing window (or its rate limit) are collapsed
+    into one write, and a lost connection is re-opened in the background.
+    """
     
     # Signal codes
     GREEN_SIGNAL = 'G\n'   # Match found - Green LED
     RED_SIGNAL = 'R\n'     # No match - Red LED
     
-    def __init__(self, port: str = '/dev/ttyACM0', baudrate: int = 9600, timeout: float = 1.0):
+    # Default minimum seconds between two writes of the same signal
+    DEFAULT_RATE_LIMITS = {GREEN_SIGNAL: 0.0, RED_SIGNAL: 2.0}
+    
+    def __init__(self, port: str = '/dev/ttyACM0', baudrate: int = 9600, timeout: float = 1.0,
+                 coalesce_window: float = 0.5, rate_limits: Optional[Dict[str, float]] = None,
+                 queue_size: int = 8, reconnect_interval: float = 5.0, reset_delay: float = 2.0):
         """
         Initialize serial connection to Arduino.
         
         Args:
-            port: Serial port path (default /dev/ttyACM0)
+            port: Serial port path or pyserial URL such as loop:// (default /dev/ttyACM0)
             baudrate: Baud rate (default 9600)
             timeout: Read timeout in seconds
+            coalesce_window: Identical signals within this many seconds are sent once
+            rate_limits: Minimum seconds between writes per signal code
+                (default: red at most every 2s, green unlimited)
+            queue_size: Maximum signals waiting to be written
+            reconnect_interval: Seconds between background reconnect attempts
+            reset_delay: Seconds to wait for the Arduino to reset after opening
         """
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
+        self.coalesce_window = coalesce_window
+        self.rate_limits = dict(self.DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.reconnect_interval = reconnect_interval
+        self.reset_delay = reset_delay
         self.serial_conn = None
         self.is_connected = False
+        
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = {'sent': 0, 'coalesced': 0, 'rate_limited': 0, 'dropped': 0, 'failed': 0}
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._last_accepted = {}
+        self._stop = threading.Event()
+        self._thread = None
     
     def connect(self) -> bool:
         """
-        Establish serial connection to Arduino.
+        Establish serial connection to Arduino and start the sender thread.
+        
+        If the device is not available the sender thread keeps retrying in
+        the background every reconnect_interval seconds.
         
         Returns:
             True if connected successfully, False otherwise
         """
+        connected = self._open()
+        if connected:
+            print(f"✓ Connected to Arduino on {self.port}")
+        
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        
+        return connected
+    
+    def _open(self, report_errors: bool = True) -> bool:
+        """Open the port (blocking, including the Arduino reset delay)."""
         try:
-            self.serial_conn = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                timeout=self.timeout
-            )
+            # serial_for_url accepts device paths as well as loop:// and socket:// URLs
+            conn = serial.serial_for_url(self.port, baudrate=self.baudrate, timeout=self.timeout)
             
             # Wait for Arduino to reset after serial connection
-            time.sleep(2)
+            if '://' not in self.port:
+                time.sleep(self.reset_delay)
             
             # Flush any existing data
-            self.serial_conn.reset_input_buffer()
-            self.serial_conn.reset_output_buffer()
+            conn.reset_input_buffer()
+            conn.reset_output_buffer()
             
+            self.serial_conn = conn
             self.is_connected = True
-            print(f"✓ Connected to Arduino on {self.port}")
             return True
-            
+        
         except serial.SerialException as e:
-            print(f"✗ Error connecting to Arduino: {e}")
+            if report_errors:
+                print(f"✗ Error connecting to Arduino: {e}")
             self.is_connected = False
             return False
     
+    def set_port(self, port: str) -> None:
+        """
+        Switch to another serial port; the sender thread connects to it
+        within reconnect_interval.
+        
+        Args:
+            port: Serial port path or pyserial URL
+        """
+        if port == self.port:
+            return
+        self.port = port
+        if self.is_connected:
+            self._drop_connection()
+        print(f"✓ Arduino port set to {port}")
+    
     def send_signal(self, code: str) -> bool:
         """
-        Send a signal to Arduino.
+        Queue a signal for the Arduino without blocking.
         
         Args:
             code: Signal code ('G\n' for green, 'R\n' for red)
-            
+        
         Returns:
-            True if sent successfully, False otherwise
+            True if queued (or merged into an identical pending/recent signal),
+            False if dropped because the device is disconnected or the queue is full
         """
-        if not self.is_connected or self.serial_conn is None:
-            print("✗ Arduino not connected")
+        if not self.is_connected:
+            self.stats['dropped'] += 1
             return False
         
-        try:
-            self.serial_conn.write(code.encode())
-            self.serial_conn.flush()
-            return True
+        now = time.monotonic()
+        
+        with self._lock:
+            last = self._last_accepted.get(code)
+            if code in self._pending or (last is not None and now - last < self.coalesce_window):
+                self.stats['coalesced'] += 1
+                return True
+            if last is not None and now - last < self.rate_limits.get(code, 0.0):
+                self.stats['rate_limited'] += 1
+                return True
             
-        except serial.SerialException as e:
-            print(f"✗ Error sending signal: {e}")
-            return False
+            try:
+                self.queue.put_nowait(code)
+            except queue.Full:
+                self.stats['dropped'] += 1
+                return False
+            
+            self._pending.add(code)
+            self._last_accepted[code] = now
+        
+        return True
+    
+    def _run(self) -> None:
+        """Sender thread: write queued signals and reconnect when needed."""
+        while not self._stop.is_set():
+            if not self.is_connected:
+                if self._stop.wait(self.reconnect_interval):
+                    break
+                if self._open(report_errors=False):
+                    print(f"✓ Reconnected to Arduino on {self.port}")
+                continue
+            
+            try:
+                code = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            
+            if code is None:
+                break
+            
+            try:
+                self.serial_conn.write(code.encode())
+                self.serial_conn.flush()
+                self.stats['sent'] += 1
+            
+            except (serial.SerialException, OSError) as e:
+                print(f"✗ Error sending signal: {e}")
+                self.stats['failed'] += 1
+                self._drop_connection()
+            
+            finally:
+                with self._lock:
+                    self._pending.discard(code)
+    
+    def _drop_connection(self) -> None:
+        """Close a broken port and discard signals queued for it."""
+        self.is_connected = False
+        try:
+            self.serial_conn.close()
+        except Exception:
+            pass
+        
+        with self._lock:
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._pending.clear()
+    
+    def flush(self, timeout: float = 2.0) -> bool:
+        """
+        Wait until queued signals have been written.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            True if the queue drained in time
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return True
+            time.sleep(0.01)
+        return False
     
     def send_green(self) -> bool:
         """Send green signal (attendance marked)."""
@@ -111,7 +252,16 @@ class ArduinoSerial:
         return None
     
     def disconnect(self) -> None:
-        """Close serial connection."""
+        """Stop the sender thread and close serial connection."""
+        if self._thread is not None:
+            self._stop.set()
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        
         if self.serial_conn is not None:
             self.serial_conn.close()
             self.is_connected = False
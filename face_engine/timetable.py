@@ -0,0 +1,159 @@
+"""
+Timetable module.
+Works out which course meets in a room at a given time and keeps a gallery of
+only that course's roster, so matching scales with class size.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Dict, Any
+from .gallery import Gallery, load_gallery
+
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Box label for faces seen in a room with no class scheduled
+NO_CLASS_LABEL = "No class"
+
+# Minutes before a slot starts that its roster is matched (students arriving)
+ARRIVAL_LEAD_MINUTES = 10
+
+
+def parse_weekday(value: str) -> int:
+    """
+    Turn 'mon'..'sun' (or 0-6) into a weekday number, 0 = Monday.
+
+    Raises:
+        ValueError: If the day is not recognised
+    """
+    value = str(value).strip().lower()
+    if value.isdigit() and int(value) < 7:
+        return int(value)
+    if value[:3] in WEEKDAYS:
+        return WEEKDAYS.index(value[:3])
+    raise ValueError(f"Unknown weekday: {value}")
+
+
+def parse_time(value: str) -> str:
+    """
+    Normalise a time of day to HH:MM.
+
+    Raises:
+        ValueError: If the time is malformed
+    """
+    return datetime.strptime(value.strip(), "%H:%M").strftime("%H:%M")
+
+
+def slot_at(db, room: str, when: datetime,
+            lead: timedelta = timedelta(0)) -> Tuple[Optional[Dict[str, Any]], datetime, datetime]:
+    """
+    Find the timetable slot running in a room at a moment.
+
+    Args:
+        db: Database instance
+        room: Room name
+        when: Moment to look up
+        lead: A slot takes over the room this long before it starts, so
+            students arriving early (or while the previous class leaves)
+            are matched against the class they are coming for
+
+    Returns:
+        Tuple of (slot dict or None, valid_from, valid_until): the answer holds
+        for every moment in [valid_from, valid_until), i.e. until the next
+        slot boundary (at the latest, midnight)
+    """
+    day = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    periods = []
+    for slot_id, course_id, code, name, _, weekday, start_time, end_time in \
+            db.get_timetable(room=room, weekday=when.weekday()):
+        start = datetime.combine(day.date(), datetime.strptime(start_time, "%H:%M").time())
+        end = datetime.combine(day.date(), datetime.strptime(end_time, "%H:%M").time())
+        periods.append((max(day, start - lead), end, {
+            'slot_id': slot_id, 'course_id': course_id, 'course_code': code,
+            'course_name': name, 'room': room, 'start': start_time, 'end': end_time
+        }))
+
+    # Slots come ordered by start time; the latest one to take over wins
+    current = None
+    for takeover, end, slot in periods:
+        if takeover <= when < end:
+            current = slot
+
+    boundaries = [t for takeover, end, _ in periods for t in (takeover, end)]
+    valid_from = max([t for t in boundaries if t <= when] + [day])
+    valid_until = min([t for t in boundaries if t > when] + [day + timedelta(days=1)])
+    return current, valid_from, valid_until
+
+
+class RosterGalleries:
+    """Gallery of the course scheduled in one room, switched at slot boundaries.
+
+    The slot found for a moment is reused until the next boundary, so asking
+    for the current gallery costs one comparison per frame. Galleries are
+    cached per course; refresh() drops them after students, enrolments or
+    the timetable change.
+    """
+
+    def __init__(self, db, room: str, mode: str = 'float64', multi_sample: bool = False,
+                 max_cached: int = 8, lead_minutes: float = ARRIVAL_LEAD_MINUTES):
+        """
+        Initialize roster galleries.
+
+        Args:
+            db: Database instance
+            room: Room name, as used in the timetable
+            mode: Gallery representation (see build_gallery)
+            multi_sample: Match against every stored registration sample
+            max_cached: Course galleries kept in memory
+            lead_minutes: Minutes before its start that a slot's roster is used
+        """
+        self.db = db
+        self.room = room
+        self.mode = mode
+        self.multi_sample = multi_sample
+        self.max_cached = max_cached
+        self.lead = timedelta(minutes=lead_minutes)
+        self.galleries = OrderedDict()  # {course_id: Gallery}
+        self.slot = None
+        self.valid_from = None
+        self.valid_until = None
+        self.empty = Gallery([], [], [])
+
+    def at(self, when: Optional[datetime] = None) -> Tuple[Optional[Dict[str, Any]], Gallery]:
+        """
+        Get the slot and roster gallery for a moment.
+
+        Args:
+            when: Moment to look up (default now)
+
+        Returns:
+            Tuple of (slot dict or None, gallery); the gallery is empty
+            when no class is scheduled
+        """
+        when = when or datetime.now()
+        if self.valid_from is None or not (self.valid_from <= when < self.valid_until):
+            self.slot, self.valid_from, self.valid_until = slot_at(self.db, self.room, when, self.lead)
+
+        if self.slot is None:
+            return None, self.empty
+        return self.slot, self._gallery(self.slot['course_id'])
+
+    def _gallery(self, course_id: int) -> Gallery:
+        """Cached roster gallery for a course."""
+        gallery = self.galleries.get(course_id)
+        if gallery is None:
+            gallery = load_gallery(self.db, mode=self.mode, multi_sample=self.multi_sample,
+                                   student_ids=self.db.get_roster(course_id))
+            self.galleries[course_id] = gallery
+            while len(self.galleries) > self.max_cached:
+                self.galleries.popitem(last=False)
+        else:
+            self.galleries.move_to_end(course_id)
+        return gallery
+
+    def refresh(self) -> None:
+        """Forget cached slots and galleries; the next lookup reloads them."""
+        self.galleries.clear()
+        self.slot = None
+        self.valid_from = None
+        self.valid_until = None
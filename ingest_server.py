@@ -0,0 +1,101 @@
+"""
+Stand-in central ingestion server.
+Serves only POST /api/ingest (same matcher as api.py) on the standard
+library HTTP server, for trying client mode without the full API.
+
+Usage:
+    python3 ingest_server.py                          # attendance.db on port 5001
+    python3 ingest_server.py --db central.db --port 5001
+    python3 main_headless.py --central-url http://localhost:5001 --device-id room-101
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from face_engine.ingest import CentralMatcher, INGEST_PATH
+
+
+class IngestServer:
+    """Central matcher behind a minimal HTTP server."""
+
+    def __init__(self, db_path: str = "attendance.db", host: str = '127.0.0.1', port: int = 5001,
+                 token: str = None):
+        """
+        Initialize stand-in server.
+
+        Args:
+            db_path: Central database file
+            host: Address to bind
+            port: Port to bind (0 picks a free one)
+            token: Require this X-Ingest-Token header if set
+        """
+        self.matcher = CentralMatcher(db_path)
+        self.token = token
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != INGEST_PATH:
+                    return self._reply(404, {'success': False, 'error': 'Not found'})
+                if server.token and self.headers.get('X-Ingest-Token') != server.token:
+                    return self._reply(401, {'success': False, 'error': 'Invalid ingest token'})
+
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    payload = json.loads(self.rfile.read(length))
+                    result = server.matcher.ingest(payload)
+                except ValueError as e:
+                    return self._reply(400, {'success': False, 'error': str(e)})
+
+                print(f"✓ {result['device_id']}: {result['received']} detections, {result['marked']} marked")
+                self._reply(200, {'success': True, 'data': result})
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+
+    def serve_in_background(self) -> None:
+        """Serve requests from a daemon thread."""
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        """Stop serving and close the database."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.matcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in central ingestion server")
+    parser.add_argument('--db', default='attendance.db', help="Central database file")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--token', default=None, help="Require this X-Ingest-Token header")
+    args = parser.parse_args()
+
+    server = IngestServer(args.db, args.host, args.port, args.token)
+    print(f"✓ Ingestion server on {server.url}{INGEST_PATH} (database {args.db})")
+    print("Press Ctrl+C to stop\n")
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        server.httpd.server_close()
+        server.matcher.close()
+
+
+if __name__ == "__main__":
+    main()
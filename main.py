@@ -5,7 +5,8 @@ Provides CLI interface for registration and recognition modes.
 
 import cv2
 import sys
-from face_engine.camera import Camera
+from face_engine.camera import Camera, load_roi
+from face_engine.config import Config
 from face_engine.database import Database, print_database_stats
 from face_engine.register import register_new_student
 from face_engine.recognize import FaceRecognizer, draw_recognition_results
@@ -19,13 +20,23 @@ def recognition_mode():
     print("Press 'q' to quit\n")
     
     # Initialize components
-    recognizer = FaceRecognizer(tolerance=0.5)
+    config = Config()
+    recognizer = FaceRecognizer(tolerance=config.tolerance,
+                                gallery_mode=config.gallery_mode,
+                                multi_sample=config.multi_sample,
+                                cooldown_seconds=config.cooldown_seconds,
+                                serial_port=config.serial_port,
+                                baudrate=config.baudrate)
     
     if not recognizer.start():
         print("✗ No students registered. Please register students first.")
         return
     
-    camera = Camera(camera_index=0, scale_factor=0.25)
+    camera = Camera(camera_index=config.camera_index, scale_factor=config.scale_factor,
+                    roi=load_roi(config.camera_index),
+                    width=config.capture_width, height=config.capture_height,
+                    fps=config.capture_fps,
+                    process_every_n_frames=config.process_every_n_frames)
     
     if not camera.start():
         print("✗ Failed to start camera")
@@ -42,14 +53,18 @@ def recognition_mode():
             # Process every 5th frame
             if should_process and small_frame is not None:
                 # Recognize faces
-                recognized_faces = recognizer.recognize_faces(small_frame)
+                recognized_faces = recognizer.recognize_faces(
+                    small_frame,
+                    origin=camera.detection_origin,
+                    region=camera.detection_region
+                )
                 
                 # Draw results on display frame
                 if recognized_faces:
                     display_frame = draw_recognition_results(
                         display_frame,
                         recognized_faces,
-                        scale_factor=4.0
+                        scale_factor=1.0 / config.scale_factor
                     )
             
             # Display frame
@@ -1,57 +1,134 @@
 """
 Headless attendance recognition - no GUI display
 For SSH/remote operation
+
+Runs the recognition engine as a standalone service process. It owns the
+camera, recognizer and Arduino; the Flask API (api.py) controls it over a
+local Unix socket.
 """
 
-import time
-from face_engine.camera import Camera
-from face_engine.recognize import FaceRecognizer
-
-print("\n" + "="*50)
-print("HEADLESS ATTENDANCE RECOGNITION MODE")
-print("="*50)
-print("Running without display (for SSH)")
-print("Press Ctrl+C to quit\n")
-
-# Initialize
-recognizer = FaceRecognizer(tolerance=0.5)
-
-if not recognizer.start():
-    print("✗ No students registered")
-    exit(1)
-
-camera = Camera(camera_index=0, scale_factor=0.25)
-
-if not camera.start():
-    print("✗ Failed to start camera")
-    exit(1)
-
-# Add cooldown to prevent processing same person too frequently
-last_process_time = 0
-process_interval = 3  # Only process faces every 3 seconds
-
-try:
-    print("✓ System running... monitoring for faces\n")
-    
-    while True:
-        should_process, display_frame, small_frame = camera.read_frame()
-        
-        if display_frame is None:
-            break
-        
-        current_time = time.time()
-        
-        # Only process if enough time has passed AND it's a frame we should process
-        if should_process and small_frame is not None:
-            if (current_time - last_process_time) >= process_interval:
-                recognized_faces = recognizer.recognize_faces(small_frame)
-                last_process_time = current_time
-        
-        time.sleep(0.1)  # Small delay
-
-except KeyboardInterrupt:
-    print("\n\nStopping...")
-finally:
-    camera.stop()
-    recognizer.stop()
-    print("✓ System stopped")
+import argparse
+import signal
+import threading
+from face_engine.engine import RecognitionEngine
+from face_engine.camera import load_roi, DEFAULT_CAMERA_CONFIG
+from face_engine.power import PowerController, PowerSchedule
+from face_engine.config import Config, DEFAULT_CONFIG_PATH
+from face_engine.gallery import check_gallery_mode
+from face_engine.eventlog import EventLog
+from face_engine.ipc import EngineServer, DEFAULT_SOCKET_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless attendance recognition engine")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH,
+                        help="Unix socket path for the API control channel")
+    parser.add_argument('--idle', action='store_true',
+                        help="Wait for the API to start recognition instead of starting immediately")
+    parser.add_argument('--gallery', choices=['float64', 'float16', 'int8'], default=None,
+                        help="Gallery representation (compact modes re-rank exactly; "
+                             "default: gallery_mode setting)")
+    parser.add_argument('--multi-sample', action='store_true',
+                        help="Match against every stored registration sample, not just the mean")
+    parser.add_argument('--capture', choices=['grab', 'read'], default='grab',
+                        help="'grab' decodes only frames that are used; 'read' decodes every frame")
+    parser.add_argument('--fourcc', choices=['MJPG', 'YUYV'], default=None,
+                        help="Pixel format to request from the camera")
+    parser.add_argument('--buffer-size', type=int, default=1,
+                        help="Camera driver frame queue length")
+    parser.add_argument('--central-url', default=None,
+                        help="Send face encodings to this central server (e.g. http://central:5000) "
+                             "instead of matching locally")
+    parser.add_argument('--device-id', default=None,
+                        help="Name reported to the central server (default: --room, else hostname)")
+    parser.add_argument('--room', default=None,
+                        help="Room this camera is in; match only the roster of the course "
+                             "scheduled there (see manage.py timetable)")
+    parser.add_argument('--check-pose', action='store_true',
+                        help="Skip turned heads before encoding (landmark check, a few ms per face)")
+    parser.add_argument('--camera-config', default=DEFAULT_CAMERA_CONFIG,
+                        help="Per-camera settings file, e.g. the region of interest "
+                             "(see manage.py roi)")
+    parser.add_argument('--power-schedule', action='store_true',
+                        help="Run at full rate only around class starts (with --room) or in "
+                             "opening hours, slowly during lectures, camera off otherwise")
+    parser.add_argument('--open-hours', default="07:30-18:00",
+                        help="Active hours HH:MM-HH:MM for --power-schedule without --room")
+    parser.add_argument('--open-days', default="mon,tue,wed,thu,fri",
+                        help="Days the opening hours apply to")
+    parser.add_argument('--low-rate-interval', type=float, default=None,
+                        help="Seconds between recognition passes during lectures "
+                             "(default: low_rate_interval setting)")
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH,
+                        help="Settings file (ATTENDAI_<SETTING> environment variables override it)")
+    parser.add_argument('--event-log', default='logs',
+                        help="Directory for the binary log of every recognition decision")
+    parser.add_argument('--no-event-log', action='store_true',
+                        help="Do not log recognition decisions")
+    parser.add_argument('--event-log-max-mb', type=float, default=64,
+                        help="Start a new log segment once a file reaches this size")
+    args = parser.parse_args()
+
+    config = Config(args.config)
+    gallery_mode = args.gallery or config.gallery_mode
+    multi_sample = args.multi_sample or config.multi_sample
+    try:
+        check_gallery_mode(gallery_mode, multi_sample)
+    except ValueError as e:
+        parser.error(str(e))
+    event_log = None
+    if not args.no_event_log:
+        event_log = EventLog(args.event_log, camera=config.camera_index,
+                             max_bytes=int(args.event_log_max_mb * 1024 * 1024))
+
+    power = None
+    if args.power_schedule:
+        power = PowerController(PowerSchedule(room=args.room, open_hours=args.open_hours,
+                                              open_days=args.open_days),
+                                low_rate_interval=config.low_rate_interval
+                                if args.low_rate_interval is None else args.low_rate_interval)
+
+    print("\n" + "="*50)
+    print("HEADLESS ATTENDANCE RECOGNITION MODE")
+    print("="*50)
+    print("Running without display (for SSH)")
+    print("Press Ctrl+C to quit\n")
+
+    engine = RecognitionEngine(tolerance=config.tolerance, camera_index=config.camera_index,
+                               scale_factor=config.scale_factor,
+                               process_interval=config.process_interval,
+                               gallery_mode=gallery_mode, multi_sample=multi_sample,
+                               capture_mode=args.capture, fourcc=args.fourcc,
+                               buffer_size=args.buffer_size, central_url=args.central_url,
+                               device_id=args.device_id, room=args.room,
+                               check_pose=args.check_pose or config.check_pose,
+                               roi=load_roi(config.camera_index, args.camera_config),
+                               power=power, config=config, event_log=event_log)
+    server = EngineServer(engine, socket_path=args.socket)
+    server.serve_in_background()
+
+    if args.idle:
+        # Load models, gallery and Arduino now so the first start is fast
+        engine.warm_up()
+    else:
+        success, error = engine.start()
+        if not success:
+            print(f"✗ {error}")
+        else:
+            print("✓ System running... monitoring for faces\n")
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    try:
+        stop_event.wait()
+    except KeyboardInterrupt:
+        print("\n\nStopping...")
+    finally:
+        engine.shutdown()
+        server.close()
+        print("✓ System stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Management commands for the Classroom Attendance System.
+Run `python3 manage.py --help` to list the available commands.
+"""
+
+import argparse
+import json
+import sys
+
+
+def notify_engine_gallery_changed():
+    """Tell a running recognition engine to reload its gallery (if there is one)."""
+    from face_engine.ipc import EngineClient, EngineUnavailable
+
+    try:
+        EngineClient().request('reload_gallery')
+        print("✓ Recognition engine gallery reloaded")
+    except EngineUnavailable:
+        pass
+
+
+def cmd_enroll(args):
+    """Bulk-enroll students from a photo folder or CSV manifest."""
+    from face_engine.bulk_enroll import bulk_enroll, print_enroll_report
+
+    report = bulk_enroll(args.source, db_path=args.db, workers=args.workers,
+                         min_samples=args.min_samples)
+    print_enroll_report(report)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Report written to {args.report}")
+
+    if report['students_enrolled']:
+        notify_engine_gallery_changed()
+
+    return 0 if report['students_failed'] == 0 else 1
+
+
+def cmd_audit(args):
+    """Report students who may be the same person enrolled twice."""
+    from face_engine.audit import audit_duplicates, print_audit_report
+
+    report = audit_duplicates(args.db, threshold=args.threshold, block_size=args.block_size)
+    print_audit_report(report)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Report written to {args.report}")
+
+    return 0 if not report['clusters'] else 1
+
+
+def cmd_export(args):
+    """Export attendance for a date range as CSV, gzip CSV or NDJSON."""
+    from face_engine.export import export_attendance, encode_rows, iter_attendance, format_for_path
+
+    fmt = args.format or format_for_path(args.output)
+    try:
+        if args.output == '-':
+            rows = iter_attendance(args.db, args.start, args.end, args.roll, args.student_id)
+            for chunk in encode_rows(rows, fmt):
+                sys.stdout.buffer.write(chunk)
+            return 0
+
+        count = export_attendance(args.output, db_path=args.db, fmt=fmt,
+                                  start_date=args.start, end_date=args.end,
+                                  roll_numbers=args.roll, student_ids=args.student_id)
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 2
+
+    print(f"✓ Exported {count} records to {args.output}")
+    return 0
+
+
+def cmd_archive(args):
+    """Move closed months or a term into archive database files."""
+    from face_engine.archive import archive_before, archive_range, list_archives
+
+    try:
+        if args.before:
+            moved = archive_before(args.db, args.before, vacuum=args.vacuum)
+            for label, count in moved.items():
+                print(f"✓ Archived {count} records to {label}")
+            if not moved:
+                print("No attendance to archive")
+        elif args.start and args.end:
+            count = archive_range(args.db, args.start, args.end, label=args.label, vacuum=args.vacuum)
+            print(f"✓ Archived {count} records to {args.label or f'{args.start}_{args.end}'}")
+        elif not args.list:
+            print("✗ Give --before DATE, or --from DATE --to DATE [--label NAME]", file=sys.stderr)
+            return 2
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 2
+
+    for archive in list_archives(args.db):
+        print(f"  {archive['label']:20s} {archive['start'][:10]} .. {archive['end'][:10]} "
+              f"{archive['records']:>9} records  {archive['path']}")
+    return 0
+
+
+def cmd_course(args):
+    """Add courses, manage enrolment and list courses."""
+    from face_engine.database import Database
+
+    db = Database(args.db)
+    try:
+        if args.action == 'add':
+            db.add_course(args.code, args.name)
+            print(f"✓ Course {args.code}: {args.name}")
+        elif args.action in ('enroll', 'unenroll'):
+            rolls = list(args.rolls)
+            if args.file:
+                with open(args.file) as f:
+                    rolls += [line.strip() for line in f if line.strip()]
+            changed, missing = db.set_enrolment(args.code, rolls, enrolled=args.action == 'enroll')
+            print(f"✓ {'Enrolled' if args.action == 'enroll' else 'Unenrolled'} {changed} students "
+                  f"{'in' if args.action == 'enroll' else 'from'} {args.code}")
+            for roll in missing:
+                print(f"⚠ Unknown roll number: {roll}")
+
+        for _, code, name, enrolled in db.get_courses():
+            print(f"  {code:12s} {enrolled:>5} students  {name}")
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+
+    if args.action != 'list':
+        notify_engine_gallery_changed()
+    return 0
+
+
+def cmd_timetable(args):
+    """Schedule courses in rooms and list the timetable."""
+    from face_engine.database import Database
+    from face_engine.timetable import WEEKDAYS, parse_time, parse_weekday
+
+    db = Database(args.db)
+    try:
+        if args.action == 'add':
+            slot_id = db.add_timetable_slot(args.course, args.room, parse_weekday(args.day),
+                                            parse_time(args.start), parse_time(args.end))
+            print(f"✓ Slot {slot_id}: {args.course} in {args.room}, {args.day} {args.start}-{args.end}")
+        elif args.action == 'remove':
+            if not db.delete_timetable_slot(args.slot_id):
+                print(f"✗ Slot {args.slot_id} not found", file=sys.stderr)
+                return 1
+            print(f"✓ Removed slot {args.slot_id}")
+
+        for slot_id, _, code, _, room, weekday, start, end in db.get_timetable(room=args.room):
+            print(f"  {slot_id:>4}  {room:10s} {WEEKDAYS[weekday]} {start}-{end}  {code}")
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+
+    if args.action != 'list':
+        notify_engine_gallery_changed()
+    return 0
+
+
+def parse_points(text: str) -> list:
+    """Turn 'x,y x,y ...' into [[x, y], ...]."""
+    return [[int(v) for v in point.split(',')] for point in text.split()]
+
+
+def cmd_roi(args):
+    """Set, show or clear a camera's region of interest."""
+    from face_engine.camera import RegionOfInterest, load_camera_config, save_camera_config
+
+    settings = load_camera_config(args.camera, args.config)
+    try:
+        if args.action == 'set':
+            shapes = [{'rect': [int(v) for v in rect.split(',')]} for rect in args.rect or []]
+            shapes += [{'polygon': parse_points(polygon)} for polygon in args.polygon or []]
+            RegionOfInterest(shapes)
+            settings['roi'] = shapes
+            save_camera_config(args.camera, settings, args.config)
+            print(f"✓ Region of interest saved for camera {args.camera} (restart the engine to apply)")
+        elif args.action == 'clear':
+            settings.pop('roi', None)
+            save_camera_config(args.camera, settings, args.config)
+            print(f"✓ Camera {args.camera} scans the whole frame (restart the engine to apply)")
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 2
+
+    shapes = settings.get('roi')
+    if not shapes:
+        print(f"  Camera {args.camera}: whole frame")
+        return 0
+    roi = RegionOfInterest(shapes)
+    frame_shape = (args.height, args.width)
+    print(f"  Camera {args.camera}: {json.dumps(shapes)}")
+    print(f"  Detector scans {roi.coverage(frame_shape, args.scale):.0%} of a "
+          f"{args.width}x{args.height} frame")
+    return 0
+
+
+def cmd_events(args):
+    """Summarize a day of the recognition event log."""
+    import numpy as np
+    from face_engine.eventlog import DECISIONS, UNKNOWN, read_event_log
+
+    try:
+        events = read_event_log(args.day, args.dir)
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 2
+
+    if len(events) == 0:
+        print("No recognition events logged for that day")
+        return 0
+
+    print(f"{len(events)} decisions")
+    counts = np.bincount(events['decision'], minlength=len(DECISIONS))
+    for code, name in enumerate(DECISIONS):
+        if counts[code]:
+            print(f"  {name:12s} {counts[code]:>8}")
+
+    compared = events[~np.isnan(events['distance'])]
+    if len(compared):
+        matched = compared[compared['decision'] != UNKNOWN]
+        near = compared[(compared['decision'] == UNKNOWN) & (compared['distance'] <= args.tolerance + 0.1)]
+        if len(matched):
+            print(f"Best distance of matched faces: median {np.median(matched['distance']):.3f}, "
+                  f"max {matched['distance'].max():.3f}")
+        print(f"Unknown within {args.tolerance + 0.1:.2f} of a student (near misses): {len(near)}")
+
+    print("Stage latency ms (p50 / p95):")
+    for stage in ('detect_ms', 'quality_ms', 'encode_ms', 'match_ms'):
+        values = events[stage][events[stage] > 0]
+        if len(values):
+            p50, p95 = np.percentile(values, [50, 95])
+            print(f"  {stage[:-3]:8s} {p50:8.2f} / {p95:8.2f}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Attendance system management commands")
+    parser.add_argument('--db', default='attendance.db', help="Path to database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enroll = commands.add_parser('enroll', help="Bulk-enroll students from photos")
+    enroll.add_argument('source', help="Folder with one sub-folder per student "
+                                       "(<roll_number>_<name>) or a CSV manifest "
+                                       "(roll_number,name,image_path)")
+    enroll.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    enroll.add_argument('--min-samples', type=int, default=1, help="Minimum usable photos per student")
+    enroll.add_argument('--report', help="Write the full JSON report to this file")
+    enroll.set_defaults(func=cmd_enroll)
+
+    audit = commands.add_parser('audit', help="Find suspected duplicate identities in the gallery")
+    audit.add_argument('--threshold', type=float, default=0.4,
+                       help="Flag student pairs closer than this encoding distance")
+    audit.add_argument('--block-size', type=int, default=1024, help="Rows per distance tile (bounds memory)")
+    audit.add_argument('--report', help="Write the full JSON report to this file")
+    audit.set_defaults(func=cmd_audit)
+
+    export = commands.add_parser('export', help="Export attendance for a date range")
+    export.add_argument('output', help="Output file (.csv, .csv.gz, .ndjson) or - for stdout")
+    export.add_argument('--from', dest='start', help="First day, YYYY-MM-DD (default: today)")
+    export.add_argument('--to', dest='end', help="Last day, inclusive (default: --from)")
+    export.add_argument('--roll', action='append', help="Only this roll number (repeatable)")
+    export.add_argument('--student-id', type=int, action='append', help="Only this student ID (repeatable)")
+    export.add_argument('--format', choices=['csv', 'csv.gz', 'ndjson'],
+                        help="Output format (default: from the file extension)")
+    export.set_defaults(func=cmd_export)
+
+    archive = commands.add_parser('archive', help="Move closed periods into archive database files")
+    archive.add_argument('--before', help="Archive everything before this day, one file per month")
+    archive.add_argument('--from', dest='start', help="First day of a term to archive")
+    archive.add_argument('--to', dest='end', help="Last day of the term (inclusive)")
+    archive.add_argument('--label', help="Archive name for --from/--to (e.g. 2025-spring)")
+    archive.add_argument('--vacuum', action='store_true', help="Reclaim space in the live database")
+    archive.add_argument('--list', action='store_true', help="Only list existing archives")
+    archive.set_defaults(func=cmd_archive)
+
+    course = commands.add_parser('course', help="Manage courses and enrolment")
+    course_actions = course.add_subparsers(dest='action', required=True)
+    course_add = course_actions.add_parser('add', help="Add or rename a course")
+    course_add.add_argument('code', help="Course code, e.g. CS101")
+    course_add.add_argument('name', help="Course title")
+    for action in ('enroll', 'unenroll'):
+        enrolment = course_actions.add_parser(action, help=f"{action.capitalize()} students by roll number")
+        enrolment.add_argument('code', help="Course code")
+        enrolment.add_argument('rolls', nargs='*', help="Roll numbers")
+        enrolment.add_argument('--file', help="File with one roll number per line")
+    course_actions.add_parser('list', help="List courses")
+    course.set_defaults(func=cmd_course)
+
+    timetable = commands.add_parser('timetable', help="Schedule courses in rooms")
+    timetable_actions = timetable.add_subparsers(dest='action', required=True)
+    slot_add = timetable_actions.add_parser('add', help="Add a weekly slot")
+    slot_add.add_argument('--room', required=True, help="Room name (as given to main_headless.py --room)")
+    slot_add.add_argument('--course', required=True, help="Course code")
+    slot_add.add_argument('--day', required=True, help="Weekday: mon..sun")
+    slot_add.add_argument('--start', required=True, help="Start time, HH:MM")
+    slot_add.add_argument('--end', required=True, help="End time, HH:MM (exclusive)")
+    slot_remove = timetable_actions.add_parser('remove', help="Remove a slot")
+    slot_remove.add_argument('slot_id', type=int)
+    slot_list = timetable_actions.add_parser('list', help="List slots")
+    slot_list.add_argument('--room', help="Only this room")
+    timetable.set_defaults(func=cmd_timetable, room=None)
+
+    roi = commands.add_parser('roi', help="Limit face detection to parts of a camera's view")
+    roi.add_argument('--camera', default='0', help="Camera index (default 0)")
+    roi.add_argument('--config', default='cameras.json', help="Per-camera settings file")
+    roi.add_argument('--width', type=int, default=640, help="Frame width for the coverage estimate")
+    roi.add_argument('--height', type=int, default=480, help="Frame height for the coverage estimate")
+    roi.add_argument('--scale', type=float, default=0.25, help="Detection scale factor")
+    roi_actions = roi.add_subparsers(dest='action', required=True)
+    roi_set = roi_actions.add_parser('set', help="Replace the region with rectangles and/or polygons")
+    roi_set.add_argument('--rect', action='append', help="x,y,width,height in pixels (repeatable)")
+    roi_set.add_argument('--polygon', action='append', help="'x,y x,y x,y ...' in pixels (repeatable)")
+    roi_actions.add_parser('show', help="Show the region and the share of the frame scanned")
+    roi_actions.add_parser('clear', help="Scan the whole frame again")
+    roi.set_defaults(func=cmd_roi)
+
+    events = commands.add_parser('events', help="Summarize the recognition event log for a day")
+    events.add_argument('--day', help="YYYY-MM-DD (default: today)")
+    events.add_argument('--dir', default='logs', help="Event log directory")
+    events.add_argument('--tolerance', type=float, default=0.5,
+                        help="Matching tolerance the near-miss count is relative to")
+    events.set_defaults(func=cmd_events)
+
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,85 @@
+"""
+Arduino serial check.
+
+Usage:
+    python3 test_arduino.py               # real board on /dev/ttyACM0
+    python3 test_arduino.py /dev/ttyUSB0
+    python3 test_arduino.py loop://       # no hardware: pyserial loopback
+"""
+
+import sys
 import serial
 import time
 
+port = sys.argv[1] if len(sys.argv) > 1 else '/dev/ttyACM0'
+loopback = port.startswith('loop://')
+
 try:
     print("Attempting to connect to Arduino...")
-    ser = serial.Serial('/dev/ttyACM0', 9600, timeout=2)
-    time.sleep(2)  # Wait for Arduino to reset
-    
+    ser = serial.serial_for_url(port, 9600, timeout=2)
+    if not loopback:
+        time.sleep(2)  # Wait for Arduino to reset
+
     print("✓ Connected successfully!")
-    print(f"Port: {ser.port}")
+    print(f"Port: {port}")
     print(f"Baudrate: {ser.baudrate}")
-    
+
     # Try to read any startup message
     if ser.in_waiting > 0:
         msg = ser.readline().decode('utf-8').strip()
         print(f"Arduino says: {msg}")
-    
+
     # Send test commands
     print("\nSending 'G' (Green)...")
     ser.write(b'G\n')
-    time.sleep(2)
-    
+    if loopback:
+        assert ser.readline() == b'G\n', "loopback did not echo G"
+    else:
+        time.sleep(2)
+
     print("Sending 'R' (Red)...")
     ser.write(b'R\n')
-    time.sleep(2)
-    
+    if loopback:
+        assert ser.readline() == b'R\n', "loopback did not echo R"
+    else:
+        time.sleep(2)
+
     ser.close()
     print("\n✓ Test complete!")
-    
+
 except serial.SerialException as e:
     print(f"✗ Error: {e}")
 except Exception as e:
     print(f"✗ Unexpected error: {e}")
+
+
+if loopback:
+    # Background sender: a burst of red signals must not reach the line as a burst
+    from face_engine.serial_comm import ArduinoSerial
+
+    print("\nChecking queued sender (coalescing and rate limits)...")
+    arduino = ArduinoSerial(port, coalesce_window=0.5, rate_limits={'R\n': 1.0})
+    assert arduino.connect(), "could not open loopback port"
+
+    started = time.perf_counter()
+    for _ in range(500):
+        arduino.send_red()
+    arduino.send_green()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    assert arduino.flush(), "sender did not drain the queue"
+
+    written = arduino.serial_conn.read(arduino.serial_conn.in_waiting).decode()
+    print(f"  501 calls in {elapsed_ms:.1f} ms -> wire: {written!r}")
+    print(f"  Stats: {arduino.stats}")
+    assert written.count('R\n') == 1 and written.count('G\n') == 1, "signals were not coalesced"
+
+    # After the rate limit has passed the next red goes out again
+    time.sleep(1.05)
+    arduino.send_red()
+    arduino.flush()
+    assert arduino.serial_conn.read(arduino.serial_conn.in_waiting) == b'R\n', "rate limit never reopened"
+
+    # Disconnected device: calls return immediately and are dropped
+    arduino.disconnect()
+    assert not arduino.send_red()
+    print("✓ Queued sender OK")
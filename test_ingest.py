@@ -0,0 +1,76 @@
+"""
+Edge-to-central ingestion check, end to end on this machine.
+
+A client spools encodings while the stand-in server is down, then delivers
+them once it comes up; resent detections must not mark anyone twice.
+
+Usage:
+    python3 test_ingest.py
+"""
+
+import os
+import socket
+import sqlite3
+import tempfile
+import time
+import numpy as np
+from face_engine.database import Database
+from face_engine.ingest import IngestClient, ENCODING_BYTES
+from ingest_server import IngestServer
+
+workdir = tempfile.mkdtemp()
+db_path = os.path.join(workdir, 'central.db')
+
+# Central gallery with synthetic students
+rng = np.random.default_rng(0)
+encodings = rng.normal(0, 0.1, size=(20, 128))
+db = Database(db_path)
+db.add_students_bulk([(f"Student {i}", f"R{i:03d}", enc) for i, enc in enumerate(encodings)])
+db.close()
+
+# A free port, with nothing listening yet
+with socket.socket() as s:
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+
+results = []
+client = IngestClient(f"http://127.0.0.1:{port}", 'room-101',
+                      spool_path=os.path.join(workdir, 'spool.db'),
+                      flush_interval=0.1, retry_interval=0.2, max_retry_interval=0.5,
+                      on_results=results.extend)
+client.start()
+
+# Student 0 twice within the cooldown, student 1 once, and a stranger
+detections = [
+    ([encodings[0] + 0.01], "2026-01-05 09:00:00"),
+    ([encodings[0] + 0.01], "2026-01-05 09:00:30"),
+    ([encodings[1] - 0.01, rng.normal(0, 0.1, 128)], "2026-01-05 09:01:00"),
+]
+for frame_encodings, captured_at in detections:
+    client.submit(frame_encodings, [(10, 50, 50, 10)] * len(frame_encodings), captured_at)
+
+time.sleep(1.0)
+print(f"Server down: {client.pending} detections spooled, {client.stats['failed']} failed attempts")
+assert client.pending == 4 and client.stats['failed'] > 0, "detections were not buffered"
+
+server = IngestServer(db_path, port=port)
+server.serve_in_background()
+assert client.flush(timeout=10), "spool did not drain after the server came up"
+print(f"✓ Server up: spool drained in {client.stats['batches']} batch(es)")
+
+conn = sqlite3.connect(db_path)
+rows = conn.execute("SELECT student_id, timestamp, device_id FROM attendance ORDER BY timestamp").fetchall()
+print(f"Attendance written: {rows}")
+assert len(rows) == 2 and all(row[2] == 'room-101' for row in rows), "unexpected attendance rows"
+assert sum(r['student_id'] is None for r in results) == 1, "stranger was not reported as unknown"
+
+# A batch resent after a lost response must not mark again
+client.submit([encodings[0] + 0.01], [(10, 50, 50, 10)], "2026-01-05 09:00:00")
+assert client.flush(timeout=10)
+assert conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0] == 2, "resend marked twice"
+print("✓ Resent detections ignored")
+
+conn.close()
+client.stop()
+server.close()
+print(f"\n✓ Test complete! ({ENCODING_BYTES} bytes per encoding on the wire before base64)")
@@ -0,0 +1,54 @@
+"""
+Power schedule check for back-to-back classes.
+
+The changeover into a slot that starts right after another must be active,
+and the arriving class's roster must already be matched by then.
+
+Usage:
+    python3 test_power.py
+"""
+
+import os
+import tempfile
+from datetime import datetime
+import numpy as np
+from face_engine.database import Database
+from face_engine.power import PowerSchedule, ACTIVE, LOW_RATE, SUSPENDED
+from face_engine.timetable import RosterGalleries
+
+db_path = os.path.join(tempfile.mkdtemp(), 'power.db')
+db = Database(db_path)
+db.add_students_bulk([("First", "R1", np.zeros(128)), ("Second", "R2", np.ones(128))])
+db.add_course('CS101', "Intro")
+db.add_course('CS102', "Data Structures")
+db.set_enrolment('CS101', ['R1'], True)
+db.set_enrolment('CS102', ['R2'], True)
+# Monday, back to back
+db.add_timetable_slot('CS101', 'r1', 0, '09:00', '10:00')
+db.add_timetable_slot('CS102', 'r1', 0, '10:00', '11:00')
+
+schedule = PowerSchedule(room='r1', db_path=db_path)
+rosters = RosterGalleries(db, 'r1')
+monday = datetime(2026, 1, 5)
+
+expected = [
+    ('08:45', SUSPENDED, None),
+    ('08:55', ACTIVE, 'CS101'),
+    ('09:20', LOW_RATE, 'CS101'),
+    ('09:55', ACTIVE, 'CS102'),
+    ('10:10', ACTIVE, 'CS102'),
+    ('10:30', LOW_RATE, 'CS102'),
+    ('11:05', SUSPENDED, None),
+]
+for hhmm, mode, course in expected:
+    when = monday.replace(hour=int(hhmm[:2]), minute=int(hhmm[3:]))
+    got_mode, until = schedule.mode_at(when)
+    slot, gallery = rosters.at(when)
+    got_course = slot['course_code'] if slot else None
+    print(f"{hhmm}: {got_mode:9s} until {until:%H:%M}, roster {got_course} ({len(gallery)} students)")
+    assert got_mode == mode, f"{hhmm}: expected {mode}, got {got_mode}"
+    assert got_course == course, f"{hhmm}: expected roster {course}, got {got_course}"
+
+schedule.close()
+db.close()
+print("\n✓ Test complete!")